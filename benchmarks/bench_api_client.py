@@ -0,0 +1,42 @@
+# benchmarks/bench_api_client.py
+"""
+共有クライアント（keep-alive）と従来の requests.post（毎回新規接続）の比較。
+使い方: python -m benchmarks.bench_api_client [呼び出し回数] [模擬ハンドシェイクms]
+"""
+import sys
+import time
+
+import requests
+
+from benchmarks.ne_stub_server import StubServer
+from nextengine.api_client import NextEngineClient
+
+PATH = "/api_v1_master_goods/upload"
+PAYLOAD = {"data_type": "csv", "data": "syohin_code,zaiko_su\nA,-1\n"}
+
+
+def _bench(label, server, call, n):
+    before = server.connections
+    start = time.perf_counter()
+    for _ in range(n):
+        call()
+    elapsed = (time.perf_counter() - start) * 1000
+    conns = server.connections - before
+    print(f"{label:<16} {n} calls  {elapsed:8.1f} ms  {elapsed / n:6.2f} ms/call  {conns} conn")
+    return elapsed
+
+
+def main(n: int = 200, handshake_ms: float = 5.0):
+    with StubServer(handshake_ms=handshake_ms) as server:
+        url = server.base_url + PATH
+        bare = _bench("requests.post", server, lambda: requests.post(url, data=PAYLOAD), n)
+        client = NextEngineClient(base_url=server.base_url)
+        pooled = _bench("NextEngineClient", server, lambda: client.post(PATH, data=PAYLOAD), n)
+        print(f"saving: {bare - pooled:.1f} ms ({(1 - pooled / bare) * 100:.0f}%)")
+        print(f"stats: {client.stats()[PATH]}")
+        client.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 200, float(args[1]) if len(args) > 1 else 5.0)
@@ -0,0 +1,40 @@
+# benchmarks/bench_discount.py
+"""
+1 スキャンごとの合計計算の所要時間（卸売の大口カート、個別・全体割引を重ねた状態）。
+  full        : calculate_total(cart) で毎回計算し直す従来の方式
+  incremental : add_item() で差分更新して total を参照
+使い方: python -m benchmarks.bench_discount [明細数,明細数,...]
+"""
+import sys
+import time
+
+from logic.discount_manager import DiscountManager
+
+
+def _scan_all(lines: int, incremental: bool) -> float:
+    dm, cart = DiscountManager(), []
+    for i in range(0, lines, 10):
+        dm.apply_item_percent(i, 5)
+    dm.apply_order_percent(10)
+    dm.apply_order_discount(500)
+    start = time.perf_counter()
+    for i in range(lines):
+        price = 1000 + i % 700
+        cart.append({"price": price, "quantity": 1 + i % 4})
+        if incremental:
+            dm.add_item(price, 1 + i % 4)
+            dm.total
+        else:
+            dm.calculate_total(cart)
+    return (time.perf_counter() - start) / lines
+
+
+def main(sizes):
+    print(f"{'lines':>6} {'full us/scan':>13} {'incremental us/scan':>20}")
+    for n in sizes:
+        print(f"{n:>6} {_scan_all(n, False) * 1e6:>13.1f} {_scan_all(n, True) * 1e6:>20.2f}")
+
+
+if __name__ == "__main__":
+    arg = sys.argv[1] if len(sys.argv) > 1 else "50,200,1000"
+    main([int(x) for x in arg.split(",")])
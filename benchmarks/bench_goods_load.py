@@ -0,0 +1,64 @@
+# benchmarks/bench_goods_load.py
+"""
+商品マスタ読み込みの起動時間と常駐メモリ（最大 RSS）を比較する。
+  json     : goods_data.json を解析して dict 索引を 2 つ作る従来の方式
+  build    : JSON からスナップショットを作る（初回・マスタ更新時のみ）
+  snapshot : 作成済みスナップショットを mmap で開く
+各方式は別プロセスで測るので、RSS は方式ごとの値になる（/proc の無い Windows では "-"）。
+使い方: python -m benchmarks.bench_goods_load [件数,件数,...]   例: 10000,100000,1000000
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.fixtures import write_goods_master
+
+_CHILD = r"""
+import json, os, sys, time
+mode, data_dir = sys.argv[1], sys.argv[2]
+start = time.perf_counter()
+if mode == "json":
+    with open(os.path.join(data_dir, "goods_data.json"), encoding="utf-8") as f:
+        goods = json.load(f)
+    index = {g["goods_6_item"].lower(): g for g in goods if g["goods_6_item"]}
+    fallback = {g["goods_id"].lower(): g for g in goods if g["goods_id"]}
+    hit = fallback.get("100000000005")
+else:
+    from logic.goods_snapshot import load_snapshot
+    snap = load_snapshot(os.path.join(data_dir, "goods_data.json"), os.path.join(data_dir, "cache"))
+    hit = snap.find("100000000005")
+elapsed = (time.perf_counter() - start) * 1000
+rss = "-"
+try:
+    # VmHWM は exec ごとにリセットされる（ru_maxrss は親の値を引き継ぐことがある）
+    with open("/proc/self/status") as f:
+        rss = next(f"{int(line.split()[1]) / 1024:.0f}" for line in f if line.startswith("VmHWM"))
+except OSError:
+    pass
+print(f"{elapsed:.1f} {rss}")
+"""
+
+
+def _run(mode: str, data_dir: str):
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, mode, data_dir],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout.split()
+    return out[-2], out[-1]
+
+
+def main(sizes):
+    print(f"{'items':>9} {'mode':<9} {'ms':>9} {'maxRSS MB':>10}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as data_dir:
+            write_goods_master(os.path.join(data_dir, "goods_data.json"), n)
+            for mode in ("json", "build", "snapshot"):
+                ms, rss = _run(mode, data_dir)
+                print(f"{n:>9} {mode:<9} {ms:>9} {rss:>10}")
+
+
+if __name__ == "__main__":
+    arg = sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000"
+    main([int(x) for x in arg.split(",")])
@@ -0,0 +1,73 @@
+# benchmarks/bench_import_time.py
+"""
+GUI（ui.pos_gui）の import 時間を `python -X importtime` の出力から測る。
+・新しいプロセスで数回 import し、最短の累積時間を予算（ミリ秒）と比べる
+・起動時に読み込まないはずの重いモジュール（escpos / requests / yaml など）が入っていないかも確認
+・予算超過または重いモジュールの読み込みがあれば終了コード 1
+使い方: python -m benchmarks.bench_import_time [予算ms] [回数]
+"""
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+TARGET = "ui.pos_gui"
+DEFAULT_BUDGET_MS = 200
+# 初回の印刷・同期・レシート生成まで遅らせているモジュール
+DEFERRED = ("escpos", "PIL", "qrcode", "usb", "requests", "urllib3", "yaml")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """-X importtime の出力を (モジュール名, 自身 µs, 累積 µs) のリストにする"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cum_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            rows.append((name, int(self_us), int(cum_us)))
+    return rows
+
+
+def measure(target: str = TARGET) -> Dict[str, int]:
+    """新しいプロセスで target を import し、モジュールごとの累積 µs を返す"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{proc.stderr[-2000:]}")
+    return {name: cum for name, _, cum in parse_importtime(proc.stderr)}
+
+
+def main(budget_ms: float = DEFAULT_BUDGET_MS, runs: int = 5) -> int:
+    results = [measure() for _ in range(runs)]
+    best = min(results, key=lambda r: r[TARGET])
+    total_ms = best[TARGET] / 1000
+    deferred = sorted({n for n in best if n.split(".")[0] in DEFERRED})
+
+    print(f"{TARGET}: best {total_ms:.1f} ms / budget {budget_ms:.0f} ms "
+          f"(runs: {', '.join(f'{r[TARGET] / 1000:.0f}' for r in results)})")
+    print("slowest modules (cumulative):")
+    packages = ("ui", "logic", "nextengine", "utils")
+    own = [(n, us) for n, us in best.items()
+           if n != TARGET and "." in n and n.split(".")[0] in packages]
+    own += [(n, us) for n, us in best.items() if n in ("config", "logger", "tkinter", "dotenv")]
+    for name, us in sorted(own, key=lambda x: -x[1])[:10]:
+        print(f"  {us / 1000:>7.1f} ms  {name}")
+
+    failed = False
+    if deferred:
+        print(f"NG: deferred modules loaded at import: {', '.join(deferred)}")
+        failed = True
+    if total_ms > budget_ms:
+        print(f"NG: import time {total_ms:.1f} ms exceeds budget {budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    sys.exit(main(float(args[0]) if args else DEFAULT_BUDGET_MS,
+                  int(args[1]) if len(args) > 1 else 5))
@@ -0,0 +1,36 @@
+# benchmarks/bench_receipt_build.py
+"""
+ReceiptBuilder.build() のマイクロベンチマーク（明細 1 / 50 / 500 行）。
+使い方: python -m benchmarks.bench_receipt_build [繰り返し回数]
+"""
+import sys
+import timeit
+from datetime import datetime
+
+from utils.receipt_builder import ReceiptBuilder
+
+
+def _sale(lines: int):
+    items = [
+        {"name": f"テスト商品{i:03d} Sサイズ", "price": 1200 + i, "quantity": 1 + i % 3}
+        for i in range(lines)
+    ]
+    total = sum(i["price"] * i["quantity"] for i in items)
+    return {
+        "items": items, "total": total, "change": 0, "timestamp": datetime.now(),
+        "pay_method_name": "現金", "pay_amount": total,
+    }
+
+
+def main(n: int = 2000):
+    builder = ReceiptBuilder(config_path="config/receipt_layout.yaml")
+    for lines in (1, 50, 500):
+        sale = _sale(lines)
+        reps = max(1, n // lines)
+        best = min(timeit.repeat(lambda: builder.build(sale), number=reps, repeat=5)) / reps
+        print(f"{lines:4d} lines  {best * 1e6:9.1f} us/build  {best * 1e6 / lines:6.2f} us/line")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 2000)
@@ -0,0 +1,91 @@
+# benchmarks/bench_receipt_render.py
+"""
+レシート 1 枚あたりの書き込み回数と変換速度（bytes/sec）を、
+従来の行ごとの set()/_raw() 送信と escpos_renderer.render の 1 回送信で比較する。
+使い方: python -m benchmarks.bench_receipt_render [明細行数] [繰り返し回数]
+"""
+import sys
+import time
+from datetime import datetime
+
+from utils.escpos_renderer import render
+from utils.receipt_builder import ReceiptBuilder
+
+# ロゴ画像の代わりに 576x120 ドット相当のラスタを使う（escpos 不要）
+FAKE_LOGO = b"\x1dv0\x00" + bytes([72, 0, 120, 0]) + b"\x00" * (72 * 120)
+
+
+class CountingDevice:
+    """escpos の Network 相当。_raw() 1 回をソケット書き込み 1 回として数える"""
+
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+
+    def _raw(self, data: bytes):
+        self.writes += 1
+        self.bytes += len(data)
+
+    def set(self, **opts):
+        self._raw(b"\x1b!\x00")
+
+    def image(self, path):
+        self._raw(FAKE_LOGO)
+
+    def cut(self):
+        self._raw(b"\x1bd\x06\x1dV\x00")
+
+    def cashdraw(self, pin):
+        self._raw(b"\x1bp\x00\x32\xfa")
+
+
+def legacy_execute(device, jobs):
+    """行ごとに set()/_raw() を呼ぶ従来の ReceiptPrinter.execute と同じ送り方"""
+    for cmd, text, opts in jobs:
+        if cmd == "text":
+            device.set(**opts)
+            if text:
+                device._raw(text.encode("cp932", errors="replace") + b"\n")
+        elif cmd == "cut":
+            device.cut()
+        elif cmd == "image":
+            device.image(text)
+    device.cashdraw(0)
+
+
+def rendered_execute(device, jobs):
+    device._raw(render(jobs, kick_drawer=True, image_renderer=lambda path: FAKE_LOGO))
+
+
+def _sale(lines: int):
+    items = [{"name": f"商品{i:03d}", "price": 1200 + i, "quantity": 1 + i % 3} for i in range(lines)]
+    total = sum(i["price"] * i["quantity"] for i in items)
+    return {
+        "items": items, "total": total, "change": 0, "timestamp": datetime.now(),
+        "pay_method_name": "現金", "pay_amount": total,
+    }
+
+
+def _bench(label, execute, jobs, n):
+    device = CountingDevice()
+    start = time.perf_counter()
+    for _ in range(n):
+        execute(device, jobs)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<10} {device.writes / n:6.1f} writes/receipt  "
+        f"{device.bytes / n:8.0f} bytes/receipt  "
+        f"{elapsed / n * 1e6:8.1f} us/receipt  {device.bytes / elapsed / 1e6:7.1f} MB/s"
+    )
+
+
+def main(lines: int = 10, n: int = 2000):
+    jobs = ReceiptBuilder(config_path="config/receipt_layout.yaml").build(_sale(lines))
+    print(f"{len(jobs)} jobs ({lines} item lines), {n} receipts")
+    _bench("legacy", legacy_execute, jobs, n)
+    _bench("render", rendered_execute, jobs, n)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 10, int(args[1]) if len(args) > 1 else 2000)
@@ -0,0 +1,55 @@
+# benchmarks/bench_report.py
+"""
+日次／月次レポート集計の所要時間（1 年分の売上を入れた一時ジャーナルで測る）。
+  rollup : 日別集計の合算（通常の経路）
+  scan   : 売上の元データを順次走査
+使い方: python -m benchmarks.bench_report [1日あたりの売上件数]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from logic.report_generator import ReportGenerator
+from logic.sales_journal import SalesJournal
+
+
+def _fill(journal: SalesJournal, per_day: int):
+    start = datetime(2024, 1, 1, 10, 0)
+    for d in range(366):
+        for i in range(per_day):
+            ts = start + timedelta(days=d, seconds=i * 20)
+            due = 1100 * (1 + i % 2)
+            method = "現金" if i % 3 else "クレカ"
+            paid = 5000 if method == "現金" else due
+            journal.append({
+                "transaction_id": f"B{d:03d}{i:05d}",
+                "timestamp": ts.isoformat(),
+                "cart": [{"goods_id": f"{100000 + i % 500}", "name": "テスト商品", "price": 1100,
+                          "quantity": 1 + i % 2}],
+                "total_due": due,
+                "payments": [{"method": method, "amount": paid}],
+                "change": paid - due,
+            })
+
+
+def main(per_day: int = 100):
+    with tempfile.TemporaryDirectory() as data_dir:
+        journal = SalesJournal(data_dir)
+        _fill(journal, per_day)
+        gen = ReportGenerator(data_dir, journal=journal)
+        print(f"{'range':<8} {'sales':>7} {'rollup ms':>10} {'scan ms':>10}")
+        for label, (start_day, end_day) in (("daily", ("20240615", "20240615")),
+                                            ("monthly", ("20240601", "20240630")),
+                                            ("year", ("20240101", "20241231"))):
+            times = []
+            for fn in (gen.build, gen.scan):
+                start = time.perf_counter()
+                rep = fn(start_day, end_day)
+                times.append((time.perf_counter() - start) * 1000)
+            print(f"{label:<8} {rep['count']:>7} {times[0]:>10.2f} {times[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 100)
@@ -0,0 +1,64 @@
+# benchmarks/fixtures.py
+"""
+ベンチマーク用の合成データ（商品マスタ・カート・売上レコード）。
+乱数は固定シードで、同じ引数なら毎回同じデータになる（実行結果を比べられるように）。
+"""
+import json
+import random
+from typing import Any, Dict, List
+
+
+def goods_code(i: int) -> str:
+    """i 番目の商品のスキャンコード（3 件に 1 件は 6 項目コードが無く商品 ID）"""
+    return f"{i:06x}" if i % 3 else f"{100000000000 + i}"
+
+
+def write_goods_master(path: str, n: int):
+    """goods_data.json 形式の商品マスタを n 件書き出す"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([
+            {
+                "goods_id": f"{100000000000 + i}",
+                "goods_name": f"{i:06d}　国鉄蒸気機関車乗務員　テスト商品 {i % 997}　1/64",
+                "goods_6_item": f"{i:06x}" if i % 3 else "",
+                "goods_selling_price": f"{1000 + i % 5000}.00",
+            }
+            for i in range(n)
+        ], f, ensure_ascii=False)
+
+
+def make_cart(lines: int, skus: int = 10000, seed: int = 0) -> List[Dict[str, Any]]:
+    """明細 lines 行のカート（売上レコードの cart 形式）"""
+    rng = random.Random(seed)
+    cart = []
+    for _ in range(lines):
+        i = rng.randrange(skus)
+        cart.append({
+            "goods_id": f"{100000000000 + i}",
+            "name": f"{i:06d}　国鉄蒸気機関車乗務員　テスト商品 {i % 997}",
+            "price": 1000 + i % 5000,
+            "quantity": 1 + rng.randrange(4),
+        })
+    return cart
+
+
+def make_record(lines: int, skus: int = 10000, seed: int = 0) -> Dict[str, Any]:
+    """SalesJournal に入る形の売上レコード（現金払い、お釣りあり）"""
+    cart = make_cart(lines, skus, seed)
+    total = sum(item["price"] * item["quantity"] for item in cart)
+    paid = (total // 1000 + 1) * 1000
+    return {
+        "transaction_id": f"20250601_1000{lines:02d}",
+        "timestamp": "2025-06-01T10:00:00",
+        "cart": cart,
+        "total_due": total,
+        "payments": [{"method": "現金", "amount": paid}],
+        "change": paid - total,
+    }
+
+
+def write_token_env(path: str):
+    """InventoryUpdater / SalesUploader を生成できるだけのダミー認証情報"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("NE_ACCESS_TOKEN=a\nNE_REFRESH_TOKEN=r\nNE_CLIENT_ID=c\n"
+                "NE_CLIENT_SECRET=s\nNE_REDIRECT_URI=https://localhost/cb\n")
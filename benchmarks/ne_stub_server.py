@@ -0,0 +1,66 @@
+# benchmarks/ne_stub_server.py
+"""
+Next Engine API のローカル代替サーバ（ベンチマーク・テスト用）。
+・HTTP/1.1 keep-alive 対応、新規接続ごとに handshake_ms の遅延を入れて TLS 確立コストを模擬
+・Accept-Encoding に gzip があればレスポンスを gzip 圧縮
+・受け付けた TCP 接続数とリクエスト数を数える
+"""
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        if self.server.handshake_ms:
+            time.sleep(self.server.handshake_ms / 1000)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.server.requests += 1
+        body = json.dumps(self.server.response).encode("utf-8")
+        gz = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gz:
+            body = gzip.compress(body)
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handshake_ms: float = 0.0, response=None, status: int = 200):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.handshake_ms = handshake_ms
+        self.response = response if response is not None else {"result": "success"}
+        self.status = status
+        self.connections = 0
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,188 @@
+# benchmarks/suite.py
+"""
+中核ロジックのマイクロベンチマーク一式（合成データ: 商品 1 万〜100 万件、カート 1〜500 行）。
+  goods.build_snapshot / goods.load_index / goods.lookup   商品マスタ（GoodsManager）
+  discount.calculate_total                                 DiscountManager（個別・全体割引あり）
+  receipt.build                                            ReceiptBuilder.build()
+  inventory.build_csv / sales.build_csv                    InventoryUpdater / SalesUploader の CSV 生成
+結果は 1 回分を JSON（キー → 1 回あたり µs）に保存し、compare で 2 回分を比べる。
+使い方:
+  python -m benchmarks.suite run [SKU数,...] [明細数,...] [出力JSON]
+  python -m benchmarks.suite compare 基準JSON 比較JSON [閾値%]   （閾値超の悪化があれば終了コード 1）
+"""
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from benchmarks.fixtures import (goods_code, make_cart, make_record, write_goods_master,
+                                 write_token_env)
+from logic.discount_manager import DiscountManager
+from logic.goods_manager import GoodsManager
+from logic.sales_recorder import SalesRecorder
+from nextengine.inventory_updater import InventoryUpdater
+from nextengine.sales_uploader import SalesUploader
+from utils.receipt_builder import ReceiptBuilder
+
+DEFAULT_SKUS = [10000, 100000, 1000000]
+DEFAULT_LINES = [1, 10, 100, 500]
+DEFAULT_THRESHOLD = 10.0
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _best_us(fn: Callable[[], object], repeat: int = 5) -> float:
+    """fn 1 回あたりの最短時間（µs）。1 回の計測が 0.2 秒以上になるよう回数を決める"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def bench_goods(skus: List[int]) -> Dict[str, float]:
+    results = {}
+    rng = random.Random(0)
+    for n in skus:
+        with tempfile.TemporaryDirectory() as data_dir:
+            write_goods_master(os.path.join(data_dir, "goods_data.json"), n)
+
+            # 初回はスナップショットを作る、以降は作成済みを mmap で開く
+            times = []
+            for _ in range(4):
+                gm = GoodsManager(data_dir=data_dir)
+                start = time.perf_counter()
+                gm.load_index()
+                times.append((time.perf_counter() - start) * 1e6)
+                gm._name_thread.join()  # 商品名索引の構築が次の計測に重ならないように
+            results[f"goods.build_snapshot/skus={n}"] = times[0]
+            results[f"goods.load_index/skus={n}"] = min(times[1:])
+
+            # 9 割はヒット、1 割は未登録コード
+            codes = [goods_code(rng.randrange(n)) if i % 10 else f"zz{i:06d}" for i in range(1000)]
+            lookup = gm.lookup
+            per_batch = _best_us(lambda: [lookup(c) for c in codes])
+            results[f"goods.lookup/skus={n}"] = per_batch / len(codes)
+    return results
+
+
+def bench_discount(lines: List[int]) -> Dict[str, float]:
+    results = {}
+    for n in lines:
+        cart = make_cart(n)
+        dm = DiscountManager()
+        for i in range(0, n, 10):
+            dm.apply_item_percent(i, 5)
+        dm.apply_item_discount(n - 1, 100)
+        dm.apply_order_percent(10)
+        dm.apply_order_discount(500)
+        results[f"discount.calculate_total/lines={n}"] = _best_us(lambda: dm.calculate_total(cart))
+    return results
+
+
+def bench_receipt(lines: List[int]) -> Dict[str, float]:
+    builder = ReceiptBuilder(config_path="config/receipt_layout.yaml")
+    results = {}
+    for n in lines:
+        sale = SalesRecorder._build_sale_data(make_record(n))
+        results[f"receipt.build/lines={n}"] = _best_us(lambda: builder.build(sale))
+    return results
+
+
+def bench_csv(lines: List[int]) -> Dict[str, float]:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = os.path.join(tmp, ".env.bench")
+        write_token_env(env)
+        updater = InventoryUpdater(token_env=env, simulate=True)
+        uploader = SalesUploader(token_env=env)
+        for n in lines:
+            record = make_record(n)
+            results[f"inventory.build_csv/lines={n}"] = _best_us(lambda: updater.build_csv(record))
+            results[f"sales.build_csv/lines={n}"] = _best_us(lambda: uploader.build_csv(record))
+    return results
+
+
+def run(skus: List[int], lines: List[int], out: str = None) -> str:
+    """全ケースを実行して結果を JSON に保存し、そのパスを返す"""
+    results = {}
+    for name, fn, arg in (("goods", bench_goods, skus), ("discount", bench_discount, lines),
+                          ("receipt", bench_receipt, lines), ("csv", bench_csv, lines)):
+        start = time.perf_counter()
+        part = fn(arg)
+        for key, us in part.items():
+            print(f"{key:<40} {us:>12.2f} us")
+        print(f"  ({name}: {time.perf_counter() - start:.1f} s)")
+        results.update(part)
+
+    now = datetime.now()
+    out = out or os.path.join(RESULTS_DIR, f"{now:%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": now.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": {key: round(us, 4) for key, us in results.items()},
+        }, f, ensure_ascii=False, indent=2)
+    print(f"saved: {out}")
+    return out
+
+
+def compare(base: Dict[str, float], new: Dict[str, float], threshold: float = DEFAULT_THRESHOLD):
+    """
+    2 回分の results を比べ、(キー, 基準µs, 比較µs, 変化率%, 悪化か) のリストを返す。
+    変化率が +threshold% を超えたものを悪化とする（片方にしか無いキーは変化率 None）
+    """
+    rows = []
+    for key in sorted(set(base) | set(new)):
+        b, n = base.get(key), new.get(key)
+        if b is None or n is None or b <= 0:
+            rows.append((key, b, n, None, False))
+            continue
+        change = (n / b - 1) * 100
+        rows.append((key, b, n, change, change > threshold))
+    return rows
+
+
+def _load_results(path: str) -> Dict[str, float]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def main_compare(base_path: str, new_path: str, threshold: float = DEFAULT_THRESHOLD) -> int:
+    rows = compare(_load_results(base_path), _load_results(new_path), threshold)
+    print(f"{'case':<40} {'base us':>12} {'new us':>12} {'change':>8}")
+    for key, b, n, change, regressed in rows:
+        if change is None:
+            b_text = b if b is not None else "-"
+            n_text = n if n is not None else "-"
+            print(f"{key:<40} {b_text:>12} {n_text:>12} {'-':>8}")
+            continue
+        mark = "  REGRESSION" if regressed else ""
+        print(f"{key:<40} {b:>12.2f} {n:>12.2f} {change:>+7.1f}%{mark}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} regression(s) over +{threshold:g}%")
+    return 1 if regressions else 0
+
+
+def _ints(arg: str) -> List[int]:
+    return [int(x) for x in arg.split(",")]
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    cmd = args[0] if args else "run"
+    if cmd == "run":
+        run(_ints(args[1]) if len(args) > 1 else DEFAULT_SKUS,
+            _ints(args[2]) if len(args) > 2 else DEFAULT_LINES,
+            args[3] if len(args) > 3 else None)
+    elif cmd == "compare" and len(args) >= 3:
+        threshold = float(args[3]) if len(args) > 3 else DEFAULT_THRESHOLD
+        sys.exit(main_compare(args[1], args[2], threshold))
+    else:
+        print(__doc__)
+        sys.exit(2)
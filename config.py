@@ -40,8 +40,51 @@ class Config:
     PRINTER_PORT = _hw.get("printer_port", "/dev/usb/lp0")
     CASH_DRAWER_PORT = _hw.get("cash_drawer_port", "/dev/ttyUSB0")
     DISPLAY_TYPE = _hw.get("display_type", "USB-HID LCD")
+    # レシートスプーラ: 再接続待ちの上限秒数、ドロワーを開けるのは投入から何秒以内の印刷か
+    PRINTER_RECONNECT_MAX_SEC = _hw.get("printer_reconnect_max_sec", 30)
+    DRAWER_KICK_WINDOW_SEC = _hw.get("drawer_kick_window_sec", 30)
+    # ロゴを NV グラフィックスに登録する場合のキー（2 文字、例 "LG"）。null なら毎回ラスタ送信
+    LOGO_NV_KEY = _hw.get("logo_nv_key")
 
     # ----- その他共通設定 -----
     # 例: ログレベル、タイムアウトなどをここに追加可能
     LOG_LEVEL = SETTINGS.get("log_level", "INFO")
+    # ログは logs/<file> 1 つに JSON Lines で出力。頻繁に通る箇所の詳細ログは sample_every 回に 1 回だけ
+    _logging = SETTINGS.get("logging", {})
+    LOG_FILE = _logging.get("file", "pos.jsonl")
+    LOG_MAX_BYTES = _logging.get("max_bytes", 10 * 1024 * 1024)
+    LOG_BACKUP_COUNT = _logging.get("backup_count", 5)
+    LOG_SAMPLE_EVERY = _logging.get("sample_every", 50)
+
+    # ----- 処理時間の計測 -----
+    # スキャン・会計・印刷・Next Engine 呼び出しのヒストグラムを flush_sec ごとに dir へ追記
+    _metrics = SETTINGS.get("metrics", {})
+    METRICS_DIR = _metrics.get("dir", "data/metrics")
+    METRICS_FLUSH_SEC = _metrics.get("flush_sec", 60)
     API_TIMEOUT = SETTINGS.get("api_timeout", 30)
+    API_CONNECT_TIMEOUT = SETTINGS.get("api_connect_timeout", 5)
+
+    # ----- 在庫同期バッチ設定 -----
+    # enabled=True で会計ごとの在庫送信を max_sales 件 / window_sec 秒単位にまとめる
+    _batch = SETTINGS.get("inventory_batch", {})
+    INVENTORY_BATCH_ENABLED = _batch.get("enabled", False)
+    INVENTORY_BATCH_MAX_SALES = _batch.get("max_sales", 20)
+    INVENTORY_BATCH_WINDOW_SEC = _batch.get("window_sec", 60)
+
+    # ----- 売上アップロード設定 -----
+    # consolidate=True で 1 日分を 1 受注にまとめ、max_rows 行ごとのチャンクで送信
+    _upload = SETTINGS.get("sales_upload", {})
+    SALES_UPLOAD_CONSOLIDATE = _upload.get("consolidate", False)
+    SALES_UPLOAD_MAX_ROWS = _upload.get("max_rows", 500)
+
+    # ----- 商品マスタ同期設定 -----
+    # page_size 件ずつ workers 並列で取得。POS は refresh_interval_sec ごとにマスタの更新を確認
+    _goods_sync = SETTINGS.get("goods_sync", {})
+    GOODS_SYNC_PAGE_SIZE = _goods_sync.get("page_size", 1000)
+    GOODS_SYNC_WORKERS = _goods_sync.get("workers", 4)
+    GOODS_SYNC_FIELDS = _goods_sync.get(
+        "fields",
+        "goods_id,goods_name,goods_selling_price,goods_6_item,"
+        "goods_deleted_flag,goods_last_modified_date",
+    )
+    GOODS_REFRESH_INTERVAL_SEC = _goods_sync.get("refresh_interval_sec", 60)
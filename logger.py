@@ -1,46 +1,135 @@
 # logger.py
-
+"""
+アプリ共通のロガー。
+・ログ呼び出しはキューに積むだけで、整形と書き込みはリスナースレッドが行う（会計処理を待たせない）
+・出力先はコンソールと、全モジュール共通の JSON Lines ファイル logs/pos.jsonl（ローテート）
+・頻繁に通る箇所の詳細ログは sample() で間引く
+・set_log_path() でファイルの出力先を切り替えられる（テストでは一時ディレクトリに向ける）
+"""
+import atexit
+import itertools
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from config import Config
 
 # ログ出力ディレクトリ
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
+LOG_PATH = os.path.join(LOG_DIR, Config.LOG_FILE)
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+_counters = {}
+
+
+class JsonFormatter(logging.Formatter):
+    """1 レコード 1 行の JSON（ts / level / logger / thread / msg / exc）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _EnqueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同一プロセス内のキューなので、メッセージの組み立ても例外の整形もリスナー側に任せる
+        # （引数に渡したオブジェクトは、書き込まれるまで変更しないこと）
+        return record
+
+
+def _file_handler(path: str, level: int) -> logging.Handler:
+    """ファイル出力（全モジュール共通・ローテーション）"""
+    fh = RotatingFileHandler(
+        filename=path,
+        maxBytes=Config.LOG_MAX_BYTES,
+        backupCount=Config.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,  # 何も書かないプロセス（import だけのサブプロセス等）ではファイルを作らない
+    )
+    fh.setLevel(level)
+    fh.setFormatter(JsonFormatter())
+    return fh
+
+
+def set_log_path(path: str):
+    """ファイルの出力先を path に切り替える（それまでのレコードは前のファイルに書き切る）"""
+    global LOG_PATH
+    with _lock:
+        LOG_PATH = path
+        if _listener is None:
+            return
+        _listener.stop()
+        console, old = _listener.handlers
+        _listener.handlers = (console, _file_handler(path, old.level))
+        old.close()
+        _listener.start()
+
+
+def _queue_handler() -> QueueHandler:
+    global _handler, _listener
+    with _lock:
+        if _handler is None:
+            level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
+            q = queue.SimpleQueue()
+
+            # コンソール出力
+            ch = logging.StreamHandler()
+            ch.setLevel(level)
+            ch.setFormatter(logging.Formatter("%(asctime)s [%(name)s] %(levelname)s: %(message)s"))
+
+            _listener = QueueListener(q, ch, _file_handler(LOG_PATH, level),
+                                      respect_handler_level=True)
+            _listener.start()
+            # 終了時にキューに残ったレコードを書き切る
+            atexit.register(_listener.stop)
+            _handler = _EnqueueHandler(q)
+    return _handler
+
+
+def flush():
+    """キューに積まれたレコードをすべて書き込むまで待つ"""
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+
+def sample(key: str, every: int = None) -> bool:
+    """
+    key ごとに呼び出し回数を数え、every 回に 1 回（初回を含む）だけ True を返す。
+    every を省略すると Config.LOG_SAMPLE_EVERY。例: if sample("receipt_job"): log.debug(...)
+    """
+    every = every or Config.LOG_SAMPLE_EVERY
+    counter = _counters.get(key)
+    if counter is None:
+        counter = _counters.setdefault(key, itertools.count())
+    return next(counter) % every == 0
 
 
 def get_logger(name: str) -> logging.Logger:
     """
     指定した名前のロガーを取得し、共通設定を適用する。
-    コンソールとファイル（ローテート）へ出力します。
+    出力はキュー経由でコンソールと logs/pos.jsonl に書き込みます。
     """
     logger = logging.getLogger(name)
     if not logger.handlers:
-        # ログレベル
-        level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
-        logger.setLevel(level)
-
-        # フォーマット
-        fmt = "%(asctime)s [%(name)s] %(levelname)s: %(message)s"
-        formatter = logging.Formatter(fmt)
-
-        # コンソール出力
-        ch = logging.StreamHandler()
-        ch.setLevel(level)
-        ch.setFormatter(formatter)
-        logger.addHandler(ch)
-
-        # ファイル出力（ローテーション）
-        fh = RotatingFileHandler(
-            filename=os.path.join(LOG_DIR, f"{name}.log"),
-            maxBytes=10 * 1024 * 1024,  # 10MiB ごとにローテート
-            backupCount=5,  # 古いログを 5 世代まで保持
-            encoding="utf-8",
-        )
-        fh.setLevel(level)
-        fh.setFormatter(formatter)
-        logger.addHandler(fh)
-
+        logger.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
+        logger.addHandler(_queue_handler())
+        # root に basicConfig 済みでも、呼び出し元のスレッドで書き込まない
+        logger.propagate = False
     return logger
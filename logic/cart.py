@@ -0,0 +1,195 @@
+# logic/cart.py
+"""
+会計中のカート（明細と割引のモデル）。
+・明細は会計ごとに一意な line_id を持ち、割引は表示位置ではなく line_id に付く
+・同じ商品コードを続けてスキャンすると既存の明細の数量を増やす（未登録商品は毎回別の明細）。
+  ただし既存の明細に個別割引が付いていれば、割引が新しい分に及ばないよう別の明細にする
+・取り消し（undo_last）はスキャン・割引の操作履歴を新しい順にたどる
+・合計は DiscountManager の差分更新で求める（line_id をそのまま明細番号に使い、
+  取り除いた明細は数量 0 として残すので番号がずれない）
+・変更は on_change(event, obj) で通知し、画面側は差分だけを反映する
+  event: line_added / line_changed / line_removed / item_discount_added / item_discount_removed /
+         order_discount_added / order_discount_removed / cleared
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from logger import get_logger
+from logic.discount_manager import DiscountManager
+
+log = get_logger(__name__)
+
+
+class CartLine:
+    __slots__ = ("line_id", "goods_id", "name", "price", "quantity", "discounts")
+
+    def __init__(self, line_id: int, goods_id: str, name: str, price: int, quantity: int = 1):
+        self.line_id = line_id
+        self.goods_id = goods_id
+        self.name = name
+        self.price = price
+        self.quantity = quantity
+        self.discounts: List["CartDiscount"] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        """売上レコード（cart）の 1 行"""
+        return {"goods_id": self.goods_id, "name": self.name, "price": self.price,
+                "quantity": self.quantity}
+
+
+class CartDiscount:
+    """割引 1 件。line_id が None なら全体割引。amount は表示用の値引き額"""
+    __slots__ = ("line_id", "kind", "value", "amount", "entry")
+
+    def __init__(self, line_id: Optional[int], kind: str, value, amount, entry: Dict[str, Any]):
+        self.line_id = line_id
+        self.kind = kind
+        self.value = value
+        self.amount = amount
+        self.entry = entry
+
+
+class Cart:
+    def __init__(self, on_change: Optional[Callable[[str, Any], None]] = None):
+        self.on_change = on_change
+        self.discounts = DiscountManager()
+        self._lines: Dict[int, CartLine] = {}
+        self._by_code: Dict[str, int] = {}
+        self.order_discounts: List[CartDiscount] = []
+        # 操作履歴: ("scan", CartLine) / ("discount", CartDiscount)
+        self._actions: List[Tuple[str, Any]] = []
+
+    def _notify(self, event: str, obj=None):
+        if self.on_change is not None:
+            self.on_change(event, obj)
+
+    # ――――― 参照 ―――――
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[CartLine]:
+        return iter(self._lines.values())
+
+    def line(self, line_id: int) -> CartLine:
+        return self._lines[line_id]
+
+    @property
+    def total(self):
+        return self.discounts.total
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [line.to_dict() for line in self._lines.values()]
+
+    # ――――― 明細 ―――――
+    def add(self, goods_id: str, name: str, price: int) -> CartLine:
+        """
+        明細を追加（同じ商品コードの割引無しの明細があれば数量を 1 増やす）して、その明細を返す
+        """
+        line_id = self._by_code.get(goods_id) if goods_id else None
+        if line_id is not None and not self._lines[line_id].discounts:
+            line = self._lines[line_id]
+            line.quantity += 1
+            self.discounts.set_quantity(line_id, line.quantity)
+            self._actions.append(("scan", line))
+            self._notify("line_changed", line)
+            return line
+        line_id = self.discounts.add_item(price)
+        line = CartLine(line_id, goods_id, name, price)
+        self._lines[line_id] = line
+        if goods_id:
+            self._by_code[goods_id] = line_id
+        self._actions.append(("scan", line))
+        self._notify("line_added", line)
+        return line
+
+    def remove(self, line_id: int):
+        """明細をその割引ごと取り除く"""
+        line = self._lines.pop(line_id)
+        if self._by_code.get(line.goods_id) == line_id:
+            del self._by_code[line.goods_id]
+        for disc in line.discounts:
+            self.discounts.remove_item_discount(disc.entry)
+        self.discounts.set_quantity(line_id, 0)
+        self._notify("line_removed", line)
+
+    def decrement(self, line_id: int):
+        """数量を 1 減らす（1 なら明細を取り除く）"""
+        line = self._lines[line_id]
+        if line.quantity <= 1:
+            self.remove(line_id)
+            return
+        line.quantity -= 1
+        self.discounts.set_quantity(line_id, line.quantity)
+        self._notify("line_changed", line)
+
+    # ――――― 割引 ―――――
+    def discount_line(self, line_id: int, kind: str, value) -> CartDiscount:
+        """明細に個別割引（kind: fixed=円 / percent=％）を付ける"""
+        line = self._lines[line_id]
+        if kind == "fixed":
+            entry = self.discounts.apply_item_discount(line_id, value)
+            amount = int(value)
+        else:
+            entry = self.discounts.apply_item_percent(line_id, value)
+            amount = int(line.price * value / 100 + 0.5)
+        disc = CartDiscount(line_id, kind, value, amount, entry)
+        line.discounts.append(disc)
+        self._actions.append(("discount", disc))
+        self._notify("item_discount_added", disc)
+        return disc
+
+    def discount_order(self, kind: str, value) -> CartDiscount:
+        """全体割引（kind: fixed=円 / percent=％）を付ける"""
+        before = self.discounts.total
+        if kind == "fixed":
+            entry = self.discounts.apply_order_discount(value)
+        else:
+            entry = self.discounts.apply_order_percent(value)
+        disc = CartDiscount(None, kind, value, before - self.discounts.total, entry)
+        self.order_discounts.append(disc)
+        self._actions.append(("discount", disc))
+        self._notify("order_discount_added", disc)
+        return disc
+
+    def remove_discount(self, disc: CartDiscount):
+        if disc.line_id is None:
+            self.order_discounts.remove(disc)
+            self.discounts.remove_order_discount(disc.entry)
+            self._notify("order_discount_removed", disc)
+        else:
+            self._lines[disc.line_id].discounts.remove(disc)
+            self.discounts.remove_item_discount(disc.entry)
+            self._notify("item_discount_removed", disc)
+
+    # ――――― 取り消し ―――――
+    def _live(self, kind: str, obj) -> bool:
+        """履歴の対象が、ほかの操作で取り除かれずにまだカートにあるか"""
+        if kind == "scan":
+            return self._lines.get(obj.line_id) is obj
+        if obj.line_id is None:
+            return obj in self.order_discounts
+        line = self._lines.get(obj.line_id)
+        return line is not None and obj in line.discounts
+
+    def undo_last(self) -> bool:
+        """
+        最後の操作を 1 つ取り消す（スキャンは数量 1 減、割引はその割引を外す）。
+        明細や割引を直接消した分の履歴は読み飛ばす。取り消すものが無ければ False
+        """
+        while self._actions:
+            kind, obj = self._actions.pop()
+            if not self._live(kind, obj):
+                continue
+            if kind == "scan":
+                self.decrement(obj.line_id)
+            else:
+                self.remove_discount(obj)
+            return True
+        return False
+
+    def clear(self):
+        self._lines.clear()
+        self._by_code.clear()
+        self._actions.clear()
+        self.order_discounts.clear()
+        self.discounts.clear()
+        self._notify("cleared")
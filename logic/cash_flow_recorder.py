@@ -1,54 +1,55 @@
 # logic/cash_flow_recorder.py
-from pathlib import Path
+from datetime import datetime
+from typing import Optional, Tuple
 
 from logger import get_logger
+from logic.sales_journal import SalesJournal
 from utils.date_utils import get_current_timestamp
-from utils.file_utils import ensure_dir, save_json
 
 log = get_logger(__name__)
 
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _timestamp(timestamp: Optional[datetime]) -> str:
+    """記帳時刻（指定が無ければ現在時刻）を出納帳の形式で返す"""
+    return timestamp.strftime(TS_FORMAT) if timestamp else get_current_timestamp(fmt=TS_FORMAT)
+
 
 class CashFlowRecorder:
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", journal: Optional[SalesJournal] = None):
         """
         data_dir: 取引データ保存ルートディレクトリ。
-        入金／出金は data/cashflow/YYYYMM/ に JSON ファイルで保存します。
+        入金／出金は売上ジャーナル（data/journal/sales.db）の現金出納帳に記帳します。
+        journal: 共有する SalesJournal（省略時は data_dir のジャーナルを開く）
         """
-        self.data_dir = Path(data_dir)
+        self.journal = journal or SalesJournal(data_dir)
 
-    def _write(self, record: dict, prefix: str) -> str:
+    def _write(self, kind: str, amount: float, timestamp: Optional[datetime]) -> int:
         """
-        レコードを JSON ファイルとして保存し、ファイルパスを返します。
+        出納帳に記帳し、記帳後のドロアー残高（理論値）を返します。
         """
-        # タイムスタンプ（YYYYMMDD_HHMMSS）と年月ディレクトリ（YYYYMM）を取得
-        ts = get_current_timestamp(fmt="%Y%m%d_%H%M%S")
-        ym = get_current_timestamp(fmt="%Y%m")
-        dir_path = self.data_dir / "cashflow" / ym
-
-        # ディレクトリ作成
-        ensure_dir(str(dir_path))
-
-        # ファイル名生成と保存
-        fname = f"{prefix}_{ts}.json"
-        path = dir_path / fname
-        save_json(str(path), record)
-        log.info(f"Recorded {prefix}: {path}")
-        return str(path)
-
-    def record_deposit(self, amount: float) -> str:
-        """現金入金を記録し、ファイルパスを返します。"""
-        rec = {
-            "type": "deposit",
-            "timestamp": get_current_timestamp(fmt="%Y-%m-%dT%H:%M:%S"),
-            "amount": amount,
-        }
-        return self._write(rec, "deposit")
-
-    def record_withdraw(self, amount: float) -> str:
-        """現金出金を記録し、ファイルパスを返します。"""
-        rec = {
-            "type": "withdraw",
-            "timestamp": get_current_timestamp(fmt="%Y-%m-%dT%H:%M:%S"),
-            "amount": amount,
-        }
-        return self._write(rec, "withdraw")
+        ts = _timestamp(timestamp)
+        balance = self.journal.add_cash_flow(ts, kind, amount)
+        log.info(f"Recorded {kind}: {int(amount)} at {ts} (balance {balance})")
+        return balance
+
+    def record_deposit(self, amount: float, timestamp: Optional[datetime] = None) -> int:
+        """現金入金を記録し、記帳後の残高を返します。"""
+        return self._write("deposit", amount, timestamp)
+
+    def record_withdraw(self, amount: float, timestamp: Optional[datetime] = None) -> int:
+        """現金出金を記録し、記帳後の残高を返します。"""
+        return self._write("withdraw", amount, timestamp)
+
+    def expected_cash(self) -> int:
+        """ドロアーにあるはずの現金（入出金・現金売上・お釣りの累計）"""
+        return self.journal.cash_balance()
+
+    def record_count(self, counted: float, timestamp: Optional[datetime] = None) -> Tuple[int, int]:
+        """点検（実査額の記帳）。(理論残高, 過不足) を返し、過不足は プラス＝過剰 / マイナス＝不足"""
+        ts = _timestamp(timestamp)
+        expected, diff = self.journal.count_cash(ts, counted)
+        log.info(f"Cash count at {ts}: counted {int(counted)}, expected {expected}, "
+                 f"over/short {diff}")
+        return expected, diff
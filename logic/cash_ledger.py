@@ -0,0 +1,100 @@
+# logic/cash_ledger.py
+"""
+現金出納帳（ドロアー内の現金の追記専用台帳）。売上ジャーナルと同じ SQLite に置く。
+・入金 / 出金 / 現金売上の受取額 / お釣り / 点検（実査との差額）を 1 行ずつ追記
+・各行に記帳後の残高（理論上のドロアー現金）を持つので、現在残高は最後の 1 行を読むだけ
+・残高は INSERT 文の中で直前の行から計算するので、複数の書き手がいても食い違わない
+・旧形式（data/cashflow/YYYYMM/ の 1 件 1 JSON）は出納帳の初期化時に取り込む
+"""
+import os
+import sqlite3
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from logger import get_logger
+from utils.file_utils import load_json
+
+log = get_logger(__name__)
+
+CASH_METHODS = ("現金", "cash")
+# 売上以外の入出金（日別集計の cash_in / cash_out になる種別）
+FLOW_KINDS = ("deposit", "withdraw")
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cash_ledger (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts      TEXT NOT NULL,
+    day     TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    amount  INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    ref     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cash_ledger_day ON cash_ledger(day, seq);
+"""
+
+_LAST_BALANCE = "COALESCE((SELECT balance FROM cash_ledger ORDER BY seq DESC LIMIT 1), 0)"
+
+
+def sale_entries(record: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """売上 1 件分の (種別, 金額)。現金の受取額とお釣り（負）、支払情報の無い旧データは全額現金"""
+    payments = record.get("payments") or []
+    if not payments:
+        due = int(record.get("total_due", 0))
+        return [("sale", due)] if due else []
+    received = sum(int(p.get("amount", 0)) for p in payments if p.get("method") in CASH_METHODS)
+    change = int(record.get("change", 0))
+    entries = []
+    if received:
+        entries.append(("sale", received))
+    if change:
+        entries.append(("change", -change))
+    return entries
+
+
+def append_entry(conn: sqlite3.Connection, ts: str, kind: str, amount: int,
+                 ref: Optional[str] = None) -> int:
+    """1 行追記して記帳後の残高を返す（呼び出し側のトランザクション内で実行）"""
+    cur = conn.execute(
+        "INSERT INTO cash_ledger (ts, day, kind, amount, balance, ref) "
+        f"SELECT ?, ?, ?, ?, {_LAST_BALANCE} + ?, ?",
+        (ts, ts[:10].replace("-", ""), kind, int(amount), int(amount), ref),
+    )
+    row = conn.execute("SELECT balance FROM cash_ledger WHERE seq = ?", (cur.lastrowid,))
+    return row.fetchone()[0]
+
+
+def append_count(conn: sqlite3.Connection, ts: str, counted: int) -> Tuple[int, int]:
+    """
+    実査額 counted で点検を記帳し、(理論残高, 過不足) を返す。
+    点検行の残高は実査額になり、以降はそこから積み上げる
+    """
+    cur = conn.execute(
+        "INSERT INTO cash_ledger (ts, day, kind, amount, balance, ref) "
+        f"SELECT ?, ?, 'count', ? - {_LAST_BALANCE}, ?, NULL",
+        (ts, ts[:10].replace("-", ""), int(counted), int(counted)),
+    )
+    row = conn.execute("SELECT amount FROM cash_ledger WHERE seq = ?", (cur.lastrowid,))
+    diff = row.fetchone()[0]
+    return int(counted) - diff, diff
+
+
+def balance(conn: sqlite3.Connection) -> int:
+    return conn.execute(f"SELECT {_LAST_BALANCE}").fetchone()[0]
+
+
+def iter_cash_flows(data_dir="data") -> Iterator[Dict[str, Any]]:
+    """旧形式の入出金記録 data_dir/cashflow/YYYYMM/*.json を返す"""
+    root = os.path.join(data_dir, "cashflow")
+    if not os.path.isdir(root):
+        return
+    for ym in sorted(os.listdir(root)):
+        month_dir = os.path.join(root, ym)
+        if not os.path.isdir(month_dir):
+            continue
+        for entry in sorted(os.scandir(month_dir), key=lambda e: e.name):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                yield load_json(entry.path)
+            except Exception as e:
+                log.error(f"Unreadable cash flow record {entry.path}: {e}")
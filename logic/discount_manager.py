@@ -3,43 +3,181 @@
 割引ロジックを管理するモジュール
 ・固定金額割引は合計額を単純加算で差し引く
 ・％割引は逐次乗算方式で適用
+・明細ごとの割引後単価と小計を保持し、明細・割引の追加／取り消しのたびに差分だけ更新する
+  （全体割引は件数が少ないので、合計の参照時に小計から順に適用し直す）
 """
 
 
+def _apply(price, d):
+    """割引 1 件を適用した金額（calculate_total と同じ丸め）"""
+    if d["type"] == "fixed":
+        return max(0, price - d["value"])
+    return int(price * (1 - d["value"]) + 0.5)
+
+
 class DiscountManager:
     def __init__(self):
         # 個別商品への割引: list of dict {type:'fixed'|'percent', index:int, value:float}
         self.item_discounts = []
         # 注文全体への割引: list of dict {type:'fixed'|'percent', value:float}
         self.order_discounts = []
+        # 明細ごとの定価・数量・割引後単価
+        self._base = []
+        self._qty = []
+        self._eff = []
+        # 明細番号 → その明細への個別割引（適用順）。明細がまだ無い番号の割引も保持する
+        self._by_line = {}
+        self._subtotal = 0
+        self._total = None  # 全体割引適用後の合計（None は再計算が必要）
+
+    # ――――― 明細 ―――――
+    def _line_price(self, index):
+        price = self._base[index]
+        for d in self._by_line.get(index, ()):
+            price = _apply(price, d)
+        return price
+
+    def add_item(self, price, quantity=1):
+        """明細を末尾に追加し、その明細番号を返す"""
+        index = len(self._base)
+        self._base.append(price)
+        self._qty.append(quantity)
+        eff = self._line_price(index)
+        self._eff.append(eff)
+        self._subtotal += eff * quantity
+        self._total = None
+        return index
+
+    def remove_item(self, index=-1):
+        """明細を取り除く（末尾以外を取り除くと、以降の明細番号は 1 つずつ詰まる）"""
+        if index < 0:
+            index += len(self._base)
+        self._subtotal -= self._eff[index] * self._qty[index]
+        del self._base[index]
+        del self._qty[index]
+        del self._eff[index]
+        # 割引は明細番号に付くので、詰めた明細は割引後単価を求め直す
+        for i in range(index, len(self._base)):
+            self._update_line(i)
+        self._total = None
+
+    def set_quantity(self, index, quantity):
+        self._subtotal += self._eff[index] * (quantity - self._qty[index])
+        self._qty[index] = quantity
+        self._total = None
+
+    def _update_line(self, index):
+        eff = self._line_price(index)
+        self._subtotal += (eff - self._eff[index]) * self._qty[index]
+        self._eff[index] = eff
+
+    def line_price(self, index):
+        """明細の割引後単価"""
+        return self._eff[index]
+
+    # ――――― 割引 ―――――
+    def _add_item_discount(self, d):
+        self.item_discounts.append(d)
+        self._by_line.setdefault(d["index"], []).append(d)
+        index = d["index"]
+        if 0 <= index < len(self._base):
+            eff = _apply(self._eff[index], d)
+            self._subtotal += (eff - self._eff[index]) * self._qty[index]
+            self._eff[index] = eff
+            self._total = None
+        return d
 
     def apply_item_discount(self, index, amount):
         """
         カート内 index のアイテム価格から固定金額 amount を差し引く
         """
-        self.item_discounts.append({"type": "fixed", "index": index, "value": amount})
+        return self._add_item_discount({"type": "fixed", "index": index, "value": amount})
 
     def apply_item_percent(self, index, percent):
         """
         カート内 index のアイテム価格に percent(%) の割引を逐次乗算方式で適用
         """
-        self.item_discounts.append({"type": "percent", "index": index, "value": percent / 100.0})
+        return self._add_item_discount({"type": "percent", "index": index,
+                                        "value": percent / 100.0})
+
+    def pop_item_discount(self):
+        """最後に適用した個別割引を取り消して返す"""
+        d = self.item_discounts.pop()
+        index = d["index"]
+        self._by_line[index].pop()
+        if 0 <= index < len(self._base):
+            self._update_line(index)
+            self._total = None
+        return d
+
+    def remove_item_discount(self, d):
+        """適用済みの個別割引 d（item_discounts の要素）を取り消す"""
+        self.item_discounts.pop(next(i for i, x in enumerate(self.item_discounts) if x is d))
+        line = self._by_line[d["index"]]
+        line.pop(next(i for i, x in enumerate(line) if x is d))
+        if 0 <= d["index"] < len(self._base):
+            self._update_line(d["index"])
+            self._total = None
+
+    def remove_order_discount(self, d):
+        """適用済みの全体割引 d（order_discounts の要素）を取り消す"""
+        self.order_discounts.pop(next(i for i, x in enumerate(self.order_discounts) if x is d))
+        self._total = None
 
     def apply_order_discount(self, amount):
         """
         注文全体から固定金額 amount を差し引く
         """
-        self.order_discounts.append({"type": "fixed", "value": amount})
+        d = {"type": "fixed", "value": amount}
+        self.order_discounts.append(d)
+        self._total = None
+        return d
 
     def apply_order_percent(self, percent):
         """
         注文全体に percent(%) の割引を逐次乗算方式で適用
         """
-        self.order_discounts.append({"type": "percent", "value": percent / 100.0})
+        d = {"type": "percent", "value": percent / 100.0}
+        self.order_discounts.append(d)
+        self._total = None
+        return d
+
+    def pop_order_discount(self):
+        """最後に適用した全体割引を取り消して返す"""
+        self._total = None
+        return self.order_discounts.pop()
+
+    def clear(self):
+        """明細・割引をすべて消す（次の会計の開始）"""
+        self.item_discounts.clear()
+        self.order_discounts.clear()
+        self._base.clear()
+        self._qty.clear()
+        self._eff.clear()
+        self._by_line.clear()
+        self._subtotal = 0
+        self._total = None
+
+    # ――――― 合計 ―――――
+    @property
+    def subtotal(self):
+        """個別割引適用後、全体割引前の小計"""
+        return self._subtotal
+
+    @property
+    def total(self):
+        """アイテム単位の割引 + 全体割引を適用した最終合計（calculate_total と同じ値）"""
+        if self._total is None:
+            total = self._subtotal
+            for d in self.order_discounts:
+                total = _apply(total, d)
+            self._total = total
+        return self._total
 
     def calculate_total(self, cart):
         """
         アイテム単位の割引 + 全体割引を適用した最終合計を返す
+        （cart から毎回計算し直す従来の方式。通常は total を使う）
         """
         # Deep copy prices to avoid mutating cart
         prices = [item["price"] for item in cart]
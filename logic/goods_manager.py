@@ -1,8 +1,17 @@
 # logic/goods_manager.py
 
 import os
+import threading
+from bisect import bisect_left
 
-from utils.file_utils import load_json
+from logger import get_logger
+from logic.goods_search import NameIndex
+from logic.goods_snapshot import load_snapshot
+
+log = get_logger(__name__)
+
+# 前方一致の上限キー用（どのコード文字よりも大きい）
+_PREFIX_END = "\U0010ffff"
 
 
 class GoodsManager:
@@ -11,29 +20,128 @@ class GoodsManager:
         base = os.path.dirname(os.path.dirname(__file__))
         self.data_dir = data_dir or os.path.join(base, "data")
         self.goods_file = os.path.join(self.data_dir, "goods_data.json")
-        self.index = {}
-        self.fallback = {}
+        self.cache_dir = os.path.join(self.data_dir, "cache", "goods")
+        # 商品マスタ（logic.goods_snapshot.GoodsSnapshot、mmap）。
+        # 差し替えは 1 回の代入で行い、検索側は呼び出しごとに 1 回だけ参照する
+        self.snapshot = None
+        self._reload_lock = threading.Lock()
+        # all_goods() のリスト (スナップショット, list)
+        self._all = (None, [])
+        # 前方一致の直前の (スナップショット, 入力, 範囲)
+        self._last_prefix = (None, "", 0, 0)
+        # 商品名検索用 (スナップショット, NameIndex) の組。差し替えは 1 回の代入で行う
+        self._names = (None, NameIndex([]))
+        self._name_thread = None
 
     def load_index(self):
-        """JSONファイルから商品マスタを読み込み、コード→商品辞書を構築"""
-        with open(self.goods_file, "r", encoding="utf-8") as f:
-            goods_list = load_json(f)
-        self.index.clear()
-        self.fallback.clear()
-        for item in goods_list:
-            code6 = item.get("goods_6_item")
-            gid = item.get("goods_id")
-            if code6:
-                self.index[code6.lower()] = item
-            if gid:
-                self.fallback[gid.lower()] = item
+        """商品マスタのスナップショットを開く（JSON が更新されていれば作り直す）"""
+        with self._reload_lock:
+            self._swap(load_snapshot(self.goods_file, self.cache_dir))
+
+    def refresh(self):
+        """
+        goods_data.json の更新時刻またはサイズが変わっていれば読み直して差し替える。
+        読み直し中も検索は古いマスタで動き続ける。読み直したら True
+        """
+        snap = self.snapshot
+        if snap is not None:
+            try:
+                st = os.stat(self.goods_file)
+            except OSError:
+                return False
+            if (st.st_mtime_ns, st.st_size) == (snap.src_mtime_ns, snap.src_size):
+                return False
+        with self._reload_lock:
+            if self.snapshot is not snap:
+                return True  # 待っている間に別スレッドが読み直した
+            try:
+                new = load_snapshot(self.goods_file, self.cache_dir)
+            except Exception as e:
+                # 書き込み途中などで読めなければ今のマスタを使い続ける
+                log.error(f"Goods master reload failed, keeping current index: {e}")
+                return False
+            self._swap(new)
+        log.info(f"Goods master reloaded: {len(new)} items")
+        return True
+
+    def _swap(self, snap):
+        self.snapshot = snap
+        # 商品名索引は件数が多いと時間がかかるのでバックグラウンドで構築
+        self._name_thread = threading.Thread(
+            target=self._build_name_index, args=(snap,), name="goods-name-index", daemon=True
+        )
+        self._name_thread.start()
+
+    def _build_name_index(self, snap):
+        index = NameIndex(snap.names)
+        if snap is self.snapshot:
+            self._names = (snap, index)
+
+    def prefix_search(self, code, limit=10):
+        """
+        コードの前方一致で商品を最大 limit 件返す（コード昇順、重複なし）。
+        直前の入力の続きなら前回の範囲内だけを探すので、1 文字ごとの呼び出しでも軽い。
+        """
+        key = code.strip().lower()
+        snap = self.snapshot
+        if not key or snap is None:
+            return []
+        keys = snap.keys
+        last_snap, last, lo, hi = self._last_prefix
+        if not (last_snap is snap and last and key.startswith(last)):
+            lo, hi = 0, len(keys)
+        lo = bisect_left(keys, key, lo, hi)
+        hi = bisect_left(keys, key + _PREFIX_END, lo, hi)
+        self._last_prefix = (snap, key, lo, hi)
+        results, seen = [], set()
+        rows = snap.key_rows
+        for i in range(lo, hi):
+            row = rows[i]
+            if row in seen:
+                continue
+            seen.add(row)
+            results.append(snap.record(row))
+            if len(results) >= limit:
+                break
+        return results
 
     def lookup(self, code):
         """コード（goods_6_item or goods_id）で検索、なければ None を返す"""
-        key = code.strip().lower()
-        return self.index.get(key) or self.fallback.get(key)
+        snap = self.snapshot
+        if snap is None:
+            return None
+        row = snap.find(code.strip().lower())
+        return snap.record(row) if row is not None else None
+
+    @property
+    def name_index_ready(self):
+        """商品名索引ができていれば True（起動直後の構築中は False）"""
+        return self._names[0] is not None
+
+    def search_name(self, query, limit=20):
+        """
+        商品名の部分一致検索（表記ゆれ吸収・関連度順）で最大 limit 件返す。
+        起動直後で索引がまだ無ければ待たずに [] を返す（name_index_ready で区別できる）。
+        再読込中は古い索引で答える
+        """
+        snap, index = self._names
+        if snap is None:
+            return []
+        return [snap.record(d) for d in index.search(query, limit)]
 
-    def all_goods(self):
-        """全件マスターをリストで返す"""
-        with open(self.goods_file, "r", encoding="utf-8") as f:
-            return load_json(f)
+    def all_goods(self, stream=False):
+        """
+        全件マスターを GoodsRecord のリストで返す（マスタが変わるまで同じリストを使い回す）。
+        stream=True ならリストを作らず 1 件ずつ返すイテレータ（集計・書き出し用）
+        """
+        self.refresh()
+        snap = self.snapshot
+        if snap is None:
+            return iter(()) if stream else []
+        if stream:
+            return iter(snap)
+        cached_snap, goods = self._all
+        if cached_snap is not snap:
+            goods = list(snap)
+            self._all = (snap, goods)
+        return goods
@@ -0,0 +1,78 @@
+# logic/goods_search.py
+"""
+商品名の全文検索（文字 bigram の転置インデックス）。
+・商品名・検索語とも NFKC 正規化（全角英数→半角、半角カナ→全角）、小文字化、カタカナ→ひらがなで揃える
+・空白・記号で区切った各断片の 2 文字組を索引語とし、商品番号の昇順配列（array）で保持
+・検索は索引語のポスティングを短い順に積集合し、語順どおり含むもの・名前が短いものを上位にする
+・全語を含む商品が無い場合は、一致した索引語の数で順位付けした結果を返す
+"""
+import heapq
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List
+
+_SPLIT = re.compile(r"[\s　・:：,，、。/／()（）「」『』【】\[\]<>＜＞\-－]+")
+# カタカナ（ァ〜ヶ）→ ひらがな
+_KANA_FOLD = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize(text: str) -> str:
+    """表記ゆれを吸収した検索用文字列"""
+    return unicodedata.normalize("NFKC", text or "").lower().translate(_KANA_FOLD)
+
+
+def bigrams(text: str) -> List[str]:
+    """正規化済み文字列の断片ごとの 2 文字組（1 文字の断片はそのまま）"""
+    grams = []
+    for part in _SPLIT.split(text):
+        if len(part) == 1:
+            grams.append(part)
+        grams.extend(part[i:i + 2] for i in range(len(part) - 1))
+    return grams
+
+
+class NameIndex:
+    def __init__(self, names: Iterable[str]):
+        """names の並び順がそのまま商品番号（0, 1, 2, ...）になる"""
+        self.names: List[str] = []
+        postings: Dict[str, List[int]] = {}
+        for doc, name in enumerate(names):
+            norm = normalize(name)
+            self.names.append(_SPLIT.sub("", norm))
+            for gram in set(bigrams(norm)):
+                postings.setdefault(gram, []).append(doc)
+        self.postings: Dict[str, array] = {g: array("I", docs) for g, docs in postings.items()}
+
+    def search(self, query: str, limit: int = 20) -> List[int]:
+        """query に合う商品番号を上位 limit 件返す"""
+        norm = normalize(query)
+        grams = set(bigrams(norm))
+        if not grams:
+            return []
+        # ポスティングの短い索引語から順に積集合をとる
+        lists = sorted(((g, self.postings.get(g, ())) for g in grams), key=lambda gp: len(gp[1]))
+        phrase = _SPLIT.sub("", norm)
+        if lists[0][1]:
+            hits = set(lists[0][1])
+            for gram, plist in lists[1:]:
+                if len(hits) * 8 < len(plist):
+                    # 候補が十分絞れたら長いポスティングは走査せず名前を直接確かめる
+                    hits = {d for d in hits if gram in self.names[d]}
+                else:
+                    hits.intersection_update(plist)
+                if not hits:
+                    break
+            if hits:
+                # 語順どおり含むもの → 名前が短いもの → 登録順
+                return heapq.nsmallest(
+                    limit, hits,
+                    key=lambda d: (phrase not in self.names[d], len(self.names[d]), d),
+                )
+        # 全語一致が無ければ、一致した索引語の多い順
+        scores = Counter()
+        for _, plist in lists:
+            scores.update(plist)
+        return [d for d, _ in heapq.nsmallest(
+            limit, scores.items(), key=lambda kv: (-kv[1], len(self.names[kv[0]]), kv[0]))]
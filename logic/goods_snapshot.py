@@ -0,0 +1,214 @@
+# logic/goods_snapshot.py
+"""
+商品マスタのバイナリスナップショット（列指向・mmap で開く）。
+・goods_data.json を 1 回だけ解析し、価格は整数円に変換して保存
+・起動時はファイルを mmap するだけで、文字列は参照されたときにだけデコード
+・コード（goods_6_item / goods_id を小文字化）は昇順に並べて保存し、二分探索で検索
+・ファイル名に元 JSON の更新時刻とサイズを含め、JSON が変わったら作り直す
+  （Windows では mmap 中のファイルを置き換えられないため、上書きせず別名で作る）
+
+レイアウト（リトルエンディアン）:
+  ヘッダー  magic(8) 件数 N(u32) キー数 M(u32) 元JSON mtime_ns(u64) 元JSON サイズ(u64)
+  区画表    区画ごとの開始位置(u64) × 10
+  区画      価格 i32[N] / 文字列オフセット u32[N+1] ×3 / キーオフセット u32[M+1] /
+            キー→行 u32[M] / 文字列本体 ×3 / キー本体
+"""
+import glob
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional
+
+from logger import get_logger
+from utils.file_utils import ensure_dir, load_json
+
+log = get_logger(__name__)
+
+MAGIC = b"SKGOODS1"
+_HEADER = struct.Struct("<8sIIQQ")
+_TABLE = struct.Struct("<10Q")
+_STR_FIELDS = ("goods_id", "goods_6_item", "goods_name")
+
+
+def parse_price(value) -> int:
+    """'99000.00' などの価格文字列を整数円に"""
+    try:
+        return int(float(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class GoodsRecord:
+    """商品 1 件。従来の dict と同じキーで get() / [] でも参照できる"""
+    __slots__ = ("goods_id", "goods_6_item", "goods_name", "price")
+
+    def __init__(self, goods_id: str, goods_6_item: str, goods_name: str, price: int):
+        self.goods_id = goods_id
+        self.goods_6_item = goods_6_item
+        self.goods_name = goods_name
+        self.price = price
+
+    def get(self, key: str, default=None):
+        if key == "goods_selling_price":
+            return self.price
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __getitem__(self, key: str):
+        if key != "goods_selling_price" and key not in self.__slots__:
+            raise KeyError(key)
+        return self.get(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "goods_id": self.goods_id,
+            "goods_name": self.goods_name,
+            "goods_6_item": self.goods_6_item,
+            "goods_selling_price": self.price,
+        }
+
+    def __repr__(self):
+        return f"GoodsRecord({self.goods_id!r}, {self.goods_name!r}, {self.price})"
+
+
+class StrColumn:
+    """オフセット配列＋UTF-8 本体で表した文字列の列（添字アクセス時にデコード）"""
+    __slots__ = ("_offs", "_blob")
+
+    def __init__(self, offs, blob):
+        self._offs = offs
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offs) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._blob[self._offs[i]:self._offs[i + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        offs, blob = self._offs, self._blob
+        for i in range(len(offs) - 1):
+            yield str(blob[offs[i]:offs[i + 1]], "utf-8")
+
+
+def _pack_strings(values: List[str]):
+    offs = array("I", [0])
+    blob = bytearray()
+    for v in values:
+        blob += v.encode("utf-8")
+        offs.append(len(blob))
+    return offs, bytes(blob)
+
+
+def write_snapshot(goods_list: List[Dict[str, Any]], path: str, src_mtime_ns: int = 0,
+                   src_size: int = 0):
+    """商品リストからスナップショットを書き出す"""
+    cols = {f: [str(item.get(f) or "") for item in goods_list] for f in _STR_FIELDS}
+    prices = array("i", (parse_price(item.get("goods_selling_price")) for item in goods_list))
+    # goods_6_item を goods_id より優先、同じコードは後の行を優先（従来の dict 索引と同じ）
+    entries = []
+    for row, (gid, code6) in enumerate(zip(cols["goods_id"], cols["goods_6_item"])):
+        if code6:
+            entries.append((code6.lower(), 0, -row))
+        if gid:
+            entries.append((gid.lower(), 1, -row))
+    entries.sort()
+    key_offs, key_blob = _pack_strings([k for k, _, _ in entries])
+    key_rows = array("I", (-r for _, _, r in entries))
+    packed = [_pack_strings(cols[f]) for f in _STR_FIELDS]
+
+    sections = [prices.tobytes()]
+    sections += [offs.tobytes() for offs, _ in packed]
+    sections += [key_offs.tobytes(), key_rows.tobytes()]
+    sections += [blob for _, blob in packed] + [key_blob]
+    pos = _HEADER.size + _TABLE.size
+    starts = []
+    body = bytearray()
+    for sec in sections:
+        starts.append(pos + len(body))
+        body += sec
+        body += b"\0" * (-len(body) % 8)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(goods_list), len(entries), src_mtime_ns, src_size))
+        f.write(_TABLE.pack(*starts))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class GoodsSnapshot:
+    def __init__(self, path: str):
+        """スナップショットを読み取り専用で mmap する"""
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, m, self.src_mtime_ns, self.src_size = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a goods snapshot: {path}")
+        starts = _TABLE.unpack_from(self._mm, _HEADER.size)
+        mv = memoryview(self._mm)
+
+        def ints(i, count, fmt):
+            size = struct.calcsize(fmt)
+            return mv[starts[i]:starts[i] + count * size].cast(fmt)
+
+        self.count = n
+        self.prices = ints(0, n, "i")
+        str_offs = [ints(1 + k, n + 1, "I") for k in range(3)]
+        key_offs = ints(4, m + 1, "I")
+        self.key_rows = ints(5, m, "I")
+        blobs = [mv[starts[6 + k]:starts[6 + k] + str_offs[k][n]] for k in range(3)]
+        self.goods_id, self.goods_6_item, self.names = (
+            StrColumn(offs, blob) for offs, blob in zip(str_offs, blobs)
+        )
+        self.keys = StrColumn(key_offs, mv[starts[9]:starts[9] + key_offs[m]])
+
+    def __len__(self):
+        return self.count
+
+    def record(self, row: int) -> GoodsRecord:
+        return GoodsRecord(self.goods_id[row], self.goods_6_item[row], self.names[row],
+                           self.prices[row])
+
+    def find(self, key: str) -> Optional[int]:
+        """小文字化済みコードの完全一致で行番号を返す"""
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.key_rows[i]
+        return None
+
+    def __iter__(self) -> Iterator[GoodsRecord]:
+        for row in range(self.count):
+            yield self.record(row)
+
+
+def snapshot_path(cache_dir: str, src_mtime_ns: int, src_size: int) -> str:
+    return os.path.join(cache_dir, f"goods_{src_mtime_ns}_{src_size}.snap")
+
+
+def load_snapshot(goods_file: str, cache_dir: str) -> GoodsSnapshot:
+    """goods_file に対応するスナップショットを開く（無い・古い場合は JSON から作る）"""
+    st = os.stat(goods_file)
+    path = snapshot_path(cache_dir, st.st_mtime_ns, st.st_size)
+    if os.path.exists(path):
+        try:
+            return GoodsSnapshot(path)
+        except Exception as e:
+            log.warning(f"Broken goods snapshot {path}, rebuilding: {e}")
+    ensure_dir(cache_dir)
+    with open(goods_file, "r", encoding="utf-8") as f:
+        goods_list = load_json(f)
+    write_snapshot(goods_list, path, st.st_mtime_ns, st.st_size)
+    log.info(f"Goods snapshot written: {path} ({len(goods_list)} items)")
+    # 古いスナップショットを削除（mmap 中で消せないものは次回に回す）
+    for old in glob.glob(os.path.join(cache_dir, "goods_*.snap")):
+        if os.path.abspath(old) != os.path.abspath(path):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return GoodsSnapshot(path)
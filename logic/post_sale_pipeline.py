@@ -0,0 +1,172 @@
+# logic/post_sale_pipeline.py
+"""
+会計確定後の後処理（在庫同期・レシート印刷など）をバックグラウンドで実行するパイプライン。
+・ステージごとに DurableQueue とワーカースレッドを 1 本持つ
+・ステージごとにリトライ（指数バックオフ）とステータスを管理
+・各ジョブの所要時間をログとステータスに記録
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import get_logger, sample
+from utils.durable_queue import DurableQueue
+
+log = get_logger(__name__)
+
+
+class _Stage:
+    def __init__(self, name: str, handler: Callable[[Dict[str, Any]], Any], q: DurableQueue,
+                 broadcast: bool = True,
+                 on_give_up: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.name = name
+        self.handler = handler
+        self.queue = q
+        self.broadcast = broadcast
+        self.on_give_up = on_give_up
+        self.state = "idle"
+        self.done = 0
+        self.failed = 0
+        self.retries = 0
+        self.last_ms: Optional[float] = None
+        self.total_ms = 0.0
+        self.last_error: Optional[str] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        avg = self.total_ms / self.done if self.done else None
+        return {
+            "state": self.state,
+            "pending": self.queue.depth(),
+            "done": self.done,
+            "failed": self.failed,
+            "failed_on_disk": self.queue.failed_count(),
+            "retries": self.retries,
+            "last_ms": self.last_ms,
+            "avg_ms": avg,
+            "last_error": self.last_error,
+        }
+
+
+class PostSalePipeline:
+    def __init__(self, queue_dir="data/queue", max_attempts: int = 3, backoff: float = 2.0):
+        """
+        queue_dir: ステージごとのジョブファイル保存先
+        max_attempts: 1 ジョブあたりの最大試行回数（超えたら failed/ へ退避）
+        backoff: リトライ待ち秒数の底（1 回目 backoff**0, 2 回目 backoff**1 ...）
+        """
+        self.queue_dir = queue_dir
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._stages: Dict[str, _Stage] = {}
+        self._stop = threading.Event()
+
+    def add_stage(self, name: str, handler: Callable[[Dict[str, Any]], Any],
+                  broadcast: bool = True,
+                  on_give_up: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        """
+        ステージを登録。handler は payload を受け取り、失敗時は例外を送出すること。
+        broadcast=False のステージには submit(payload, stage=name) で個別に投入する。
+        on_give_up: 試行回数の上限に達して failed/ に退避したジョブの payload を受け取る
+        """
+        self._stages[name] = _Stage(name, handler, DurableQueue(self.queue_dir, name), broadcast,
+                                    on_give_up)
+
+    def start(self):
+        """各ステージのワーカースレッドを起動（起動済みなら何もしない）"""
+        self._stop.clear()
+        for stage in self._stages.values():
+            if stage.thread and stage.thread.is_alive():
+                continue
+            stage.thread = threading.Thread(
+                target=self._worker, args=(stage,), name=f"post-sale-{stage.name}", daemon=True
+            )
+            stage.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """ワーカーを停止。未処理ジョブはディスクに残り次回起動時に再開される"""
+        self._stop.set()
+        for stage in self._stages.values():
+            if stage.thread:
+                stage.thread.join(timeout)
+
+    def submit(self, payload: Dict[str, Any], stage: Optional[str] = None) -> Dict[str, str]:
+        """
+        ジョブを投入し、ステージ名→ジョブ ID を返す（即時復帰）。
+        stage を省略すると broadcast のステージすべてに投入する
+        """
+        if stage is not None:
+            return {stage: self._stages[stage].queue.put(payload)}
+        return {name: st.queue.put(payload) for name, st in self._stages.items() if st.broadcast}
+
+    def queued(self, stage: str) -> List[Dict[str, Any]]:
+        """stage の未完了ジョブの payload（ディスク上のもの）"""
+        return self._stages[stage].queue.payloads()
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """ステージごとの状態・件数・所要時間を返す"""
+        return {name: st.snapshot() for name, st in self._stages.items()}
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """全ステージのキューが空になるまで待つ（テスト・CLI 用）"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(st.queue.depth() == 0 for st in self._stages.values()):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def _worker(self, stage: _Stage):
+        while not self._stop.is_set():
+            item = stage.queue.get(timeout=0.5)
+            if item is None:
+                continue
+            path, job = item
+            self._run_job(stage, path, job)
+
+    def _run_job(self, stage: _Stage, path, job: Dict[str, Any]):
+        """1 ジョブを成功するか上限に達するまで順番を崩さずに再試行する"""
+        while True:
+            stage.state = "running"
+            start = time.perf_counter()
+            try:
+                stage.handler(job["payload"])
+            except Exception as e:
+                elapsed = (time.perf_counter() - start) * 1000
+                job["attempts"] += 1
+                job["last_error"] = str(e)
+                stage.last_error = str(e)
+                log.warning(
+                    f"[{stage.name}] job {job['id']} attempt {job['attempts']} failed "
+                    f"after {elapsed:.1f} ms: {e}"
+                )
+                if job["attempts"] >= self.max_attempts or self._stop.is_set():
+                    break
+                stage.retries += 1
+                stage.state = "retrying"
+                stage.queue.update(path, job)
+                self._stop.wait(self.backoff ** (job["attempts"] - 1))
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            stage.done += 1
+            stage.last_ms = elapsed
+            stage.total_ms += elapsed
+            stage.state = "idle"
+            stage.queue.ack(path)
+            if sample(f"pipeline.{stage.name}"):
+                log.info("[%s] job %s done in %.1f ms (%d done)",
+                         stage.name, job["id"], elapsed, stage.done)
+            return
+        if self._stop.is_set() and job["attempts"] < self.max_attempts:
+            # 停止要求中は failed にせずディスクに残して次回再開
+            stage.queue.update(path, job)
+            return
+        stage.failed += 1
+        stage.state = "error"
+        stage.queue.fail(path, job)
+        log.error(f"[{stage.name}] job {job['id']} gave up after {job['attempts']} attempts")
+        if stage.on_give_up:
+            try:
+                stage.on_give_up(job["payload"])
+            except Exception as e:
+                log.error(f"[{stage.name}] on_give_up callback failed: {e}", exc_info=True)
@@ -1 +1,127 @@
-# report_generator.py – scaffold file
+# logic/report_generator.py
+"""
+日次／月次レポート。
+・集計項目は 現金売上 / その他売上（支払方法別） / 総合計 / 売上以外の入出金
+・通常は売上ジャーナルの日別集計を期間分だけ合算（日次は 1 行、月次は日数分の行）
+・scan() は売上と現金出納帳の元データを 1 回ずつ順次走査して同じ結果を作る（集計の検証用）
+・印字は ReceiptBuilder.build_report() でレシートと同じ書式の印刷ジョブにする
+"""
+import calendar
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from logger import get_logger
+from logic.sales_journal import SalesJournal, sale_figures
+
+log = get_logger(__name__)
+
+
+def month_range(ym: str) -> Tuple[str, str]:
+    """YYYYMM → (月初, 月末) の YYYYMMDD"""
+    year, month = int(ym[:4]), int(ym[4:])
+    return f"{ym}01", f"{ym}{calendar.monthrange(year, month)[1]:02d}"
+
+
+class ReportGenerator:
+    def __init__(self, data_dir: str = "data", journal: Optional[SalesJournal] = None):
+        """data_dir: 売上ジャーナルのあるディレクトリ"""
+        self.data_dir = data_dir
+        self.journal = journal or SalesJournal(data_dir)
+
+    def build(self, start_day: str, end_day: str) -> Dict[str, Any]:
+        """start_day〜end_day（両端含む）を日別集計から求める"""
+        r = self.journal.rollup(start_day, end_day)
+        return self._report(start_day, end_day, r["sales"], r["total"], r["payments"],
+                            r["cash_in"], r["cash_out"])
+
+    def scan(self, start_day: str, end_day: str) -> Dict[str, Any]:
+        """build() と同じ結果を売上・入出金の元データの順次走査で求める（全件をメモリに載せない）"""
+        count = total = 0
+        payments: Dict[str, int] = {}
+        for record in self.journal.iter_range(start_day, end_day):
+            count += 1
+            total += int(record.get("total_due", 0))
+            for method, amount in sale_figures(record)[0].items():
+                payments[method] = payments.get(method, 0) + amount
+        cash_in = cash_out = 0
+        for entry in self.journal.iter_cash(start_day, end_day):
+            if entry["kind"] == "deposit":
+                cash_in += entry["amount"]
+            elif entry["kind"] == "withdraw":
+                cash_out -= entry["amount"]
+        return self._report(start_day, end_day, count, total, payments, cash_in, cash_out)
+
+    @staticmethod
+    def _report(start_day, end_day, count, total, payments, cash_in, cash_out) -> Dict[str, Any]:
+        other = {m: a for m, a in payments.items() if m != "現金" and a}
+        return {
+            "start": start_day,
+            "end": end_day,
+            "count": count,
+            "cash_sales": payments.get("現金", 0),
+            "other_sales": other,
+            "other_total": sum(other.values()),
+            "total": total,
+            "deposit": cash_in,
+            "withdraw": cash_out,
+        }
+
+    def daily(self, day: Optional[str] = None) -> Dict[str, Any]:
+        day = day or datetime.now().strftime("%Y%m%d")
+        return self.build(day, day)
+
+    def monthly(self, ym: Optional[str] = None) -> Dict[str, Any]:
+        return self.build(*month_range(ym or datetime.now().strftime("%Y%m")))
+
+    @staticmethod
+    def rows(report: Dict[str, Any]) -> List[Tuple[str, Optional[int]]]:
+        """印字・表示用の (項目名, 金額) の並び（金額 None は区切り線）"""
+        rows: List[Tuple[str, Optional[int]]] = [
+            ("取引件数", report["count"]),
+            ("", None),
+            ("現金売上", report["cash_sales"]),
+            ("その他売上", report["other_total"]),
+        ]
+        rows += [(f"  {method}", amount)
+                 for method, amount in sorted(report["other_sales"].items())]
+        rows += [
+            ("総合計", report["total"]),
+            ("", None),
+            ("入金（売上以外）", report["deposit"]),
+            ("出金（売上以外）", report["withdraw"]),
+        ]
+        return rows
+
+    @staticmethod
+    def title(report: Dict[str, Any]) -> Tuple[str, str]:
+        """(見出し, 期間) を返す"""
+        start, end = report["start"], report["end"]
+        period = f"{start[:4]}/{start[4:6]}/{start[6:]}"
+        if start == end:
+            return "日次レポート", period
+        return ("月次レポート" if start[6:] == "01" and end == month_range(start[:6])[1]
+                else "期間レポート"), f"{period} - {end[:4]}/{end[4:6]}/{end[6:]}"
+
+    def to_jobs(self, report: Dict[str, Any],
+                receipt_builder) -> List[Tuple[str, Any, Dict[str, Any]]]:
+        """ReceiptBuilder で印刷ジョブにする"""
+        heading, period = self.title(report)
+        return receipt_builder.build_report(heading, period, self.rows(report))
+
+
+if __name__ == "__main__":
+    # python -m logic.report_generator daily [YYYYMMDD] / monthly [YYYYMM] / rebuild
+    mode = sys.argv[1] if len(sys.argv) > 1 else "daily"
+    arg = sys.argv[2] if len(sys.argv) > 2 else None
+    gen = ReportGenerator("data")
+    if mode == "rebuild":
+        # 日別集計を元データから作り直し、作り直す前の集計と一致していたかを表示
+        res = gen.journal.rebuild_rollups()
+        print(f"{res['days']} day(s) rebuilt, mismatched: {res['mismatched'] or 'none'}")
+        sys.exit(1 if res["mismatched"] else 0)
+    rep = gen.monthly(arg) if mode == "monthly" else gen.daily(arg)
+    heading, period = gen.title(rep)
+    print(f"{heading} {period}")
+    for label, value in gen.rows(rep):
+        print("-" * 32 if value is None else f"{label}\t{value:,}")
@@ -0,0 +1,386 @@
+# logic/sales_journal.py
+"""
+売上ジャーナル（SQLite WAL モードの追記専用テーブル）。
+・1 売上 = 1 行。売上内容（record JSON）は追記後に変更しない
+・在庫同期／受注アップロード／レシート印刷の状態を列で持つ
+・seq（追記順）と day 列のインデックスにより、日・月単位を 1 回の順次走査で読める
+・既存の data/YYYYMM, data/success, data/pending の JSON を取り込む移行処理付き
+・日別集計（件数・合計・支払方法別・商品別・売上以外の入出金）を売上の追記と同じトランザクションで
+  更新するので、日次レポートは 1 日 1 行、月次は日数分の行を読むだけで済む
+・現金の動き（入出金・現金売上・お釣り）は同じ DB の現金出納帳（logic.cash_ledger）にも同時に記帳
+"""
+import glob
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from logger import get_logger
+from logic.cash_ledger import (
+    CASH_METHODS, FLOW_KINDS, LEDGER_SCHEMA, append_count, append_entry, balance, iter_cash_flows,
+    sale_entries,
+)
+from utils.file_utils import load_json, open_sqlite
+
+log = get_logger(__name__)
+
+STATUS_COLUMNS = {"sync": "sync_status", "upload": "upload_status", "print": "print_status"}
+# 後処理キュー・在庫バッチで送信待ちの状態。日次処理の pending() には含めない（二重送信防止）
+INFLIGHT = "inflight"
+# 集計・出納帳のスキーマ版（PRAGMA user_version）。上がったら既存の売上から作り直す
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales (
+    seq            INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id TEXT NOT NULL UNIQUE,
+    ts             TEXT NOT NULL,
+    day            TEXT NOT NULL,
+    total_due      INTEGER NOT NULL,
+    record         TEXT NOT NULL,
+    sync_status    TEXT NOT NULL DEFAULT 'pending',
+    upload_status  TEXT NOT NULL DEFAULT 'pending',
+    print_status   TEXT NOT NULL DEFAULT 'pending',
+    source         TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sales_day ON sales(day, seq);
+CREATE INDEX IF NOT EXISTS idx_sales_sync ON sales(sync_status);
+CREATE INDEX IF NOT EXISTS idx_sales_upload ON sales(upload_status);
+CREATE TABLE IF NOT EXISTS day_totals (
+    day      TEXT PRIMARY KEY,
+    sales    INTEGER NOT NULL DEFAULT 0,
+    total    INTEGER NOT NULL DEFAULT 0,
+    cash_in  INTEGER NOT NULL DEFAULT 0,
+    cash_out INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS day_payments (
+    day    TEXT NOT NULL,
+    method TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (day, method)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS day_items (
+    day      TEXT NOT NULL,
+    goods_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    amount   INTEGER NOT NULL,
+    PRIMARY KEY (day, goods_id)
+) WITHOUT ROWID;
+"""
+
+
+def sale_figures(record: Dict[str, Any]) -> Tuple[Dict[str, int], Dict[str, Tuple[int, int]]]:
+    """
+    売上 1 件の (支払方法別金額, 商品別 (数量, 金額))。
+    現金はお釣りを差し引いた額、支払情報の無い旧データは全額現金として扱う
+    """
+    payments: Dict[str, int] = {}
+    for p in record.get("payments") or []:
+        method = "現金" if p.get("method") in CASH_METHODS else p.get("method", "")
+        payments[method] = payments.get(method, 0) + int(p.get("amount", 0))
+    if payments:
+        change = int(record.get("change", 0))
+        if change:
+            payments["現金"] = payments.get("現金", 0) - change
+    else:
+        payments["現金"] = int(record.get("total_due", 0))
+    items: Dict[str, Tuple[int, int]] = {}
+    for item in record.get("cart", []):
+        qty = int(item.get("quantity", 1))
+        amount = int(item.get("price", 0)) * qty
+        q0, a0 = items.get(item.get("goods_id") or "", (0, 0))
+        items[item.get("goods_id") or ""] = (q0 + qty, a0 + amount)
+    return payments, items
+
+
+class SalesJournal:
+    def __init__(self, data_dir: str = "data"):
+        """売上を data_dir/journal/sales.db に記録します。"""
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, "journal", "sales.db")
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SCHEMA + LEDGER_SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # 集計・出納帳の導入前のジャーナル：既存の売上・入出金から作る
+            self._import_ledger()
+            self.rebuild_rollups()
+
+    def _conn(self) -> sqlite3.Connection:
+        """スレッドごとに接続を持つ（WAL なので読み取りは書き込みをブロックしない）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    # ――――― 追記 ―――――
+    def append(self, record: Dict[str, Any], source: Optional[str] = None,
+               statuses: Optional[Dict[str, str]] = None) -> str:
+        """
+        売上を追記し、確定した transaction_id を返す。
+        同じ ID が既にあれば _2, _3 ... を付けて一意にします。
+        """
+        ts = datetime.fromisoformat(record["timestamp"])
+        cols = {STATUS_COLUMNS[k]: v for k, v in (statuses or {}).items()}
+        base = record["transaction_id"]
+        conn = self._conn()
+        for n in range(1, 100):
+            tx_id = base if n == 1 else f"{base}_{n}"
+            record["transaction_id"] = tx_id
+            values = {
+                "transaction_id": tx_id,
+                "ts": ts.isoformat(),
+                "day": ts.strftime("%Y%m%d"),
+                "total_due": int(record.get("total_due", 0)),
+                "record": json.dumps(record, ensure_ascii=False),
+                "source": source,
+                **cols,
+            }
+            try:
+                with conn:
+                    conn.execute(
+                        f"INSERT INTO sales ({', '.join(values)}) "
+                        f"VALUES ({', '.join('?' * len(values))})",
+                        list(values.values()),
+                    )
+                    self._add_sale(conn, values["day"], record)
+                    for kind, amount in sale_entries(record):
+                        append_entry(conn, values["ts"], kind, amount, tx_id)
+                return tx_id
+            except sqlite3.IntegrityError:
+                if source is not None:
+                    raise
+        raise RuntimeError(f"Could not allocate transaction_id for {base}")
+
+    def set_status(self, transaction_ids, kind: str, status: str):
+        """kind（sync/upload/print）の状態を更新"""
+        if isinstance(transaction_ids, str):
+            transaction_ids = [transaction_ids]
+        col = STATUS_COLUMNS[kind]
+        with self._conn() as conn:
+            conn.executemany(
+                f"UPDATE sales SET {col} = ? WHERE transaction_id = ?",
+                [(status, tx) for tx in transaction_ids],
+            )
+
+    # ――――― 日別集計 ―――――
+    @staticmethod
+    def _add_sale(conn: sqlite3.Connection, day: str, record: Dict[str, Any]):
+        """売上 1 件分を日別集計に加える（呼び出し側のトランザクション内で実行）"""
+        payments, items = sale_figures(record)
+        conn.execute(
+            "INSERT INTO day_totals (day, sales, total) VALUES (?, 1, ?) "
+            "ON CONFLICT(day) DO UPDATE SET sales = sales + 1, total = total + excluded.total",
+            (day, int(record.get("total_due", 0))),
+        )
+        conn.executemany(
+            "INSERT INTO day_payments (day, method, amount) VALUES (?, ?, ?) "
+            "ON CONFLICT(day, method) DO UPDATE SET amount = amount + excluded.amount",
+            [(day, method, amount) for method, amount in payments.items()],
+        )
+        conn.executemany(
+            "INSERT INTO day_items (day, goods_id, quantity, amount) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(day, goods_id) DO UPDATE SET quantity = quantity + excluded.quantity, "
+            "amount = amount + excluded.amount",
+            [(day, gid, qty, amount) for gid, (qty, amount) in items.items()],
+        )
+
+    @staticmethod
+    def _add_cash(conn: sqlite3.Connection, day: str, kind: str, amount: int):
+        col = "cash_in" if kind == "deposit" else "cash_out"
+        conn.execute(
+            f"INSERT INTO day_totals (day, {col}) VALUES (?, ?) "
+            f"ON CONFLICT(day) DO UPDATE SET {col} = {col} + excluded.{col}",
+            (day, int(amount)),
+        )
+
+    # ――――― 現金出納帳 ―――――
+    def add_cash_flow(self, ts: str, kind: str, amount) -> int:
+        """
+        売上以外の入金（deposit）／出金（withdraw）を出納帳と日別集計に記帳し、記帳後の残高を返す。
+        ts は ISO 形式（YYYY-MM-DDTHH:MM:SS）
+        """
+        amount = int(amount)
+        with self._conn() as conn:
+            self._add_cash(conn, ts[:10].replace("-", ""), kind, amount)
+            return append_entry(conn, ts, kind, amount if kind == "deposit" else -amount)
+
+    def count_cash(self, ts: str, counted) -> Tuple[int, int]:
+        """ドロアーの実査額を記帳し、(理論残高, 過不足) を返す。以降の残高は実査額から積み上げる"""
+        with self._conn() as conn:
+            return append_count(conn, ts, int(counted))
+
+    def cash_balance(self) -> int:
+        """ドロアーにあるはずの現金（出納帳の最終残高）"""
+        return balance(self._conn())
+
+    def iter_cash(self, start_day: str, end_day: str) -> Iterator[Dict[str, Any]]:
+        """start_day〜end_day（両端含む）の出納帳を記帳順に返す"""
+        cur = self._conn().execute(
+            "SELECT seq, ts, kind, amount, balance, ref FROM cash_ledger "
+            "WHERE day BETWEEN ? AND ? ORDER BY seq",
+            (start_day, end_day),
+        )
+        for row in cur:
+            yield dict(row)
+
+    def _import_ledger(self):
+        """出納帳が空なら、既存の売上と旧形式の入出金 JSON（data/cashflow）から時刻順に作る"""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM cash_ledger LIMIT 1").fetchone():
+            return
+        entries = []
+        for tx_id, ts, raw in conn.execute("SELECT transaction_id, ts, record FROM sales"):
+            entries += [(ts, kind, amount, tx_id) for kind, amount in sale_entries(json.loads(raw))]
+        for rec in iter_cash_flows(self.data_dir):
+            if rec.get("type") in FLOW_KINDS and rec.get("timestamp"):
+                amount = int(rec.get("amount", 0))
+                entries.append((rec["timestamp"], rec["type"],
+                                amount if rec["type"] == "deposit" else -amount, None))
+        entries.sort(key=lambda e: e[0])
+        with conn:
+            for ts, kind, amount, ref in entries:
+                append_entry(conn, ts, kind, amount, ref)
+        if entries:
+            log.info(f"Cash ledger initialized from existing records: {len(entries)} entries")
+
+    def rollup(self, start_day: str, end_day: str) -> Dict[str, Any]:
+        """start_day〜end_day（両端含む）の日別集計を合算して返す"""
+        conn = self._conn()
+        sales, total, cash_in, cash_out = conn.execute(
+            "SELECT COALESCE(SUM(sales), 0), COALESCE(SUM(total), 0), COALESCE(SUM(cash_in), 0), "
+            "COALESCE(SUM(cash_out), 0) FROM day_totals WHERE day BETWEEN ? AND ?",
+            (start_day, end_day),
+        ).fetchone()
+        payments = dict(conn.execute(
+            "SELECT method, SUM(amount) FROM day_payments "
+            "WHERE day BETWEEN ? AND ? GROUP BY method",
+            (start_day, end_day),
+        ).fetchall())
+        items = {gid: (qty, amount) for gid, qty, amount in conn.execute(
+            "SELECT goods_id, SUM(quantity), SUM(amount) FROM day_items "
+            "WHERE day BETWEEN ? AND ? GROUP BY goods_id",
+            (start_day, end_day),
+        )}
+        return {"sales": sales, "total": total, "cash_in": cash_in, "cash_out": cash_out,
+                "payments": payments, "items": items}
+
+    def _rollup_rows(self, conn: sqlite3.Connection):
+        return (
+            sorted(tuple(r) for r in conn.execute(
+                "SELECT * FROM day_totals WHERE sales OR cash_in OR cash_out")),
+            sorted(tuple(r) for r in conn.execute("SELECT * FROM day_payments WHERE amount != 0")),
+            sorted(tuple(r) for r in conn.execute("SELECT * FROM day_items")),
+        )
+
+    def rebuild_rollups(self) -> Dict[str, Any]:
+        """日別集計を売上と出納帳の元データから作り直し、作り直す前の集計と食い違った日を返す"""
+        conn = self._conn()
+        with conn:
+            before = self._rollup_rows(conn)
+            conn.execute("DELETE FROM day_totals")
+            conn.execute("DELETE FROM day_payments")
+            conn.execute("DELETE FROM day_items")
+            for day, raw in conn.execute("SELECT day, record FROM sales ORDER BY seq"):
+                self._add_sale(conn, day, json.loads(raw))
+            flows = conn.execute(
+                "SELECT day, kind, SUM(amount) FROM cash_ledger "
+                f"WHERE kind IN ({', '.join('?' * len(FLOW_KINDS))}) GROUP BY day, kind",
+                FLOW_KINDS,
+            ).fetchall()
+            for day, kind, amount in flows:
+                self._add_cash(conn, day, kind, -amount if kind == "withdraw" else amount)
+            after = self._rollup_rows(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        mismatched = sorted(
+            {row[0] for old, new in zip(before, after) for row in set(old) ^ set(new)}
+        )
+        if mismatched and any(before):
+            log.warning(f"Rollups disagreed with raw records on {len(mismatched)} day(s): "
+                        f"{mismatched[:10]}")
+        return {"days": len(after[0]), "mismatched": mismatched}
+
+    # ――――― 読み出し ―――――
+    def _iter(self, where: str, params, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        sql = f"SELECT record FROM sales WHERE {where} ORDER BY seq"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        cur = self._conn().execute(sql, params)
+        for (raw,) in cur:
+            yield json.loads(raw)
+
+    def iter_range(self, start_day: str, end_day: str) -> Iterator[Dict[str, Any]]:
+        """start_day〜end_day（YYYYMMDD, 両端含む）の売上を記録順に返す"""
+        return self._iter("day BETWEEN ? AND ?", (start_day, end_day))
+
+    def iter_day(self, day: str) -> Iterator[Dict[str, Any]]:
+        return self.iter_range(day, day)
+
+    def iter_month(self, ym: str) -> Iterator[Dict[str, Any]]:
+        return self.iter_range(f"{ym}01", f"{ym}31")
+
+    def pending(self, kind: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """kind の状態が done・inflight 以外の売上を記録順に返す"""
+        return list(self._iter(f"{STATUS_COLUMNS[kind]} NOT IN ('done', ?)", (INFLIGHT,), limit))
+
+    def inflight(self, kind: str) -> List[str]:
+        """kind の状態が inflight の取引 ID"""
+        col = STATUS_COLUMNS[kind]
+        rows = self._conn().execute(
+            f"SELECT transaction_id FROM sales WHERE {col} = ? ORDER BY seq", (INFLIGHT,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def get(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT * FROM sales WHERE transaction_id = ?", (transaction_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+    def backup(self, dest_path: str):
+        """稼働中でも整合性のとれたコピーを作成（sqlite3 backup API）"""
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+        dest = sqlite3.connect(dest_path)
+        try:
+            self._conn().backup(dest)
+        finally:
+            dest.close()
+
+    # ――――― 移行 ―――――
+    def migrate_json_tree(self, data_dir: str = "data") -> Dict[str, int]:
+        """
+        既存の売上 JSON を取り込む（何度実行しても重複しない）。
+        success/ は同期・アップロード済み、それ以外は未同期として扱い、印刷は済とする。
+        """
+        counts = {"imported": 0, "skipped": 0, "error": 0}
+        for path in sorted(glob.glob(os.path.join(data_dir, "*", "sales_*.json"))):
+            folder = os.path.basename(os.path.dirname(path))
+            done = "done" if folder == "success" else "pending"
+            try:
+                record = load_json(path)
+                self.append(record, source=path,
+                            statuses={"sync": done, "upload": done, "print": "done"})
+                counts["imported"] += 1
+            except sqlite3.IntegrityError:
+                counts["skipped"] += 1
+            except Exception as e:
+                log.error(f"Migration failed for {path}: {e}")
+                counts["error"] += 1
+        log.info(f"Migrated JSON sales from {data_dir}: {counts}")
+        return counts
+
+
+if __name__ == "__main__":
+    # python -m logic.sales_journal migrate [data_dir]
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        target = sys.argv[2] if len(sys.argv) > 2 else "data"
+        print(SalesJournal(target).migrate_json_tree(target))
+    else:
+        print("Usage: python -m logic.sales_journal migrate [data_dir]")
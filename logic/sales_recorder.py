@@ -1,89 +1,203 @@
 # logic/sales_recorder.py
 import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
-from logger import get_logger
+from config import Config
+from logger import get_logger, sample
+from logic.post_sale_pipeline import PostSalePipeline
+from logic.sales_journal import INFLIGHT, SalesJournal
+from nextengine.inventory_batcher import InventoryBatcher
 from nextengine.inventory_updater import InventoryUpdater
 from utils.date_utils import get_current_timestamp
-from utils.file_utils import ensure_dir, save_json
 from utils.receipt_builder import ReceiptBuilder
+from utils.logo_cache import LogoCache
+from utils.metrics import record as record_metric
+from utils.print_spooler import PrintSpooler
 from utils.printer import ReceiptPrinter
 
 log = get_logger(__name__)
 
 class SalesRecorder:
-    def __init__(self, data_dir: str = "data", printer_ip: str = None):
+    def __init__(self, data_dir: str = "data", printer_ip: str = None,
+                 pipeline: PostSalePipeline = None):
         self.data_dir = Path(data_dir)
+        self.journal = SalesJournal(data_dir)
+        if self.journal.count() == 0:
+            # 初回のみ旧形式（1 売上 1 JSON）のデータを取り込む
+            self.journal.migrate_json_tree(data_dir)
         self.receipt_builder = ReceiptBuilder(config_path="config/receipt_layout.yaml")
         host = printer_ip or os.getenv("PRINTER_IP", "127.0.0.1")
-        self.printer = ReceiptPrinter(host=host)
+        # ロゴのラスタ変換は起動時に 1 回だけ（以降はキャッシュを再利用）。
+        # レイアウトのコンパイルもこのスレッドで行い、画面表示を待たせない
+        self.logo_cache = LogoCache(
+            cache_dir=self.data_dir / "cache" / "logo",
+            profile=Config.PRINTER_MODEL,
+            nv_key=Config.LOGO_NV_KEY,
+        )
+        threading.Thread(target=self._warm_logos, daemon=True).start()
+        # 会計（record_sale）開始時刻。レシート印刷完了までの時間を計る
+        self._recorded_at = {}
+        # プリンタ接続はスプーラのスレッドが保持する（会計処理は接続を待たない）
+        self.spooler = PrintSpooler(
+            lambda: ReceiptPrinter(host=host, lazy=True, logo_cache=self.logo_cache),
+            queue_dir=self.data_dir / "queue",
+            max_backoff=Config.PRINTER_RECONNECT_MAX_SEC,
+            drawer_window=Config.DRAWER_KICK_WINDOW_SEC,
+            on_printed=self._on_printed,
+        )
+        self.spooler.start()
+        self.batcher = None
+        if Config.INVENTORY_BATCH_ENABLED:
+            self.batcher = InventoryBatcher(
+                self._make_updater,
+                max_sales=Config.INVENTORY_BATCH_MAX_SALES,
+                window_sec=Config.INVENTORY_BATCH_WINDOW_SEC,
+                on_result=self._on_batch_result,
+                submit=lambda records: self.pipeline.submit({"records": records},
+                                                            stage="inventory_batch"),
+            )
+        # 会計後の在庫同期・レシート印刷はバックグラウンドのパイプラインで実行
+        self.pipeline = pipeline or PostSalePipeline(queue_dir=self.data_dir / "queue")
+        self.pipeline.add_stage("inventory", self._sync_inventory,
+                                on_give_up=self._on_inventory_give_up)
+        self.pipeline.add_stage("receipt", self._print_receipt)
+        if self.batcher is not None:
+            # まとめた在庫差分もキュー経由で送り、失敗したバッチは間隔を空けて再送する
+            self.pipeline.add_stage("inventory_batch", self._send_inventory_batch, broadcast=False,
+                                    on_give_up=self._on_inventory_give_up)
+        self._recover_inflight()
+        self.pipeline.start()
 
     def record_sale(self, cart, total_due, payments, change,
                     transaction_id=None, timestamp=None):
-        log.info(f">>> record_sale start")
+        """売上をジャーナルに確定追記し、後処理をキューに積んで即座に取引 ID を返す"""
+        start = time.perf_counter()
         # Timestamp setup
         if timestamp:
             ts_obj = timestamp
         else:
             ts_obj = datetime.fromisoformat(get_current_timestamp(fmt="%Y-%m-%dT%H:%M:%S"))
-        ts_str = ts_obj.isoformat()
-        file_ts = ts_obj.strftime("%Y%m%d_%H%M%S")
-        ym = ts_obj.strftime("%Y%m")
-        # Save JSON record
-        dir_path = self.data_dir / ym
-        ensure_dir(str(dir_path))
-        fname = f"sales_{file_ts}.json"
-        file_path = dir_path / fname
         record = {
-            "transaction_id": transaction_id or file_ts,
-            "timestamp": ts_str,
+            "transaction_id": transaction_id or ts_obj.strftime("%Y%m%d_%H%M%S"),
+            "timestamp": ts_obj.isoformat(),
             "cart": cart,
             "total_due": total_due,
             "payments": payments,
             "change": change,
         }
-        save_json(str(file_path), record)
-        log.info(f"Recorded sale: {file_path}")
-        # Inventory sync
-        try:
-            sim = os.getenv("IS_SIMULATION", "true").lower() in ("1","true","yes")
-            token_env = ".env.test" if sim else ".env"
-            updater = InventoryUpdater(token_env=token_env, simulate=sim)
-            res = updater.update_from_record(str(file_path))
-            log.info(f"Inventory update successful (simulate={sim}): {res}")
-        except Exception as e:
-            log.error(f"Inventory update failed: {e}", exc_info=True)
-        # Receipt print
+        # 在庫同期はキュー／バッチで送るので inflight で記録（日次処理の再送対象から外す）
+        tx_id = self.journal.append(record, statuses={"sync": INFLIGHT})
+        self._recorded_at[tx_id] = start
+        if len(self._recorded_at) > 1000:
+            # 印刷されないまま残った分は古い順に捨てる
+            self._recorded_at.pop(next(iter(self._recorded_at)))
+        self.pipeline.submit({"transaction_id": tx_id, "record": record})
+        elapsed = (time.perf_counter() - start) * 1000
+        record_metric("checkout.record", elapsed)
+        log.info(f"Recorded sale: {tx_id} (commit+enqueue {elapsed:.1f} ms)")
+        return tx_id
+
+    def _warm_logos(self):
         try:
-            # Payment summary
-            payments_list = record.get("payments", [])
-            total_paid = sum(p.get("amount", 0) for p in payments_list)
-            if payments_list:
-                methods = {p.get("method", "") for p in payments_list}
-                method = methods.pop() if len(methods) == 1 else "支払"
-            else:
-                method = "cash"
-            label_map = {"cash": "現金", "クレカ": "クレジットカード", "QR": "QR", "支払": "支払"}
-            pay_method_name = label_map.get(method, method)
-            pay_amount = total_paid if payments_list else total_due
-            # Build sale_data with integer values
-            sale_data = {
-                "items":           record["cart"],
-                "total":           int(record["total_due"]),
-                "change":          int(record["change"]),
-                "timestamp":       datetime.fromisoformat(record["timestamp"]),
-                "pay_method_name": pay_method_name,
-                "pay_amount":      int(pay_amount),
-            }
-            log.info(f">>> preparing to build receipt job: {sale_data}")
-            job = self.receipt_builder.build(sale_data)
-            log.info(f">>> built receipt job: {job}")
-            self.printer.execute(job)
-            log.info(f">>> ReceiptPrinter.execute completed")
-        except Exception as e:
-            log.error(f"Receipt printing failed: {e}", exc_info=True)
-        log.info(f">>> record_sale end")
-        return str(file_path)
+            header = self.receipt_builder.config.get("header", [])
+        except Exception:
+            log.error("Receipt layout load failed", exc_info=True)
+            return
+        self.logo_cache.warm([e["image"] for e in header if "image" in e])
+
+    def pipeline_status(self):
+        """後処理ステージごとの状態を返す（GUI 表示用）"""
+        status = self.pipeline.status()
+        status["printer"] = self.spooler.status()
+        return status
+
+    def _sync_inventory(self, payload):
+        """在庫同期ステージ。失敗時は例外でパイプラインにリトライさせる"""
+        record = payload["record"]
+        tx_id = record["transaction_id"]
+        if self.batcher is not None:
+            # バッチモード: 差分をためて件数／時間単位でまとめて送信
+            self.batcher.add(record)
+            return
+        updater = self._make_updater()
+        res = updater.update_record(record)
+        if not updater.is_success(res):
+            # 再試行が尽きるまでは inflight のまま（failed にするのは _on_inventory_give_up）
+            raise RuntimeError(f"Inventory update failed: {res}")
+        self.journal.set_status(tx_id, "sync", "done")
+        log.info(f"Inventory update successful (simulate={updater.simulate}): {res}")
+
+    def _send_inventory_batch(self, payload):
+        """在庫バッチ送信ステージ。失敗時は例外でパイプラインにリトライさせる"""
+        self.batcher.send(payload["records"])
+
+    def _on_batch_result(self, manifest):
+        if manifest["ok"]:
+            self.journal.set_status(manifest["sales"], "sync", "done")
+
+    def _on_inventory_give_up(self, payload):
+        """在庫同期を諦めた売上を failed にし、日次処理の update_all で再送させる"""
+        records = payload["records"] if "records" in payload else [payload["record"]]
+        self.journal.set_status([r["transaction_id"] for r in records], "sync", "failed")
+
+    def _recover_inflight(self):
+        """
+        inflight のまま、どのキューにも残っていない売上（メモリ上のバッチごと終了した等）を
+        pending に戻す。ワーカー起動前に呼ぶこと
+        """
+        queued = {p["transaction_id"] for p in self.pipeline.queued("inventory")}
+        if self.batcher is not None:
+            queued.update(r["transaction_id"] for p in self.pipeline.queued("inventory_batch")
+                          for r in p["records"])
+        stale = [tx for tx in self.journal.inflight("sync") if tx not in queued]
+        if stale:
+            self.journal.set_status(stale, "sync", "pending")
+            log.info(f"Inventory sync re-opened for {len(stale)} sale(s) left in flight")
+
+    def _make_updater(self):
+        sim = os.getenv("IS_SIMULATION", "true").lower() in ("1", "true", "yes")
+        token_env = ".env.test" if sim else ".env"
+        return InventoryUpdater(token_env=token_env, simulate=sim, data_dir=str(self.data_dir))
+
+    def _print_receipt(self, payload):
+        """レシート印刷ステージ。印刷ジョブを組み立ててスプーラに渡す"""
+        sale_data = self._build_sale_data(payload["record"])
+        job = self.receipt_builder.build(sale_data)
+        if sample("receipt_job"):
+            log.debug("Built receipt job: %s", job)
+        self.spooler.submit(job, transaction_id=payload["record"]["transaction_id"])
+
+    def _on_printed(self, payload):
+        recorded = self._recorded_at.pop(payload.get("transaction_id"), None)
+        if recorded is not None:
+            record_metric("checkout.print", (time.perf_counter() - recorded) * 1000)
+        if payload.get("transaction_id"):
+            self.journal.set_status(payload["transaction_id"], "print", "done")
+
+    @staticmethod
+    def _build_sale_data(record):
+        """売上レコードから ReceiptBuilder 用の sale_data を組み立てる"""
+        payments_list = record.get("payments", [])
+        total_paid = sum(p.get("amount", 0) for p in payments_list)
+        if payments_list:
+            methods = {p.get("method", "") for p in payments_list}
+            method = methods.pop() if len(methods) == 1 else "支払"
+        else:
+            method = "cash"
+        label_map = {"cash": "現金", "クレカ": "クレジットカード", "QR": "QR", "支払": "支払"}
+        pay_method_name = label_map.get(method, method)
+        pay_amount = total_paid if payments_list else record["total_due"]
+        # Build sale_data with integer values
+        return {
+            "items":           record["cart"],
+            "total":           int(record["total_due"]),
+            "change":          int(record["change"]),
+            "timestamp":       datetime.fromisoformat(record["timestamp"]),
+            "pay_method_name": pay_method_name,
+            "pay_amount":      int(pay_amount),
+        }
 
 if __name__ == "__main__":
     # Test print
@@ -96,3 +210,6 @@ if __name__ == "__main__":
         payments=[{"method":"cash","amount":150}],
         change=50
     )
+    recorder.pipeline.wait_idle()
+    recorder.spooler.wait_idle()
+    print(recorder.pipeline_status())
@@ -1 +1,102 @@
-# api_client.py – scaffold file
+# nextengine/api_client.py
+"""
+Next Engine API 共通 HTTP クライアント。
+・プロセスにつき 1 つの requests.Session を共有し、TCP/TLS 接続を keep-alive で再利用
+・接続／読み取りタイムアウトは Config から取得
+・gzip 圧縮レスポンスを要求（展開は requests が自動で行う）
+・エンドポイントごとの呼び出し回数・エラー数・レイテンシを集計（レイテンシは utils.metrics にも記録）
+"""
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from config import Config
+from logger import get_logger
+from utils.metrics import record
+
+if TYPE_CHECKING:
+    import requests
+
+log = get_logger(__name__)
+
+DEFAULT_BASE_URL = "https://api.next-engine.org"
+
+
+class NextEngineClient:
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout=None, pool_size: int = 4):
+        """
+        base_url: API ドメイン（パスは post() に渡す）
+        timeout: (接続, 読み取り) 秒。None なら Config の値を使用
+        pool_size: 同時に保持する keep-alive 接続数
+        """
+        # requests（urllib3・証明書バンドル）は最初のクライアント生成まで読み込まない
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout or (Config.API_CONNECT_TIMEOUT, Config.API_TIMEOUT)
+        self.pid = os.getpid()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def post(self, path: str, data: Optional[Dict[str, Any]] = None,
+             **kwargs) -> "requests.Response":
+        """path へフォーム POST し、レスポンスを返す（ステータス判定は呼び出し側）"""
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        error = False
+        try:
+            resp = self.session.post(self.url(path), data=data, **kwargs)
+            error = resp.status_code >= 400
+            return resp
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._record(path, (time.perf_counter() - start) * 1000, error)
+
+    def _record(self, path: str, elapsed_ms: float, error: bool):
+        record(f"ne:{path}", elapsed_ms)
+        with self._lock:
+            st = self._stats.setdefault(
+                path, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            st["count"] += 1
+            st["errors"] += int(error)
+            st["total_ms"] += elapsed_ms
+            st["max_ms"] = max(st["max_ms"], elapsed_ms)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """エンドポイント別の集計（avg_ms 付き）のコピーを返す"""
+        with self._lock:
+            out = {}
+            for path, st in self._stats.items():
+                row = dict(st)
+                row["avg_ms"] = st["total_ms"] / st["count"] if st["count"] else 0.0
+                out[path] = row
+            return out
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[NextEngineClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> NextEngineClient:
+    """プロセス共有のクライアントを返す（初回呼び出し時に生成）"""
+    global _client
+    with _client_lock:
+        if _client is None or _client.pid != os.getpid():
+            _client = NextEngineClient()
+        return _client
@@ -0,0 +1,153 @@
+# nextengine/goods_sync.py
+"""
+商品マスタのダウンロード（API連携②）。
+・Next Engine の商品マスタ検索 API をページ単位で取得し、ページは上限付きのスレッドプールで並列取得
+・初回（または full=True）は全件、以降は前回同期以降に更新された商品だけを取得して既存マスタにマージ
+・削除フラグの立った商品はマスタから除く
+・goods_data.json は一時ファイル経由で置き換えるので、POS 側は GoodsManager.refresh() で
+  再起動せずに新しいマスタへ切り替えられる
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from logger import get_logger
+from nextengine.api_client import get_client
+from nextengine.token_store import get_token_store
+from utils.file_utils import load_json, save_json_atomic
+
+log = get_logger(__name__)
+
+NE_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 同期中に更新された商品を取りこぼさないよう、前回時刻から少し巻き戻して取得する
+OVERLAP = timedelta(minutes=5)
+
+
+class GoodsMasterSync:
+    SEARCH_PATH = "/api_v1_master_goods/search"
+    COUNT_PATH = "/api_v1_master_goods/count"
+
+    def __init__(self, token_env: str = ".env", data_dir: str = "data", http=None,
+                 page_size: Optional[int] = None, workers: Optional[int] = None,
+                 fields: Optional[str] = None):
+        """
+        token_env: トークンファイル
+        data_dir: goods_data.json と同期状態 goods_sync.json の置き場所
+        page_size: 1 リクエストで取得する件数
+        workers: ページ取得の並列数
+        fields: 取得する項目（カンマ区切り）
+        """
+        self.tokens = get_token_store(token_env)
+        if not (self.tokens.access_token and self.tokens.refresh_token):
+            raise RuntimeError(f"Missing credentials in {token_env}")
+        self.http = http or get_client()
+        self.data_dir = Path(data_dir)
+        self.goods_file = self.data_dir / "goods_data.json"
+        self.state_file = self.data_dir / "goods_sync.json"
+        self.page_size = page_size or Config.GOODS_SYNC_PAGE_SIZE
+        self.workers = workers or Config.GOODS_SYNC_WORKERS
+        self.fields = fields or Config.GOODS_SYNC_FIELDS
+
+    # ――――― API 呼び出し ―――――
+    def _call(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """トークンを付けて POST（401 は 1 度だけ更新して再試行）"""
+        self.tokens.ensure_fresh()
+        for attempt in range(2):
+            access = self.tokens.access_token
+            payload = {"access_token": access, "refresh_token": self.tokens.refresh_token, **params}
+            resp = self.http.post(path, data=payload)
+            if resp.status_code == 401 and attempt == 0:
+                self.tokens.refresh(stale_access=access)
+                continue
+            resp.raise_for_status()
+            result = resp.json()
+            self.tokens.absorb(result)
+            if result.get("result") != "success":
+                raise RuntimeError(f"{path} failed: {result.get('code')} {result.get('message')}")
+            return result
+        raise RuntimeError(f"{path} failed: unauthorized")
+
+    def _filters(self, since: Optional[str]) -> Dict[str, Any]:
+        return {"goods_last_modified_date-gte": since} if since else {}
+
+    def count(self, since: Optional[str] = None) -> int:
+        return int(self._call(self.COUNT_PATH, self._filters(since)).get("count", 0))
+
+    def _page(self, offset: int, since: Optional[str]) -> List[Dict[str, Any]]:
+        params = {
+            "fields": self.fields,
+            "offset": offset,
+            "limit": self.page_size,
+            "sort": "goods_id-asc",
+            **self._filters(since),
+        }
+        return self._call(self.SEARCH_PATH, params).get("data", [])
+
+    def fetch(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """since 以降に更新された商品（None なら全件）をページ並列で取得"""
+        total = self.count(since)
+        offsets = list(range(0, total, self.page_size))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.workers),
+                                thread_name_prefix="goods-sync") as pool:
+            pages = list(pool.map(lambda off: self._page(off, since), offsets))
+        rows = [row for page in pages for row in page]
+        log.info(
+            f"Fetched {len(rows)}/{total} goods in {len(offsets)} page(s) "
+            f"({(time.perf_counter() - start) * 1000:.0f} ms, since={since})"
+        )
+        return rows
+
+    # ――――― 同期 ―――――
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """
+        マスタを同期して goods_data.json を更新し、結果の概要を返す。
+        前回同期の記録が無い・マスタが無い・full=True のときは全件取得
+        """
+        state = load_json(self.state_file) if self.state_file.exists() else {}
+        started = datetime.now()
+        since = None
+        if not full and self.goods_file.exists() and state.get("last_sync"):
+            last = datetime.strptime(state["last_sync"], NE_DATE_FORMAT)
+            since = (last - OVERLAP).strftime(NE_DATE_FORMAT)
+
+        rows = self.fetch(since)
+        if since is None:
+            goods = {}
+        else:
+            goods = {g.get("goods_id"): g for g in load_json(self.goods_file)}
+        updated = deleted = 0
+        for row in rows:
+            gid = row.get("goods_id")
+            if not gid:
+                continue
+            if str(row.get("goods_deleted_flag", "0")) == "1":
+                deleted += goods.pop(gid, None) is not None
+                continue
+            item = goods.setdefault(gid, {"goods_id": gid, "goods_name": "", "goods_6_item": "",
+                                          "goods_selling_price": "0"})
+            item.update({k: v for k, v in row.items()
+                         if k not in ("goods_deleted_flag", "goods_last_modified_date")})
+            updated += 1
+
+        save_json_atomic(self.goods_file, list(goods.values()))
+        summary = {
+            "mode": "full" if since is None else "incremental",
+            "fetched": len(rows),
+            "updated": updated,
+            "deleted": deleted,
+            "total": len(goods),
+        }
+        save_json_atomic(self.state_file,
+                         {"last_sync": started.strftime(NE_DATE_FORMAT), **summary})
+        log.info(f"Goods master synced: {summary}")
+        return summary
+
+
+if __name__ == "__main__":
+    # python -m nextengine.goods_sync [--full]
+    print(GoodsMasterSync().run(full="--full" in sys.argv[1:]))
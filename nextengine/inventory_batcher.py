@@ -0,0 +1,92 @@
+# nextengine/inventory_batcher.py
+"""
+在庫差分のバッチ送信。
+会計ごとの売上レコードを一定件数または一定時間ためてから
+InventoryUpdater.update_records で 1 回のアップロードにまとめます。
+submit を渡すと、まとめたバッチはその場で送らずに submit（PostSalePipeline のキューなど）に渡し、
+送信と失敗時の再試行はキュー側で行います。
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+
+class InventoryBatcher:
+    def __init__(self, updater_factory: Callable, max_sales: int = 20, window_sec: float = 60.0,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 submit: Optional[Callable[[List[Dict[str, Any]]], Any]] = None):
+        """
+        updater_factory: InventoryUpdater を返す関数（送信時に呼ばれる）
+        max_sales: この件数たまったら即送信
+        window_sec: 最初の 1 件からこの秒数経過したら送信
+        on_result: 送信後にバッチ記録を受け取るコールバック（同期状態の更新用）
+        submit: まとめた売上のリストを受け取って永続キューに積む関数（キュー側で send() を呼ぶ）
+        """
+        self.updater_factory = updater_factory
+        self.on_result = on_result
+        self.submit = submit
+        self.max_sales = max_sales
+        self.window_sec = window_sec
+        self._records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, record: Dict[str, Any]):
+        """売上レコードをバッチに追加。件数上限に達したらその場で送信"""
+        with self._lock:
+            self._records.append(record)
+            full = len(self._records) >= self.max_sales
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.window_sec, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def flush(self):
+        """
+        たまっている売上を 1 バッチにまとめる。submit があればそこに渡して None を、
+        無ければその場で送信してバッチ記録（失敗時は None）を返す
+        """
+        with self._lock:
+            records, self._records = self._records, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not records:
+            return None
+        if self.submit is not None:
+            self.submit(records)
+            return None
+        try:
+            return self.send(records)
+        except Exception as e:
+            # ジャーナル上は未同期のまま残るので日次処理の update_all で再送される
+            log.error(f"Inventory batch of {len(records)} sale(s) failed: {e}", exc_info=True)
+            return None
+
+    def send(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """1 バッチを送信してバッチ記録を返す。送信できなかった（ok でない）場合は RuntimeError"""
+        manifest = self.updater_factory().update_records(records)
+        if self.on_result:
+            self.on_result(manifest)
+        log.info(
+            f"Inventory batch {manifest['batch_id']}: {len(manifest['sales'])} sale(s), "
+            f"{manifest['rows']} row(s) => {manifest['result']}"
+        )
+        if not manifest["ok"]:
+            raise RuntimeError(
+                f"Inventory batch {manifest['batch_id']} failed: {manifest['result']}"
+            )
+        return manifest
+
+    def close(self):
+        """タイマーを止めて残りを送信"""
+        return self.flush()
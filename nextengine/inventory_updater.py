@@ -1,17 +1,15 @@
 
-import glob
 import io
 import os
 import csv
-import requests
-import shutil
 import time
 import subprocess
 import sys
 from datetime import datetime
-from pathlib import Path
-from dotenv import load_dotenv
-from utils.file_utils import load_json, save_csv, ensure_dir
+from nextengine.api_client import get_client
+from nextengine.token_store import get_token_store
+from utils.file_utils import save_csv, save_json
+from utils.metrics import span
 
 class InventoryUpdater:
     """Inventory update モジュール for Next Engine.
@@ -25,59 +23,41 @@ class InventoryUpdater:
     TOKEN_PATH = "/api_neauth"       # トークン交換用
     SIGNIN_URL = "https://base.next-engine.org/users/sign_in/"
 
-    def __init__(self, token_env: str = ".env", simulate: bool = True):
+    def __init__(self, token_env: str = ".env", simulate: bool = True, data_dir: str = "data"):
         self.simulate   = simulate
         self.token_env  = token_env
+        self.data_dir   = data_dir  # バッチのマニフェストは data_dir/inventory_batches/ に保存
 
-        # .env のバックアップ（任意）
-        try:
-            timestamp   = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = f"{token_env}.bak_{timestamp}"
-            shutil.copyfile(token_env, backup_path)
-        except Exception:
-            pass
-
-        # 環境変数読み込み
-        load_dotenv(token_env, override=True)
-        self.access_token  = os.getenv("NE_ACCESS_TOKEN")
-        self.refresh_token = os.getenv("NE_REFRESH_TOKEN")
-        self.client_id     = os.getenv("NE_CLIENT_ID")
-        self.client_secret = os.getenv("NE_CLIENT_SECRET")
-        self.redirect_uri  = os.getenv("NE_REDIRECT_URI")
+        # トークンはプロセス共有のストアから取得（ファイルは初回のみ読み込み）
+        self.tokens        = get_token_store(token_env)
+        self.client_id     = self.tokens.get("NE_CLIENT_ID")
+        self.client_secret = self.tokens.get("NE_CLIENT_SECRET")
+        self.redirect_uri  = self.tokens.get("NE_REDIRECT_URI")
 
         if not all([self.access_token, self.refresh_token, self.client_id, self.client_secret, self.redirect_uri]):
             raise RuntimeError(f"Missing credentials in {token_env}")
 
-        # エンドポイント設定
-        domain = "api.next-engine.org"
-        self.api_url   = f"https://{domain}{self.API_PATH}"
-        self.token_url = f"https://{domain}{self.TOKEN_PATH}"
-
-    def refresh_access_token(self):
-        """Refresh access token using refresh_token grant."""
-        payload = {
-            "grant_type":    "refresh_token",
-            "refresh_token": self.refresh_token,
-            "client_id":     self.client_id,
-            "client_secret": self.client_secret
-        }
+        # エンドポイント設定（接続はプロセス共有のクライアントを再利用）
+        self.http      = get_client()
+        self.api_url   = self.http.url(self.API_PATH)
+        self.token_url = self.http.url(self.TOKEN_PATH)
+
+    @property
+    def access_token(self):
+        return self.tokens.access_token
+
+    @property
+    def refresh_token(self):
+        return self.tokens.refresh_token
+
+    def refresh_access_token(self, stale_access=None):
+        """Refresh access token via the shared token store (single-flight)."""
         try:
-            res = requests.post(self.token_url, data=payload)
-            res.raise_for_status()
+            self.tokens.refresh(stale_access=stale_access)
         except Exception as e:
-            print(f"[InventoryUpdater] Token refresh HTTP error: {e}")
+            print(f"[InventoryUpdater] Token refresh failed: {e}")
             self._invoke_interactive_auth()
             raise RuntimeError("Interactive auth required")
-
-        data = res.json()
-        if "access_token" not in data or "refresh_token" not in data:
-            print(f"[InventoryUpdater] Unexpected token response: {data}")
-            self._invoke_interactive_auth()
-            raise RuntimeError("Invalid token response")
-
-        self.access_token  = data["access_token"]
-        self.refresh_token = data["refresh_token"]
-        self._write_tokens_to_env(self.access_token, self.refresh_token)
         print("[InventoryUpdater] Tokens refreshed.")
 
     def _invoke_interactive_auth(self):
@@ -89,24 +69,6 @@ class InventoryUpdater:
         except Exception as e:
             print(f"[InventoryUpdater] Failed to start interactive auth: {e}")
 
-    def _write_tokens_to_env(self, access, refresh):
-        """Overwrite .env with new tokens."""
-        lines = []
-        try:
-            with open(self.token_env, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        except FileNotFoundError:
-            pass
-
-        with open(self.token_env, "w", encoding="utf-8") as f:
-            for line in lines:
-                if line.startswith("NE_ACCESS_TOKEN="):
-                    f.write(f"NE_ACCESS_TOKEN={access}\n")
-                elif line.startswith("NE_REFRESH_TOKEN="):
-                    f.write(f"NE_REFRESH_TOKEN={refresh}\n")
-                else:
-                    f.write(line)
-
     def build_csv(self, record):
         output = io.StringIO()
         writer = csv.writer(output)
@@ -120,79 +82,131 @@ class InventoryUpdater:
                 valid += 1
         return output.getvalue(), valid
 
-    def update_from_record(self, json_path: str):
-        # Load JSON
-        try:
-            record = load_json(json_path)
-        except Exception as e:
-            print(f"[InventoryUpdater] Fail load JSON {json_path}: {e}")
-            pending = os.path.join("data", "pending")
-            ensure_dir(pending)
-            shutil.move(json_path, os.path.join(pending, os.path.basename(json_path)))
-            return {"error": str(e)}
-
+    def update_record(self, record):
+        """1 売上分の在庫を反映し、API の結果（またはスキップ／シミュレーション）を返す"""
         csv_data, valid = self.build_csv(record)
         if valid == 0:
-            print(f"[InventoryUpdater] No valid data in {json_path}")
-            success = os.path.join("data", "success")
-            ensure_dir(success)
-            shutil.move(json_path, os.path.join(success, os.path.basename(json_path)))
+            print(f"[InventoryUpdater] No valid data in {record.get('transaction_id')}")
             return {"skipped": True}
 
         # Save report
-        report_dir = "reports"
-        ensure_dir(report_dir)
-        date_str = Path(json_path).stem.replace("sales_", "")
-        report_path = os.path.join(report_dir, f"inventory_{date_str}.csv")
+        report_path = os.path.join("reports", f"inventory_{record.get('transaction_id')}.csv")
         rows = [line.split(",") for line in csv_data.strip().splitlines()]
         save_csv(report_path, rows)
         print(f"[InventoryUpdater] Report saved: {report_path}")
 
         if self.simulate:
             print(f"[InventoryUpdater] Simulation: POST to {self.api_url}")
-            dest = os.path.join("data", "success")
-            ensure_dir(dest)
-            shutil.move(json_path, os.path.join(dest, os.path.basename(json_path)))
             return {"simulated": True}
-
-        # Attempt API call with retry and token refresh
-        payload = {
-            "access_token":  self.access_token,
-            "refresh_token": self.refresh_token,
-            "data_type":     "csv",
-            "data":          csv_data
+        return self._post_csv(csv_data) or {"error": "Max retries exceeded"}
+
+    def _post_csv(self, csv_data):
+        """CSV を在庫アップロード API に送信（401 時はトークン更新して再試行）"""
+        with span("sync.inventory"):
+            self.tokens.ensure_fresh()
+            payload = {
+                "access_token":  self.access_token,
+                "refresh_token": self.refresh_token,
+                "data_type":     "csv",
+                "data":          csv_data
+            }
+            result = None
+            for i in range(2):
+                try:
+                    resp = self.http.post(self.API_PATH, data=payload)
+                    if resp.status_code == 401:
+                        print("[InventoryUpdater] 401 Unauthorized, refreshing token")
+                        self.refresh_access_token(stale_access=payload["access_token"])
+                        payload["access_token"]  = self.access_token
+                        payload["refresh_token"] = self.refresh_token
+                        continue
+                    resp.raise_for_status()
+                    result = resp.json()
+                    self.tokens.absorb(result)
+                    break
+                except Exception as e:
+                    print(f"[InventoryUpdater] Attempt {i+1} failed: {e}")
+                    time.sleep(2 ** i)
+            return result
+
+    def build_batch_csv(self, records):
+        """複数売上の在庫差分を syohin_code ごとに合算し、1 つの CSV にまとめる"""
+        deltas = {}
+        for record in records:
+            for item in record.get("cart", []):
+                code = item.get("goods_id")
+                if code:
+                    deltas[code] = deltas.get(code, 0) - item.get("quantity", 1)
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["syohin_code", "zaiko_su"])
+        rows = 0
+        for code, delta in deltas.items():
+            if delta:
+                writer.writerow([code, delta])
+                rows += 1
+        return output.getvalue(), rows
+
+    @staticmethod
+    def is_success(result):
+        return bool(result) and (
+            result.get("result") == "success" or "simulated" in result or "skipped" in result
+        )
+
+    def update_records(self, records):
+        """複数売上の在庫差分を 1 回のアップロードで反映し、バッチ記録を返す"""
+        batch_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        csv_data, rows = self.build_batch_csv(records)
+        if rows == 0:
+            result = {"skipped": True}
+        else:
+            report = [line.split(",") for line in csv_data.strip().splitlines()]
+            save_csv(os.path.join("reports", f"inventory_batch_{batch_id}.csv"), report)
+            if self.simulate:
+                print(f"[InventoryUpdater] Simulation: batch POST to {self.api_url}")
+                result = {"simulated": True}
+            else:
+                result = self._post_csv(csv_data) or {"error": "Max retries exceeded"}
+
+        manifest = {
+            "batch_id":   batch_id,
+            "sales":      [r.get("transaction_id") for r in records],
+            "rows":       rows,
+            "ok":         self.is_success(result),
+            "result":     result,
         }
-        result = None
-        for i in range(2):
-            try:
-                resp = requests.post(self.api_url, data=payload)
-                if resp.status_code == 401:
-                    print("[InventoryUpdater] 401 Unauthorized, refreshing token")
-                    self.refresh_access_token()
-                    continue
-                resp.raise_for_status()
-                result = resp.json()
-                break
-            except Exception as e:
-                print(f"[InventoryUpdater] Attempt {i+1} failed: {e}")
-                time.sleep(2 ** i)
-
-        # Move file based on result
-        dest_dir = "data/success" if result and result.get("result")=="success" else "data/pending"
-        ensure_dir(dest_dir)
-        shutil.move(json_path, os.path.join(dest_dir, os.path.basename(json_path)))
-        return result or {"error": "Max retries exceeded"}
-
-    def update_all(self, data_dir="data"):
+        save_json(os.path.join(self.data_dir, "inventory_batches", f"batch_{batch_id}.json"),
+                  manifest)
+        return manifest
+
+    def update_all(self, journal, batch_size=0):
+        """
+        ジャーナル上で在庫未同期の売上をまとめて反映し、状態を更新する。
+        batch_size > 0 なら batch_size 件ずつ合算して 1 回のアップロードにする。
+        """
         results = {}
-        pattern = os.path.join(data_dir, "*", "sales_*.json")
-        for path in glob.glob(pattern):
+        records = journal.pending("sync")
+        if batch_size > 0:
+            for i in range(0, len(records), batch_size):
+                chunk = records[i:i + batch_size]
+                try:
+                    manifest = self.update_records(chunk)
+                except Exception as e:
+                    manifest = {"ok": False, "result": {"error": str(e)}}
+                ids = [r["transaction_id"] for r in chunk]
+                journal.set_status(ids, "sync", "done" if manifest["ok"] else "failed")
+                results.update({tx: manifest["result"] for tx in ids})
+            return results
+        for record in records:
+            tx = record["transaction_id"]
             try:
-                results[path] = self.update_from_record(path)
+                results[tx] = self.update_record(record)
             except Exception as e:
-                results[path] = {"error": str(e)}
+                results[tx] = {"error": str(e)}
+            journal.set_status(tx, "sync", "done" if self.is_success(results[tx]) else "failed")
         return results
 
 if __name__ == "__main__":
+    from logic.sales_journal import SalesJournal
     updater = InventoryUpdater(token_env=".env.test", simulate=True)
-    print(updater.update_all())
+    print(updater.update_all(SalesJournal("data")))
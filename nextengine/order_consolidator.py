@@ -0,0 +1,140 @@
+# nextengine/order_consolidator.py
+"""
+1 日分の売上を「実店舗」の受注 1 件にまとめ、受注アップロード用 CSV のチャンクに分割する。
+・売上レコードを 1 件ずつ読み、日付ごとに (商品コード, 商品名, 単価) 単位で数量を合算
+・CSV は max_rows 行ごとのチャンクに分割（1 受注が収まらない場合は伝票番号に -p2 等を付けて分割）
+・分割した伝票の合計金額はそのパートの明細（単価×数量）の合計で、値引き等の差額は
+  各パートの明細額に比例して割り振る（端数は最後のパート）
+"""
+import csv
+import io
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+ORDER_HEADERS = [
+    "店舗伝票番号", "受注日", "受注名",
+    "支払方法", "合計金額",
+    "商品名", "商品コード",
+    "商品価格", "受注数量",
+]
+SHOP_ORDER_NAME = "実店舗"
+
+
+class DailyOrder:
+    __slots__ = ("day", "last_ts", "methods", "total", "lines", "sales")
+
+    def __init__(self, day: str):
+        self.day = day
+        self.last_ts = None
+        self.methods = set()
+        self.total = 0
+        self.lines: "OrderedDict[tuple, int]" = OrderedDict()
+        self.sales: List[str] = []
+
+    @property
+    def order_id(self) -> str:
+        # 同じ日に複数回アップロードしても重複しないよう、その回の最初の取引 ID を使う
+        return f"POS-{self.sales[0]}"
+
+    def add(self, record: Dict[str, Any]):
+        ts = datetime.fromisoformat(record.get("timestamp"))
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+        for p in record.get("payments", []):
+            self.methods.add(p.get("method", ""))
+        self.total += int(record.get("total_due", 0))
+        for item in record.get("cart", []):
+            key = (
+                item.get("code", item.get("name")),
+                item.get("name"),
+                int(item.get("price", 0)),
+            )
+            self.lines[key] = self.lines.get(key, 0) + item.get("quantity", 1)
+        self.sales.append(record.get("transaction_id"))
+
+    def rows(self) -> List[list]:
+        method = next(iter(self.methods)) if len(self.methods) == 1 else "複数"
+        dt_str = self.last_ts.strftime("%Y/%m/%d %H:%M:%S")
+        return [
+            [self.order_id, dt_str, SHOP_ORDER_NAME, method, self.total, name, code, price, qty]
+            for (code, name, price), qty in self.lines.items()
+        ]
+
+
+def consolidate(records: Iterable[Dict[str, Any]]) -> "OrderedDict[str, DailyOrder]":
+    """売上レコードを順に読み、日付（YYYYMMDD）ごとの DailyOrder にまとめる"""
+    orders: "OrderedDict[str, DailyOrder]" = OrderedDict()
+    for record in records:
+        try:
+            day = datetime.fromisoformat(record["timestamp"]).strftime("%Y%m%d")
+        except Exception as e:
+            log.error(f"Skip unreadable sale {record.get('transaction_id')}: {e}")
+            continue
+        orders.setdefault(day, DailyOrder(day)).add(record)
+    return OrderedDict(sorted(orders.items()))
+
+
+def _to_csv(rows: List[list]) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(ORDER_HEADERS)
+    writer.writerows(rows)
+    return output.getvalue()
+
+
+def build_chunks(orders: Dict[str, DailyOrder], max_rows: int = 500) -> List[Dict[str, Any]]:
+    """
+    受注をまとめて max_rows 行以下の CSV チャンクに詰める。
+    戻り値: [{"id", "orders": [伝票番号], "sales": [transaction_id], "rows", "csv"}]
+    """
+    chunks: List[Dict[str, Any]] = []
+    cur = {"orders": [], "sales": [], "rows": []}
+
+    def close():
+        if cur["rows"]:
+            chunks.append({
+                "id": f"chunk_{len(chunks) + 1:03d}",
+                "orders": cur["orders"],
+                "sales": cur["sales"],
+                "rows": len(cur["rows"]),
+                "csv": _to_csv(cur["rows"]),
+            })
+        cur.update(orders=[], sales=[], rows=[])
+
+    for order in orders.values():
+        rows = order.rows()
+        if len(cur["rows"]) + len(rows) > max_rows:
+            close()
+        if len(rows) <= max_rows:
+            cur["orders"].append(order.order_id)
+            cur["sales"].extend(order.sales)
+            cur["rows"].extend(rows)
+            continue
+        # 1 日分が大きすぎる場合は伝票を分割（売上は最後のパートに紐付け）
+        parts = [rows[i:i + max_rows] for i in range(0, len(rows), max_rows)]
+        # パートごとに別の受注になるので、1 日の合計を各パートに重複させない
+        # 値引き等の差額は明細額に比例して割り振り、小さな最後のパートが負にならないようにする
+        totals = [sum(row[7] * row[8] for row in part) for part in parts]
+        gross = sum(totals)
+        diff = order.total - gross
+        if gross:
+            for i in range(len(totals) - 1):
+                totals[i] += diff * totals[i] // gross
+        totals[-1] = order.total - sum(totals[:-1])
+        for n, (part, total) in enumerate(zip(parts, totals), start=1):
+            part_id = order.order_id if n == 1 else f"{order.order_id}-p{n}"
+            for row in part:
+                row[0] = part_id
+                row[4] = total
+            cur["orders"].append(part_id)
+            cur["rows"].extend(part)
+            if n == len(parts):
+                cur["sales"].extend(order.sales)
+            else:
+                close()
+    close()
+    return chunks
@@ -4,11 +4,13 @@ import io
 import os
 import shutil
 import time
-import requests
 from datetime import datetime
-from dotenv import load_dotenv
 from logger import get_logger
-from utils.file_utils import load_json, ensure_dir
+from nextengine.api_client import get_client
+from nextengine.token_store import get_token_store
+from nextengine.order_consolidator import ORDER_HEADERS, build_chunks, consolidate
+from utils.file_utils import load_json, ensure_dir, save_json_atomic
+from utils.metrics import span
 
 log = get_logger(__name__)
 
@@ -17,81 +19,43 @@ class SalesUploader:
 
     API_PATH   = "/api_v1_receiveorder_base/upload"
     TOKEN_PATH = "/api_neauth"
-    DOMAIN     = "api.next-engine.org"
 
     def __init__(self, token_env: str = ".env", pattern_id: int = 1, wait_flag: int = 1):
         self.token_env  = token_env
         self.pattern_id = pattern_id
         self.wait_flag  = wait_flag
 
-        # --- .env のバックアップ（修正：f-string の引用符を正しく） ---
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = f"{self.token_env}.bak_{timestamp}"
-            shutil.copyfile(self.token_env, backup_file)
-        except Exception:
-            pass
-
-        # 環境変数読み込み
-        load_dotenv(self.token_env, override=True)
-        self.access_token  = os.getenv("NE_ACCESS_TOKEN")
-        self.refresh_token = os.getenv("NE_REFRESH_TOKEN")
-        self.client_id     = os.getenv("NE_CLIENT_ID")
-        self.client_secret = os.getenv("NE_CLIENT_SECRET")
+        # トークンはプロセス共有のストアから取得（ファイルは初回のみ読み込み）
+        self.tokens        = get_token_store(self.token_env)
+        self.client_id     = self.tokens.get("NE_CLIENT_ID")
+        self.client_secret = self.tokens.get("NE_CLIENT_SECRET")
 
         if not (self.access_token and self.refresh_token and self.client_id and self.client_secret):
             raise RuntimeError(f"Missing credentials in {self.token_env}")
 
-        # エンドポイント設定
-        self.api_url   = f"https://{self.DOMAIN}{self.API_PATH}"
-        self.token_url = f"https://{self.DOMAIN}{self.TOKEN_PATH}"
-
-    def refresh_access_token(self):
-        """Refresh access token using refresh_token grant and overwrite .env."""
-        payload = {
-            "grant_type":    "refresh_token",
-            "refresh_token": self.refresh_token,
-            "client_id":     self.client_id,
-            "client_secret": self.client_secret
-        }
-        res = requests.post(self.token_url, data=payload)
-        res.raise_for_status()
-        data = res.json()
-        if "access_token" not in data or "refresh_token" not in data:
-            raise RuntimeError(f"Invalid token response: {data}")
-
-        self.access_token  = data["access_token"]
-        self.refresh_token = data["refresh_token"]
-        self._write_tokens_to_env()
-        log.info("[SalesUploader] Tokens refreshed")
+        # エンドポイント設定（接続はプロセス共有のクライアントを再利用）
+        self.http      = get_client()
+        self.api_url   = self.http.url(self.API_PATH)
+        self.token_url = self.http.url(self.TOKEN_PATH)
+
+    @property
+    def access_token(self):
+        return self.tokens.access_token
 
-    def _write_tokens_to_env(self):
-        lines = []
-        try:
-            with open(self.token_env, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-        except FileNotFoundError:
-            pass
-        with open(self.token_env, "w", encoding="utf-8") as f:
-            for line in lines:
-                if line.startswith("NE_ACCESS_TOKEN="):
-                    f.write(f"NE_ACCESS_TOKEN={self.access_token}\n")
-                elif line.startswith("NE_REFRESH_TOKEN="):
-                    f.write(f"NE_REFRESH_TOKEN={self.refresh_token}\n")
-                else:
-                    f.write(line)
+    @property
+    def refresh_token(self):
+        return self.tokens.refresh_token
+
+    def refresh_access_token(self, stale_access=None):
+        """Refresh access token via the shared token store (single-flight)."""
+        self.tokens.refresh(stale_access=stale_access)
+        log.info("[SalesUploader] Tokens refreshed")
 
     def build_csv(self, record: dict) -> str:
         """Convert a record dict to Next Engine CSV format."""
         output = io.StringIO()
         writer = csv.writer(output)
-        headers = [
-            "店舗伝票番号", "受注日", "受注名",
-            "支払方法",   "合計金額",
-            "商品名",     "商品コード",
-            "商品価格",   "受注数量",
-        ]
-        writer.writerow(headers)
+        writer.writerow(ORDER_HEADERS)
 
         tx_id = record.get("transaction_id")
         dt = datetime.fromisoformat(record.get("timestamp"))
@@ -112,53 +76,111 @@ class SalesUploader:
             ])
         return output.getvalue()
 
-    def upload_record(self, json_path: str) -> dict:
-        """Upload a single JSON file and retry on token expiration."""
-        log.debug(f"Uploading {json_path}")
-        record = load_json(json_path)
+    def upload_record(self, record: dict) -> dict:
+        """Upload a single sale record and retry on token expiration."""
+        log.debug(f"Uploading {record.get('transaction_id')}")
         csv_data = self.build_csv(record)
-
-        payload = {
-            "access_token":  self.access_token,
-            "refresh_token": self.refresh_token,
-            "receive_order_upload_pattern_id": self.pattern_id,
-            "wait_flag": self.wait_flag,
-            "data_type_1": "csv",
-            "data_1": csv_data,
-        }
-
-        for attempt in range(2):
+        return self._post_csv(csv_data)
+
+    def _post_csv(self, csv_data: str) -> dict:
+        """受注 CSV を送信（401 時はトークン更新して再試行）"""
+        with span("sync.sales_upload"):
+            self.tokens.ensure_fresh()
+            payload = {
+                "access_token":  self.access_token,
+                "refresh_token": self.refresh_token,
+                "receive_order_upload_pattern_id": self.pattern_id,
+                "wait_flag": self.wait_flag,
+                "data_type_1": "csv",
+                "data_1": csv_data,
+            }
+
+            for attempt in range(2):
+                try:
+                    res = self.http.post(self.API_PATH, data=payload)
+                    if res.status_code == 401:
+                        log.info("[SalesUploader] 401 Unauthorized, refreshing token")
+                        self.refresh_access_token(stale_access=payload["access_token"])
+                        payload["access_token"]  = self.access_token
+                        payload["refresh_token"] = self.refresh_token
+                        continue
+                    res.raise_for_status()
+                    data = res.json()
+                    self.tokens.absorb(data)
+                    return data
+                except Exception as e:
+                    log.warning(f"[SalesUploader] Attempt {attempt+1} failed: {e}")
+                    time.sleep(2 ** attempt)
+
+            raise RuntimeError("Max retries exceeded for upload_record")
+
+    def upload_all(self, journal) -> dict:
+        """Upload every sale whose upload_status is not done, one order per sale."""
+        results = {}
+        for record in journal.pending("upload"):
+            tx = record["transaction_id"]
             try:
-                res = requests.post(self.api_url, data=payload)
-                if res.status_code == 401:
-                    log.info("[SalesUploader] 401 Unauthorized, refreshing token")
-                    self.refresh_access_token()
-                    continue
-                res.raise_for_status()
-                return res.json()
+                res = self.upload_record(record)
+                results[tx] = res
+                log.info(f"Uploaded {tx} => {res}")
             except Exception as e:
-                log.warning(f"[SalesUploader] Attempt {attempt+1} failed: {e}")
-                time.sleep(2 ** attempt)
+                log.error(f"Error uploading {tx}: {e}", exc_info=True)
+                res = results[tx] = {"error": str(e)}
+            journal.set_status(tx, "upload", "done" if res.get("result") == "success" else "failed")
+        return results
 
-        raise RuntimeError("Max retries exceeded for upload_record")
+    def upload_consolidated(self, journal, data_dir: str = "data", max_rows: int = 500) -> dict:
+        """
+        日付ごとに 1 受注へまとめた CSV をチャンク単位でアップロードする。
+        チャンクの結果は data/sales_upload/run_*.json に記録し、
+        失敗したチャンクだけを次回呼び出し時に再送します。
+        """
+        manifest_dir = os.path.join(data_dir, "sales_upload")
+        results, claimed = {}, set()
+        for mpath in sorted(glob.glob(os.path.join(manifest_dir, "run_*.json"))):
+            manifest = load_json(mpath)
+            results.update(self._send_manifest(manifest, mpath, journal))
+            if os.path.exists(mpath):
+                claimed.update(s for c in manifest["chunks"] for s in c["sales"])
+
+        records = (r for r in journal.pending("upload") if r["transaction_id"] not in claimed)
+        chunks = build_chunks(consolidate(records), max_rows=max_rows)
+        if chunks:
+            run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+            for c in chunks:
+                c.update(status="pending", result=None)
+            manifest = {"run_id": run_id, "chunks": chunks}
+            mpath = os.path.join(manifest_dir, f"run_{run_id}.json")
+            save_json_atomic(mpath, manifest)
+            results.update(self._send_manifest(manifest, mpath, journal))
+        return results
 
-    def upload_all(self, data_dir: str = "data") -> dict:
-        """Upload all sales_*.json files under YYYYMM folders."""
+    def _send_manifest(self, manifest: dict, mpath: str, journal) -> dict:
+        """未成功チャンクを送信し、全チャンク成功なら売上をアップロード済みにして記録を done/ へ"""
         results = {}
-        pattern = os.path.join(data_dir, "[0-9]"*6, "sales_*.json")
-        for path in glob.glob(pattern):
+        for chunk in manifest["chunks"]:
+            if chunk["status"] == "success":
+                continue
+            key = f"{manifest['run_id']}/{chunk['id']}"
             try:
-                res = self.upload_record(path)
-                results[path] = res
-                log.info(f"Uploaded {path} => {res}")
-                dest = os.path.join(data_dir, "success") if res.get("result") == "success" else os.path.join(data_dir, "pending")
-                ensure_dir(dest)
-                shutil.move(path, os.path.join(dest, os.path.basename(path)))
+                res = self._post_csv(chunk["csv"])
             except Exception as e:
-                log.error(f"Error uploading {path}: {e}", exc_info=True)
-                results[path] = {"error": str(e)}
+                res = {"error": str(e)}
+            chunk["result"] = res
+            chunk["status"] = "success" if res.get("result") == "success" else "failed"
+            results[key] = res
+            log.info(f"Uploaded {key} ({chunk['rows']} rows, {chunk['orders']}) => {res}")
+            save_json_atomic(mpath, manifest)
+
+        if all(c["status"] == "success" for c in manifest["chunks"]):
+            sales = [s for c in manifest["chunks"] for s in c["sales"]]
+            journal.set_status(sales, "upload", "done")
+            done_dir = os.path.join(os.path.dirname(mpath), "done")
+            ensure_dir(done_dir)
+            shutil.move(mpath, os.path.join(done_dir, os.path.basename(mpath)))
         return results
 
 if __name__ == "__main__":
+    from logic.sales_journal import SalesJournal
     su = SalesUploader(token_env=".env.test", pattern_id=1, wait_flag=1)
-    print(su.upload_all(data_dir="data"))
+    print(su.upload_all(SalesJournal("data")))
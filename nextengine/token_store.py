@@ -0,0 +1,190 @@
+# nextengine/token_store.py
+"""
+Next Engine のアクセストークン／リフレッシュトークンをプロセス間で共有するストア。
+・トークンファイル（.env 形式）は初回だけ読み込み、以降はメモリ上の値を使う
+  （他プロセスが書き換えた場合は mtime の変化で検知して読み直す）
+・書き込みは一時ファイル + os.replace による原子的置換で、NE_TOKEN_VERSION を 1 ずつ加算
+・更新処理は <token_env>.lock のファイルロック下で行い、同じリフレッシュトークンを
+  複数プロセス・複数スレッドが同時に使って互いを無効化しないよう 1 回だけ実行（single-flight）
+・有効期限（NE_ACCESS_TOKEN_END_DATE）が近づいたら 401 を待たずに先回りで更新
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from dotenv import dotenv_values
+
+from logger import get_logger
+from nextengine.api_client import get_client
+from utils.file_lock import FileLock
+
+log = get_logger(__name__)
+
+TOKEN_PATH = "/api_neauth"
+END_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class TokenStore:
+    REFRESH_MARGIN = timedelta(minutes=10)
+
+    def __init__(self, token_env: str, http=None):
+        """
+        token_env: トークンファイルのパス（.env / .env.test）
+        http: post(path, data=...) を持つ HTTP クライアント。None なら共有クライアント
+        """
+        self.path = token_env
+        self.http = http
+        self._values: Dict[str, Optional[str]] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(f"{token_env}.lock")
+        self._reload()
+
+    # ――――― 読み込み ―――――
+    def _reload(self):
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            self._values = dict(dotenv_values(self.path))
+        except FileNotFoundError:
+            self._mtime, self._values = None, {}
+
+    def _current(self) -> Dict[str, Optional[str]]:
+        """他プロセスがファイルを更新していれば読み直して値を返す"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime:
+                self._reload()
+            return self._values
+
+    def get(self, key: str) -> Optional[str]:
+        return self._current().get(key)
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.get("NE_ACCESS_TOKEN")
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self.get("NE_REFRESH_TOKEN")
+
+    @property
+    def version(self) -> int:
+        return int(self.get("NE_TOKEN_VERSION") or 0)
+
+    def access_expires_at(self) -> Optional[datetime]:
+        raw = self.get("NE_ACCESS_TOKEN_END_DATE")
+        if not raw:
+            return None
+        try:
+            return datetime.strptime(raw, END_DATE_FORMAT)
+        except ValueError:
+            return None
+
+    # ――――― 更新 ―――――
+    def is_expiring(self, margin: Optional[timedelta] = None) -> bool:
+        end = self.access_expires_at()
+        return end is not None and datetime.now() + (margin or self.REFRESH_MARGIN) >= end
+
+    def ensure_fresh(self, margin: Optional[timedelta] = None) -> bool:
+        """期限切れが近ければ先回りで更新。更新したら True"""
+        if not self.is_expiring(margin):
+            return False
+        self.refresh(stale_access=self.access_token)
+        return True
+
+    def refresh(self, stale_access: Optional[str] = None) -> str:
+        """
+        トークンを更新し、新しいアクセストークンを返す。
+        stale_access が既に置き換わっていれば（他スレッド・他プロセスが更新済み）通信せずに返す。
+        """
+        with self._lock, self._file_lock:
+            self._reload()
+            current = self._values.get("NE_ACCESS_TOKEN")
+            if stale_access is not None and current and current != stale_access:
+                log.info(f"Token already refreshed elsewhere (v{self.version})")
+                return current
+            data = self._request_refresh()
+            self._write_locked(data)
+            log.info(f"Tokens refreshed (v{self.version})")
+            return self._values["NE_ACCESS_TOKEN"]
+
+    def _request_refresh(self) -> Dict[str, Any]:
+        payload = {
+            "grant_type": "refresh_token",
+            "refresh_token": self._values.get("NE_REFRESH_TOKEN"),
+            "client_id": self._values.get("NE_CLIENT_ID"),
+            "client_secret": self._values.get("NE_CLIENT_SECRET"),
+        }
+        res = (self.http or get_client()).post(TOKEN_PATH, data=payload)
+        res.raise_for_status()
+        data = res.json()
+        if "access_token" not in data or "refresh_token" not in data:
+            raise RuntimeError(f"Invalid token response: {data}")
+        return data
+
+    def absorb(self, response: Dict[str, Any]):
+        """
+        API レスポンスに新しいトークンが含まれていれば保存（NE は呼び出し時に自動更新する）。
+        ロック待ちの間に他スレッド・他プロセスが更新していれば、そちらの方が新しいので書かない
+        """
+        if not isinstance(response, dict):
+            return
+        access, refresh = response.get("access_token"), response.get("refresh_token")
+        started = self.access_token
+        if not (access and refresh) or access == started:
+            return
+        with self._lock, self._file_lock:
+            self._reload()
+            if self._values.get("NE_ACCESS_TOKEN") != started:
+                log.info(f"Tokens already updated elsewhere (v{self.version}); response ignored")
+                return
+            self._write_locked(response)
+
+    def _write_locked(self, data: Dict[str, Any]):
+        """ロック取得済み前提でトークンを原子的に書き込む"""
+        updates = {
+            "NE_ACCESS_TOKEN": data["access_token"],
+            "NE_REFRESH_TOKEN": data["refresh_token"],
+            "NE_TOKEN_VERSION": str(int(self._values.get("NE_TOKEN_VERSION") or 0) + 1),
+        }
+        if data.get("access_token_end_date"):
+            updates["NE_ACCESS_TOKEN_END_DATE"] = data["access_token_end_date"]
+        lines = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            pass
+        out, seen = [], set()
+        for line in lines:
+            key = line.split("=", 1)[0].strip()
+            if key in updates:
+                out.append(f"{key}={updates[key]}\n")
+                seen.add(key)
+            else:
+                out.append(line if line.endswith("\n") else line + "\n")
+        out.extend(f"{k}={v}\n" for k, v in updates.items() if k not in seen)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(out)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._reload()
+
+
+_stores: Dict[str, TokenStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_token_store(token_env: str = ".env") -> TokenStore:
+    """トークンファイルごとにプロセス内で 1 つのストアを返す"""
+    key = os.path.abspath(token_env)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = TokenStore(token_env)
+        return _stores[key]
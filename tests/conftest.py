@@ -0,0 +1,6 @@
+import tempfile
+
+import logger
+
+# テスト中のログはチェックアウト内の logs/ ではなく一時ディレクトリに書く
+logger.set_log_path(tempfile.mkdtemp(prefix="pos-test-logs-") + "/pos.jsonl")
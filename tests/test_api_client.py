@@ -0,0 +1,29 @@
+from benchmarks.ne_stub_server import StubServer
+from nextengine.api_client import NextEngineClient, get_client
+
+
+def test_client_reuses_connection_and_decodes_gzip():
+    with StubServer(response={"result": "success", "count": 1}) as server:
+        client = NextEngineClient(base_url=server.base_url, timeout=(1, 2))
+        for _ in range(3):
+            resp = client.post("/api_v1_master_goods/upload", data={"data": "x"})
+            assert resp.json() == {"result": "success", "count": 1}
+        client.close()
+    assert server.requests == 3
+    assert server.connections == 1
+    assert resp.headers["Content-Encoding"] == "gzip"
+
+
+def test_client_records_latency_and_errors_per_endpoint():
+    with StubServer(status=401) as server:
+        client = NextEngineClient(base_url=server.base_url, timeout=(1, 2))
+        client.post("/api_neauth", data={})
+        client.post("/api_neauth", data={})
+        client.close()
+    st = client.stats()["/api_neauth"]
+    assert st["count"] == 2 and st["errors"] == 2
+    assert st["max_ms"] >= st["avg_ms"] > 0
+
+
+def test_get_client_is_shared_per_process():
+    assert get_client() is get_client()
@@ -0,0 +1,28 @@
+import json
+
+from benchmarks.fixtures import make_record
+from benchmarks.suite import compare, main_compare
+
+
+def test_compare_flags_only_slowdowns_beyond_threshold():
+    base = {"a": 100.0, "b": 100.0, "c": 100.0, "old": 1.0}
+    new = {"a": 109.0, "b": 125.0, "c": 50.0, "added": 1.0}
+    rows = {key: (change, regressed) for key, _, _, change, regressed in compare(base, new, 10)}
+    assert rows["a"][1] is False and round(rows["a"][0]) == 9
+    assert rows["b"][1] is True and round(rows["b"][0]) == 25
+    assert rows["c"][1] is False
+    assert rows["old"] == (None, False) and rows["added"] == (None, False)
+
+
+def test_main_compare_exit_code(tmp_path):
+    base, new = tmp_path / "base.json", tmp_path / "new.json"
+    base.write_text(json.dumps({"results": {"receipt.build/lines=500": 3000.0}}))
+    new.write_text(json.dumps({"results": {"receipt.build/lines=500": 3200.0}}))
+    assert main_compare(str(base), str(new), 10) == 0
+    assert main_compare(str(base), str(new), 5) == 1
+
+
+def test_fixtures_are_deterministic():
+    rec = make_record(50)
+    assert rec == make_record(50) and len(rec["cart"]) == 50
+    assert rec["total_due"] == sum(i["price"] * i["quantity"] for i in rec["cart"])
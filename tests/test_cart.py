@@ -0,0 +1,92 @@
+from logic.cart import Cart, CartLine
+from ui.cart_view import CartListView
+
+
+class FakeListbox:
+    """tk.Listbox の代わり（insert / delete / curselection だけ）"""
+
+    def __init__(self):
+        self.items = []
+        self.sel = ()
+
+    def insert(self, index, text):
+        self.items.insert(len(self.items) if index == "end" else index, text)
+
+    def delete(self, first, last=None):
+        if first == 0 and last == "end":
+            self.items.clear()
+            return
+        del self.items[first:(first if last is None else last) + 1]
+
+    def curselection(self):
+        return self.sel
+
+
+def test_repeat_scans_merge_and_discounts_follow_line_id():
+    cart = Cart()
+    a = cart.add("a1", "商品A", 1000)
+    b = cart.add("b1", "商品B", 500)
+    assert cart.add("a1", "商品A", 1000) is a and a.quantity == 2
+    manual = [cart.add("", "手入力", 300), cart.add("", "手入力", 300)]
+    assert manual[0] is not manual[1] and len(cart) == 4
+
+    cart.discount_line(b.line_id, "fixed", 100)
+    cart.remove(a.line_id)
+    # 前の明細を消しても割引は商品B に付いたまま
+    assert cart.total == 400 + 300 + 300
+    cart.discount_order("percent", 10)
+    assert cart.total == 900
+    assert [r["quantity"] for r in cart.to_records()] == [1, 1, 1]
+
+
+def test_view_applies_only_model_diffs():
+    cart = Cart()
+    lb = FakeListbox()
+    view = CartListView(lb, cart)
+    a = cart.add("a1", "商品A", 1000)
+    cart.discount_order("fixed", 100)
+    b = cart.add("b1", "商品B", 500)
+    cart.add("a1", "商品A", 1000)
+    cart.discount_line(a.line_id, "percent", 10)
+    assert lb.items == ["商品A  ¥1000円 ×2", "  個別％値引き –¥100円", "商品B  ¥500円",
+                        "全体値引き –¥100円"]
+
+    lb.sel = (2,)
+    assert view.selected() is b and isinstance(view.selected(), CartLine)
+    assert cart.undo_last() and cart.undo_last()   # 個別％値引き → 商品A の 2 個目
+    assert lb.items == ["商品A  ¥1000円", "商品B  ¥500円", "全体値引き –¥100円"]
+    cart.remove(a.line_id)
+    assert lb.items == ["商品B  ¥500円", "全体値引き –¥100円"]
+    cart.remove(b.line_id)
+    cart.remove_discount(cart.order_discounts[0])
+    assert lb.items == [] and view.rows == [] and cart.total == 0
+    assert not cart.undo_last()
+
+
+def test_rescan_after_item_discount_starts_a_new_line():
+    cart = Cart()
+    lb = FakeListbox()
+    CartListView(lb, cart)
+    a = cart.add("a1", "商品A", 1000)
+    cart.discount_line(a.line_id, "percent", 10)
+    again = cart.add("a1", "商品A", 1000)
+    # 10% は最初の 1 個だけに掛かり、表示の値引き額と合計が一致する
+    assert again is not a and a.quantity == 1 and cart.total == 900 + 1000
+    assert lb.items == ["商品A  ¥1000円", "  個別％値引き –¥100円", "商品A  ¥1000円"]
+    assert cart.add("a1", "商品A", 1000) is again and again.quantity == 2
+
+
+def test_undo_follows_the_order_of_actions():
+    cart = Cart()
+    a = cart.add("a1", "商品A", 1000)
+    b = cart.add("b1", "商品B", 500)
+    cart.add("a1", "商品A", 1000)
+    assert cart.undo_last()
+    assert (a.quantity, [line.goods_id for line in cart]) == (1, ["a1", "b1"])
+    order = cart.discount_order("fixed", 100)
+    cart.discount_line(b.line_id, "fixed", 50)
+    assert cart.undo_last() and b.discounts == [] and cart.order_discounts == [order]
+    cart.remove_discount(order)
+    # 直接消した全体割引は飛ばして、その前のスキャン（商品B）を取り消す
+    assert cart.undo_last() and [line.goods_id for line in cart] == ["a1"]
+    assert cart.undo_last() and len(cart) == 0 and not cart.undo_last()
@@ -0,0 +1,42 @@
+import json
+import os
+from datetime import datetime
+
+from logic.cash_flow_recorder import CashFlowRecorder
+from logic.sales_journal import SalesJournal
+
+
+def _sale(journal, tx, ts, due, payments, change=0):
+    journal.append({"transaction_id": tx, "timestamp": ts, "cart": [], "total_due": due,
+                    "payments": payments, "change": change})
+
+
+def test_expected_cash_tracks_every_cash_movement(tmp_path):
+    journal = SalesJournal(str(tmp_path))
+    cash = CashFlowRecorder(str(tmp_path), journal=journal)
+    assert cash.record_deposit(10000, timestamp=datetime(2025, 6, 1, 9, 0)) == 10000
+    _sale(journal, "t1", "2025-06-01T10:00:00", 1600, [{"method": "現金", "amount": 2000.0}],
+          change=400)
+    _sale(journal, "t2", "2025-06-01T11:00:00", 3000,
+          [{"method": "現金", "amount": 1000.0}, {"method": "クレカ", "amount": 2000.0}])
+    _sale(journal, "t3", "2025-06-01T12:00:00", 500, [{"method": "QR", "amount": 500.0}])
+    assert cash.record_withdraw(3000, timestamp=datetime(2025, 6, 1, 13, 0)) == 9600
+    assert cash.expected_cash() == 10000 + 1600 + 1000 - 3000
+
+    # 点検: 過不足を返し、以降は実査額から積み上げる
+    assert cash.record_count(9500, timestamp=datetime(2025, 6, 1, 19, 0)) == (9600, -100)
+    assert cash.record_deposit(500, timestamp=datetime(2025, 6, 2, 9, 0)) == 10000
+    kinds = [e["kind"] for e in journal.iter_cash("20250601", "20250601")]
+    assert kinds == ["deposit", "sale", "change", "sale", "withdraw", "count"]
+
+
+def test_ledger_is_initialized_from_existing_records(tmp_path):
+    month_dir = os.path.join(str(tmp_path), "cashflow", "202505")
+    os.makedirs(month_dir)
+    with open(os.path.join(month_dir, "deposit_20250522_231325.json"), "w", encoding="utf-8") as f:
+        json.dump({"type": "deposit", "timestamp": "2025-05-22T23:13:25", "amount": 5000.0}, f)
+    journal = SalesJournal(str(tmp_path))
+    assert journal.cash_balance() == 5000
+    assert journal.rollup("20250522", "20250522")["cash_in"] == 5000
+    # 再度開いても取り込み直さない
+    assert SalesJournal(str(tmp_path)).cash_balance() == 5000
@@ -0,0 +1,54 @@
+import random
+
+from logic.discount_manager import DiscountManager
+
+
+def _check(dm, cart):
+    assert dm.total == dm.calculate_total(cart)
+
+
+def test_incremental_total_matches_full_recalculation():
+    rng = random.Random(20250601)
+    for _ in range(300):
+        dm, cart = DiscountManager(), []
+        for _ in range(rng.randint(1, 60)):
+            op = rng.random()
+            if op < 0.45 or not cart:
+                item = {"price": rng.choice([0, 1, 99, 550, 1100, 12800, rng.randint(1, 50000)]),
+                        "quantity": rng.randint(1, 5)}
+                cart.append(item)
+                dm.add_item(item["price"], item["quantity"])
+            elif op < 0.55:
+                # 範囲外の番号（後から追加される明細に効く）も従来どおり扱う
+                dm.apply_item_discount(rng.randint(-1, len(cart) + 1), rng.randint(1, 3000))
+            elif op < 0.65:
+                dm.apply_item_percent(rng.randint(0, len(cart) - 1), rng.randint(1, 100))
+            elif op < 0.72:
+                dm.apply_order_discount(rng.randint(1, 5000))
+            elif op < 0.79:
+                dm.apply_order_percent(rng.randint(1, 99))
+            elif op < 0.85 and dm.item_discounts:
+                dm.pop_item_discount()
+            elif op < 0.88 and dm.order_discounts:
+                dm.pop_order_discount()
+            elif op < 0.94:
+                index = rng.randrange(len(cart)) if rng.random() < 0.3 else len(cart) - 1
+                cart.pop(index)
+                dm.remove_item(index)
+            else:
+                index = rng.randrange(len(cart))
+                cart[index]["quantity"] = rng.randint(1, 9)
+                dm.set_quantity(index, cart[index]["quantity"])
+            _check(dm, cart)
+
+
+def test_clear_resets_lines_and_discounts():
+    dm = DiscountManager()
+    dm.add_item(1000)
+    dm.apply_item_percent(0, 10)
+    dm.apply_order_discount(100)
+    assert dm.total == 800
+    dm.clear()
+    assert dm.total == 0 and not dm.item_discounts and not dm.order_discounts
+    dm.add_item(500)
+    assert dm.total == 500
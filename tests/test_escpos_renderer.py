@@ -0,0 +1,29 @@
+from utils.escpos_renderer import CODEPAGE_CP932, DRAWER_KICK, INIT, render
+
+
+def test_style_commands_only_on_change():
+    jobs = [
+        ("text", "A", {"align": "center", "bold": True}),
+        ("text", "B", {"align": "center", "bold": True}),
+        ("text", "C", {}),
+    ]
+    data = render(jobs)
+    assert data == b"".join([
+        INIT, CODEPAGE_CP932,
+        b"\x1ba\x01\x1bE\x01A\n", b"B\n",
+        b"\x1ba\x00\x1bE\x00C\n",
+    ])
+
+
+def test_cp932_text_size_cut_and_drawer():
+    jobs = [("text", "領収書", {"width": 2, "height": 2}), ("text", "", {}), ("cut", None, {})]
+    data = render(jobs, kick_drawer=True)
+    assert "領収書".encode("cp932") + b"\n" in data
+    assert b"\x1d!\x11" in data and b"\x1d!\x00" in data
+    assert data.endswith(b"\x1dV\x00" + DRAWER_KICK)
+
+
+def test_image_uses_given_renderer():
+    data = render([("image", "logo.png", {"align": "center"})],
+                  image_renderer=lambda p: b"<" + p.encode() + b">")
+    assert data.endswith(b"\x1ba\x01<logo.png>")
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+from logic.goods_manager import GoodsManager
+from logic.goods_search import NameIndex
+
+
+@pytest.fixture
+def gm(tmp_path):
+    goods = [
+        {"goods_id": "140006400015", "goods_name": "機関士", "goods_6_item": "AB1234",
+         "goods_selling_price": "1320.00"},
+        {"goods_id": "140006400016", "goods_name": "車掌", "goods_6_item": "",
+         "goods_selling_price": "1320.00"},
+        {"goods_id": "120800003050", "goods_name": "情景箱", "goods_6_item": "",
+         "goods_selling_price": "99000.00"},
+    ]
+    (tmp_path / "goods_data.json").write_text(json.dumps(goods, ensure_ascii=False),
+                                              encoding="utf-8")
+    manager = GoodsManager(str(tmp_path))
+    manager.load_index()
+    manager._name_thread.join()
+    return manager
+
+
+def test_prefix_search_narrows_with_each_keystroke(gm):
+    assert [g["goods_name"] for g in gm.prefix_search("1")] == ["情景箱", "機関士", "車掌"]
+    assert [g["goods_name"] for g in gm.prefix_search("14")] == ["機関士", "車掌"]
+    assert [g["goods_name"] for g in gm.prefix_search("1400064000")] == ["機関士", "車掌"]
+    assert [g["goods_name"] for g in gm.prefix_search("140006400016")] == ["車掌"]
+    # 文字を消して打ち直しても全体から探し直す
+    assert [g["goods_name"] for g in gm.prefix_search("12")] == ["情景箱"]
+
+
+def test_prefix_search_matches_both_codes_without_duplicates(gm):
+    assert [g["goods_name"] for g in gm.prefix_search("ab")] == ["機関士"]
+    assert len(gm.prefix_search("1", limit=2)) == 2
+    assert gm.prefix_search("") == [] and gm.prefix_search("9") == []
+
+
+def test_search_name_ranks_phrase_matches(gm):
+    assert [g["goods_name"] for g in gm.search_name("機関")] == ["機関士"]
+    assert gm.search_name("存在しない") == []
+
+
+def test_search_name_does_not_wait_for_index(tmp_path):
+    gm = GoodsManager(str(tmp_path))
+    # 索引の作成中（ここではまだ読み込み前）は待たずに空を返す
+    assert not gm.name_index_ready and gm.search_name("機関") == []
+
+
+def test_name_index_folds_width_and_kana():
+    idx = NameIndex(["「ミニジョブ　MINI JOB」　：情景箱", "ミニカー", "ジョブ ミニ"])
+    assert idx.search("みにじょぶ") == [0]
+    assert idx.search("ﾐﾆｼﾞｮﾌﾞ") == [0]
+    assert idx.search("ＭＩＮＩ job") == [0]
+    # 全語を含むものを語順一致・短い順に
+    assert idx.search("ミニ") == [1, 2, 0]
+
+
+def test_all_goods_is_cached_until_master_changes(gm, tmp_path):
+    first = gm.all_goods()
+    assert [g.goods_name for g in first] == ["機関士", "車掌", "情景箱"]
+    assert gm.all_goods() is first
+    assert [g.goods_id for g in gm.all_goods(stream=True)] == [g.goods_id for g in first]
+
+    old_snapshot = gm.snapshot
+    goods_file = tmp_path / "goods_data.json"
+    goods_file.write_text(json.dumps([{"goods_id": "999", "goods_name": "新商品",
+                                       "goods_6_item": "", "goods_selling_price": "500.00"}],
+                                     ensure_ascii=False), encoding="utf-8")
+    st = os.stat(goods_file)
+    os.utime(goods_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert [g.goods_name for g in gm.all_goods()] == ["新商品"]
+    assert gm.lookup("999").price == 500 and gm.lookup("140006400015") is None
+    # 差し替え前のマスタを参照していた側はそのまま使える
+    assert old_snapshot.record(old_snapshot.find("140006400015")).goods_name == "機関士"
+
+
+def test_refresh_keeps_current_index_when_file_is_broken(gm, tmp_path):
+    goods_file = tmp_path / "goods_data.json"
+    goods_file.write_text("[{broken", encoding="utf-8")
+    assert gm.refresh() is False
+    assert gm.lookup("140006400015").goods_name == "機関士"
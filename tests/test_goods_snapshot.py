@@ -0,0 +1,45 @@
+import json
+import os
+
+from logic.goods_snapshot import GoodsSnapshot, load_snapshot, parse_price, write_snapshot
+
+
+def _goods():
+    return [
+        {"goods_id": "G1", "goods_name": "機関士", "goods_6_item": "X1",
+         "goods_selling_price": "1320.00"},
+        {"goods_id": "X1", "goods_name": "車掌", "goods_6_item": "", "goods_selling_price": "990"},
+        {"goods_id": "G3", "goods_name": "", "goods_6_item": None, "goods_selling_price": None},
+    ]
+
+
+def test_snapshot_round_trip_and_lookup_priority(tmp_path):
+    path = str(tmp_path / "goods.snap")
+    write_snapshot(_goods(), path)
+    snap = GoodsSnapshot(path)
+    assert len(snap) == 3
+    assert [r.price for r in snap] == [1320, 990, 0]
+    # goods_6_item が goods_id より優先（従来の index → fallback の順）
+    assert snap.record(snap.find("x1")).goods_name == "機関士"
+    assert snap.record(snap.find("g3")).goods_6_item == ""
+    assert snap.find("nothing") is None
+    rec = snap.record(0)
+    assert rec.get("goods_selling_price") == 1320 and rec["goods_name"] == "機関士"
+
+
+def test_load_snapshot_rebuilds_when_json_changes(tmp_path):
+    goods_file = tmp_path / "goods_data.json"
+    goods_file.write_text(json.dumps(_goods()), encoding="utf-8")
+    cache = str(tmp_path / "cache")
+    first = load_snapshot(str(goods_file), cache)
+    assert load_snapshot(str(goods_file), cache).path == first.path
+    goods_file.write_text(json.dumps(_goods()[:1]), encoding="utf-8")
+    st = os.stat(goods_file)
+    os.utime(goods_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = load_snapshot(str(goods_file), cache)
+    assert second.path != first.path and len(second) == 1
+
+
+def test_parse_price():
+    assert parse_price("99000.00") == 99000
+    assert parse_price("") == 0 and parse_price("abc") == 0
@@ -0,0 +1,68 @@
+import json
+
+from nextengine.goods_sync import GoodsMasterSync
+
+
+class FakeNE:
+    """商品マスタ API の代わり（goods_last_modified_date-gte で絞り込み、offset/limit でページ分け）"""
+
+    def __init__(self, goods):
+        self.goods = goods
+        self.calls = []
+
+    def post(self, path, data=None):
+        self.calls.append((path, dict(data)))
+        since = data.get("goods_last_modified_date-gte")
+        rows = [g for g in self.goods if not since or g["goods_last_modified_date"] >= since]
+        if path.endswith("/count"):
+            body = {"result": "success", "count": str(len(rows))}
+        else:
+            offset, limit = int(data["offset"]), int(data["limit"])
+            body = {"result": "success", "data": rows[offset:offset + limit]}
+        return type("Resp", (), {
+            "status_code": 200,
+            "raise_for_status": lambda self: None,
+            "json": lambda self: body,
+        })()
+
+
+def _goods(i, name, date, deleted="0"):
+    return {"goods_id": f"g{i:03d}", "goods_name": name, "goods_selling_price": "100",
+            "goods_6_item": "", "goods_deleted_flag": deleted, "goods_last_modified_date": date}
+
+
+def _env(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("NE_ACCESS_TOKEN=a0\nNE_REFRESH_TOKEN=r0\n", encoding="utf-8")
+    return str(path)
+
+
+def _master(data_dir):
+    goods = json.loads((data_dir / "goods_data.json").read_text(encoding="utf-8"))
+    return {g["goods_id"]: g for g in goods}
+
+
+def test_full_then_incremental_sync(tmp_path):
+    old = "2000-01-01 00:00:00"
+    ne = FakeNE([_goods(i, f"商品{i}", old) for i in range(25)])
+    sync = GoodsMasterSync(token_env=_env(tmp_path), data_dir=str(tmp_path), http=ne,
+                           page_size=10, workers=3)
+
+    res = sync.run()
+    assert res["mode"] == "full" and res["total"] == 25
+    master = _master(tmp_path)
+    assert list(master) == [f"g{i:03d}" for i in range(25)]  # ページの順序を保つ
+    assert "goods_deleted_flag" not in master["g000"]
+
+    # 更新 1 件・削除 1 件・追加 1 件 → 差分だけ取得してマージ
+    new = "2999-01-01 00:00:00"
+    ne.goods[3] = _goods(3, "改名", new)
+    ne.goods[4] = _goods(4, "商品4", new, deleted="1")
+    ne.goods.append(_goods(99, "新商品", new))
+    ne.calls.clear()
+    res = sync.run()
+    assert res == {"mode": "incremental", "fetched": 3, "updated": 2, "deleted": 1, "total": 25}
+    assert all(call[1]["goods_last_modified_date-gte"] for call in ne.calls)
+    master = _master(tmp_path)
+    assert master["g003"]["goods_name"] == "改名"
+    assert "g004" not in master and "g099" in master and master["g010"]["goods_name"] == "商品10"
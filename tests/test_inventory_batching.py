@@ -0,0 +1,119 @@
+import pytest
+
+from logic.post_sale_pipeline import PostSalePipeline
+from logic.sales_journal import INFLIGHT, SalesJournal
+from nextengine.inventory_batcher import InventoryBatcher
+from nextengine.inventory_updater import InventoryUpdater
+from utils.file_utils import load_json
+
+
+@pytest.fixture
+def updater(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    env = tmp_path / ".env.test"
+    env.write_text(
+        "NE_ACCESS_TOKEN=a\nNE_REFRESH_TOKEN=r\nNE_CLIENT_ID=c\n"
+        "NE_CLIENT_SECRET=s\nNE_REDIRECT_URI=https://localhost/cb\n",
+        encoding="utf-8",
+    )
+    return InventoryUpdater(token_env=str(env), simulate=True, data_dir=str(tmp_path / "store"))
+
+
+def _sale(tx, cart, ts="2025-06-01T10:00:00"):
+    return {"transaction_id": tx, "timestamp": ts, "cart": cart, "total_due": 0, "payments": []}
+
+
+def test_build_batch_csv_nets_deltas_per_code(updater):
+    records = [
+        {"cart": [{"goods_id": "A", "quantity": 1}, {"goods_id": "B", "quantity": 2}]},
+        {"cart": [{"goods_id": "A", "quantity": 1}]},
+        {"cart": [{"goods_id": "A", "quantity": 1}, {"goods_id": "", "quantity": 5}]},
+    ]
+    csv_data, rows = updater.build_batch_csv(records)
+    assert rows == 2
+    assert csv_data.splitlines() == ["syohin_code,zaiko_su", "A,-3", "B,-2"]
+
+
+def test_update_records_writes_manifest(updater, tmp_path):
+    records = [_sale("t1", [{"goods_id": "A", "quantity": 1}]),
+               _sale("t2", [{"goods_id": "A", "quantity": 2}])]
+    manifest = updater.update_records(records)
+    assert manifest["rows"] == 1 and manifest["ok"]
+    assert manifest["sales"] == ["t1", "t2"]
+    batch_dir = tmp_path / "store" / "inventory_batches"
+    saved = load_json(batch_dir / f"batch_{manifest['batch_id']}.json")
+    assert saved["result"] == {"simulated": True}
+
+
+def test_batcher_flushes_on_count(updater, tmp_path):
+    results = []
+    batcher = InventoryBatcher(lambda: updater, max_sales=2, window_sec=60,
+                               on_result=results.append)
+    batcher.add(_sale("t1", [{"goods_id": "A", "quantity": 1}]))
+    assert batcher.pending() == 1 and results == []
+    batcher.add(_sale("t2", [{"goods_id": "A", "quantity": 1}]))
+    assert batcher.pending() == 0
+    assert results[0]["sales"] == ["t1", "t2"]
+
+
+def test_failed_batch_is_retried_through_pipeline(tmp_path):
+    journal = SalesJournal(str(tmp_path / "data"))
+    for n in range(2):
+        journal.append(_sale(f"t{n}", [{"goods_id": "A", "quantity": 1}]))
+    outcomes = [RuntimeError("offline"), False, True]  # 例外 → ok でない → 成功
+
+    class FlakyUpdater:
+        def update_records(self, records):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return {"batch_id": "b", "sales": [r["transaction_id"] for r in records],
+                    "rows": 1, "ok": outcome, "result": {}}
+
+    def on_result(manifest):
+        journal.set_status(manifest["sales"], "sync", "done" if manifest["ok"] else "failed")
+
+    pipe = PostSalePipeline(queue_dir=tmp_path / "queue", max_attempts=3, backoff=0)
+    batcher = InventoryBatcher(
+        FlakyUpdater, max_sales=2, on_result=on_result,
+        submit=lambda records: pipe.submit({"records": records}, stage="inventory_batch"),
+    )
+    pipe.add_stage("inventory_batch", lambda p: batcher.send(p["records"]), broadcast=False)
+    pipe.start()
+    for record in journal.pending("sync"):
+        batcher.add(record)
+    assert pipe.wait_idle(5)
+    pipe.stop()
+    assert outcomes == []
+    assert pipe.status()["inventory_batch"]["retries"] == 2
+    assert journal.pending("sync") == []
+
+
+def test_update_all_marks_journal_status(updater, tmp_path):
+    journal = SalesJournal(str(tmp_path / "data"))
+    for n in range(3):
+        journal.append(_sale(f"t{n}", [{"goods_id": "A", "quantity": 1}]))
+    results = updater.update_all(journal, batch_size=2)
+    assert set(results) == {"t0", "t1", "t2"}
+    assert journal.pending("sync") == []
+    assert len(list((tmp_path / "store" / "inventory_batches").glob("*.json"))) == 2
+
+
+def test_daily_sync_skips_sales_held_in_a_batch(updater, tmp_path):
+    journal = SalesJournal(str(tmp_path / "data"))
+    # 会計中の売上は inflight で記録され、バッチにたまっている
+    held = _sale("t0", [{"goods_id": "A", "quantity": 1}])
+    journal.append(held, statuses={"sync": INFLIGHT})
+    journal.append(_sale("t1", [{"goods_id": "B", "quantity": 1}]))
+    batcher = InventoryBatcher(
+        lambda: updater, max_sales=10, window_sec=60,
+        on_result=lambda m: journal.set_status(m["sales"], "sync", "done"),
+    )
+    batcher.add(held)
+
+    # バッチの待ち時間中に日次処理が走っても、バッチ内の売上は送らない
+    assert set(updater.update_all(journal)) == {"t1"}
+    assert journal.inflight("sync") == ["t0"]
+    manifest = batcher.flush()
+    assert manifest["sales"] == ["t0"]
+    assert journal.inflight("sync") == [] and journal.pending("sync") == []
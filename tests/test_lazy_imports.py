@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.bench_import_time import DEFERRED, parse_importtime
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_gui_import_defers_printer_http_and_yaml():
+    code = ("import sys, ui.pos_gui; "
+            "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                         text=True, check=True).stdout.split()
+    assert "ui" in out
+    assert not set(DEFERRED) & set(out)
+
+
+def test_parse_importtime():
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   json.decoder\n"
+              "import time:       300 |        420 | json\n")
+    assert parse_importtime(stderr) == [("json.decoder", 120, 120), ("json", 300, 420)]
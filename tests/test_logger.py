@@ -0,0 +1,32 @@
+import json
+import threading
+
+import logger
+from logger import flush, get_logger, sample, set_log_path
+
+
+def test_records_go_through_queue_to_shared_jsonl_sink(tmp_path):
+    log = get_logger("tests.logger")
+    assert get_logger("tests.other").handlers == log.handlers  # 全モジュールで 1 つのキュー
+    previous = logger.LOG_PATH
+    set_log_path(str(tmp_path / "pos.jsonl"))
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.error("failed %s", "checkout", exc_info=True)
+        flush()
+    finally:
+        set_log_path(previous)
+    with open(tmp_path / "pos.jsonl", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    entry = next(e for e in reversed(entries) if e["logger"] == "tests.logger")
+    assert entry["level"] == "ERROR" and entry["msg"] == "failed checkout"
+    assert entry["thread"] == threading.current_thread().name
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_sample_every_nth_per_key():
+    hits = [sample("tests.a", every=3) for _ in range(7)]
+    assert hits == [True, False, False, True, False, False, True]
+    assert sample("tests.b", every=3)  # key ごとに数える
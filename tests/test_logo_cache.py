@@ -0,0 +1,62 @@
+import os
+
+from utils.logo_cache import LogoCache, nv_define_command, nv_print_command
+
+
+def _counting_rasterizer(calls):
+    def rasterize(path):
+        calls.append(path)
+        return 2, 3, b"\xff" * 6
+    return rasterize
+
+
+def test_raster_is_computed_once_and_reused_from_disk(tmp_path):
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"png")
+    calls = []
+    cache = LogoCache(tmp_path / "cache", profile="TM-T30III",
+                      rasterizer=_counting_rasterizer(calls))
+    first = cache.command(str(logo))
+    assert cache.command(str(logo)) == first
+    assert first.startswith(b"\x1dv0\x00\x02\x00\x03\x00")
+    # 別プロセス相当（メモリキャッシュ無し）でもディスクから読む
+    again = LogoCache(tmp_path / "cache", profile="TM-T30III",
+                      rasterizer=_counting_rasterizer(calls))
+    assert again.command(str(logo)) == first
+    assert len(calls) == 1
+
+
+def test_mtime_or_profile_change_invalidates(tmp_path):
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"png")
+    calls = []
+    cache = LogoCache(tmp_path / "cache", profile="A", rasterizer=_counting_rasterizer(calls))
+    cache.raster(str(logo))
+    st = os.stat(logo)
+    os.utime(logo, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    cache.raster(str(logo))
+    other = LogoCache(tmp_path / "cache", profile="B", rasterizer=_counting_rasterizer(calls))
+    other.raster(str(logo))
+    assert len(calls) == 3
+
+
+def test_nv_logo_is_defined_once_then_recalled(tmp_path):
+    logo = tmp_path / "logo.png"
+    logo.write_bytes(b"png")
+    cache = LogoCache(tmp_path / "cache", nv_key="LG", rasterizer=_counting_rasterizer([]))
+    first = cache.command(str(logo))
+    assert first.startswith(b"\x1d(L") and first.endswith(nv_print_command("LG"))
+    # 送信に失敗した（commit_nv 未呼び出し）なら次回も登録コマンドを送る
+    assert cache.command(str(logo)) == first
+    cache.commit_nv()
+    assert cache.command(str(logo)) == nv_print_command("LG")
+
+
+def test_nv_define_uses_4_byte_length_for_large_logo():
+    small = nv_define_command("LG", 2, 3, b"\xff" * 6)
+    assert small[:3] == b"\x1d(L" and int.from_bytes(small[3:5], "little") == len(small) - 5
+    # 72000 バイトのラスタは GS ( L の 2 バイト長に収まらない
+    large = nv_define_command("LG", 72, 1000, b"\x00" * 72000)
+    assert large[:3] == b"\x1d8L"
+    assert int.from_bytes(large[3:7], "little") == len(large) - 7
+    assert large[7:10] == b"\x30\x43\x30"
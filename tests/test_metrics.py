@@ -0,0 +1,34 @@
+import json
+
+from utils.metrics import Histogram, Metrics
+
+
+def test_histogram_percentiles_within_bucket_error():
+    hist = Histogram()
+    for ms in range(1, 101):
+        hist.add(float(ms))
+    assert hist.count == 100 and hist.max_ms == 100
+    for p in (50, 95, 99):
+        assert p <= hist.percentile(p) <= p * 1.2
+    assert hist.percentile(100) == 100
+    hist.add(10 ** 9)  # 範囲外は最後のバケットで、最大値を返す
+    assert hist.percentile(100) == 10 ** 9
+
+
+def test_spans_flush_window_and_keep_totals(tmp_path):
+    metrics = Metrics(out_dir=str(tmp_path))
+    with metrics.span("scan.lookup"):
+        pass
+    metrics.record("checkout.record", 12.0)
+    path = metrics.flush()
+    assert metrics.flush() is None  # 前回以降の記録が無ければ書かない
+    metrics.record("checkout.record", 30.0)
+    metrics.flush()
+
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(lines[0]["stages"]) == ["checkout.record", "scan.lookup"]
+    assert lines[1]["stages"]["checkout.record"]["count"] == 1
+    summary = metrics.summary()
+    assert summary["checkout.record"]["count"] == 2
+    assert summary["checkout.record"]["max"] == 30.0
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from logic.sales_journal import SalesJournal
+from nextengine.order_consolidator import build_chunks, consolidate
+from nextengine.sales_uploader import SalesUploader
+
+
+def _sale(ts, cart, method="現金"):
+    total = sum(i["price"] * i["quantity"] for i in cart)
+    return {
+        "transaction_id": ts.replace("-", "").replace(":", "").replace("T", "_"),
+        "timestamp": ts, "cart": cart, "total_due": total,
+        "payments": [{"method": method, "amount": total}], "change": 0,
+    }
+
+
+def _item(code, qty=1, price=100):
+    return {"goods_id": code, "code": code, "name": f"商品{code}", "price": price, "quantity": qty}
+
+
+def test_consolidate_merges_items_per_day():
+    records = [
+        _sale("2025-06-01T10:00:00", [_item("A"), _item("B", 2)]),
+        _sale("2025-06-01T11:00:00", [_item("A", 3)], method="QR"),
+        _sale("2025-06-02T09:00:00", [_item("A")]),
+    ]
+    orders = consolidate(records)
+    assert list(orders) == ["20250601", "20250602"]
+    rows = orders["20250601"].rows()
+    assert [(r[6], r[8]) for r in rows] == [("A", 4), ("B", 2)]
+    assert rows[0][0] == "POS-20250601_100000" and rows[0][3] == "複数" and rows[0][4] == 600
+
+
+def test_build_chunks_respects_max_rows_and_splits_large_orders():
+    records = [_sale("2025-06-01T10:00:00", [_item(str(i)) for i in range(5)]),
+               _sale("2025-06-02T10:00:00", [_item("X")])]
+    chunks = build_chunks(consolidate(records), max_rows=3)
+    assert [c["rows"] for c in chunks] == [3, 3]
+    assert chunks[0]["orders"] == ["POS-20250601_100000"]
+    assert chunks[1]["orders"] == ["POS-20250601_100000-p2", "POS-20250602_100000"]
+    assert chunks[1]["sales"] == ["20250601_100000", "20250602_100000"]
+
+
+def test_split_order_parts_carry_their_own_totals():
+    cart = [_item(str(i), qty=1 + i % 3, price=100 + i) for i in range(7)]
+    sale = _sale("2025-06-01T10:00:00", cart)
+    sale["total_due"] -= 250  # 全体値引きは明細額 608 / 626 / 106 に比例して割り振る
+    chunks = build_chunks(consolidate([sale]), max_rows=3)
+    totals = {}
+    for chunk in chunks:
+        for row in chunk["csv"].splitlines()[1:]:
+            cols = row.split(",")
+            assert totals.setdefault(cols[0], int(cols[4])) == int(cols[4])
+    assert list(totals) == ["POS-20250601_100000", "POS-20250601_100000-p2",
+                            "POS-20250601_100000-p3"]
+    assert sum(totals.values()) == sale["total_due"]
+    assert list(totals.values()) == [608 - 114, 626 - 117, 106 - 19]
+
+
+@pytest.fixture
+def uploader(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env").write_text(
+        "NE_ACCESS_TOKEN=a\nNE_REFRESH_TOKEN=r\nNE_CLIENT_ID=c\nNE_CLIENT_SECRET=s\n",
+        encoding="utf-8",
+    )
+    return SalesUploader(token_env=str(tmp_path / ".env"))
+
+
+def test_partial_failure_retries_only_failed_chunks(uploader, tmp_path, monkeypatch):
+    journal = SalesJournal(str(tmp_path / "data"))
+    for day in range(1, 5):
+        journal.append(_sale(f"2025-06-0{day}T10:00:00", [_item("A"), _item("B")]))
+    sent = []
+
+    def post(csv_data):
+        sent.append(csv_data)
+        if "POS-20250602_100000" in csv_data and len(sent) <= 4:
+            return {"result": "error"}
+        return {"result": "success"}
+
+    monkeypatch.setattr(uploader, "_post_csv", post)
+    data_dir = str(tmp_path / "data")
+    first = uploader.upload_consolidated(journal, data_dir=data_dir, max_rows=2)
+    assert len(first) == 4 and len(sent) == 4
+    assert sum(r["result"] == "error" for r in first.values()) == 1
+
+    assert len(journal.pending("upload")) == 4
+
+    second = uploader.upload_consolidated(journal, data_dir=data_dir, max_rows=2)
+    assert len(second) == 1 and list(second.values())[0] == {"result": "success"}
+    assert journal.pending("upload") == []
+    assert os.listdir(tmp_path / "data" / "sales_upload" / "done")
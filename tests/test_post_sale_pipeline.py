@@ -0,0 +1,50 @@
+from logic.post_sale_pipeline import PostSalePipeline
+from utils.durable_queue import DurableQueue
+
+
+def test_jobs_run_in_order_and_are_removed(tmp_path):
+    seen = []
+    pipe = PostSalePipeline(queue_dir=tmp_path, backoff=0)
+    pipe.add_stage("print", lambda p: seen.append(p["n"]))
+    pipe.start()
+    for n in range(5):
+        pipe.submit({"n": n})
+    assert pipe.wait_idle(5)
+    pipe.stop()
+    assert seen == [0, 1, 2, 3, 4]
+    assert pipe.status()["print"]["done"] == 5
+    assert list((tmp_path / "print").glob("*.json")) == []
+
+
+def test_retry_then_give_up_moves_job_to_failed(tmp_path):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload)
+        raise RuntimeError("offline")
+
+    pipe = PostSalePipeline(queue_dir=tmp_path, max_attempts=3, backoff=0)
+    pipe.add_stage("inventory", flaky)
+    pipe.start()
+    pipe.submit({"sale": 1})
+    assert pipe.wait_idle(5)
+    pipe.stop()
+    status = pipe.status()["inventory"]
+    assert len(calls) == 3
+    assert status["failed"] == 1 and status["retries"] == 2
+    assert status["last_error"] == "offline"
+    assert len(list((tmp_path / "inventory" / "failed").glob("*.json"))) == 1
+
+
+def test_pending_jobs_survive_restart(tmp_path):
+    q = DurableQueue(tmp_path, "receipt")
+    q.put({"n": 1})
+    q.put({"n": 2})
+
+    seen = []
+    pipe = PostSalePipeline(queue_dir=tmp_path, backoff=0)
+    pipe.add_stage("receipt", lambda p: seen.append(p["n"]))
+    pipe.start()
+    assert pipe.wait_idle(5)
+    pipe.stop()
+    assert seen == [1, 2]
@@ -0,0 +1,75 @@
+import time
+
+from utils.print_spooler import PrintSpooler
+
+
+class FakePrinter:
+    online = False
+    printed = []
+
+    def connect(self):
+        if not FakePrinter.online:
+            raise RuntimeError("Printer connection failed: refused")
+
+    def execute(self, jobs, kick_drawer=True):
+        FakePrinter.printed.append((jobs[0][1], kick_drawer))
+
+    def close(self):
+        pass
+
+
+def _spooler(tmp_path, **kw):
+    FakePrinter.printed = []
+    return PrintSpooler(FakePrinter, queue_dir=tmp_path, backoff=0.01, max_backoff=0.05, **kw)
+
+
+def test_offline_jobs_print_in_order_after_reconnect(tmp_path):
+    FakePrinter.online = False
+    done = []
+    spooler = _spooler(tmp_path, on_printed=lambda p: done.append(p["transaction_id"]))
+    spooler.start()
+    for n in range(3):
+        spooler.submit([["text", f"r{n}", {}]], transaction_id=f"t{n}")
+    time.sleep(0.2)
+    status = spooler.status()
+    assert status["state"] == "offline" and status["pending"] == 3
+    FakePrinter.online = True
+    assert spooler.wait_idle(5)
+    spooler.stop()
+    assert [text for text, _ in FakePrinter.printed] == ["r0", "r1", "r2"]
+    assert done == ["t0", "t1", "t2"]
+    assert spooler.status()["connects"] == 1
+
+
+def test_stale_jobs_do_not_kick_drawer(tmp_path):
+    FakePrinter.online = False
+    spooler = _spooler(tmp_path, drawer_window=0.1)
+    spooler.start()
+    spooler.submit([["text", "late", {}]])
+    time.sleep(0.3)
+    FakePrinter.online = True
+    spooler.submit([["text", "now", {}]])
+    assert spooler.wait_idle(5)
+    spooler.stop()
+    assert FakePrinter.printed[0] == ("late", False)
+
+
+def test_unprinted_jobs_survive_restart(tmp_path):
+    FakePrinter.online = False
+    spooler = _spooler(tmp_path)
+    spooler.submit([["text", "kept", {}]])
+    FakePrinter.online = True
+    restarted = _spooler(tmp_path)
+    restarted.start()
+    assert restarted.wait_idle(5)
+    restarted.stop()
+    assert FakePrinter.printed == [("kept", True)]
+
+
+def test_warm_connects_before_first_job(tmp_path):
+    FakePrinter.online = True
+    spooler = _spooler(tmp_path)
+    spooler.start()
+    assert spooler.warm().wait(2)
+    assert spooler.status()["connected"] and spooler.status()["connects"] == 1
+    spooler.stop()
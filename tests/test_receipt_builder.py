@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from utils.receipt_builder import ReceiptBuilder, fit_text
+
+LAYOUT = """
+header:
+  - text: "{title}"
+    align: center
+body:
+  separator: "----"
+  columns:
+    - name: "商品名"
+      width: 8
+    - name: "数"
+      width: 3
+      align: right
+footer:
+  - text: '合計 {{total:,}}'
+    align: right
+"""
+
+
+def _sale():
+    return {"items": [{"name": "りんごジュース", "price": 100, "quantity": 2}], "total": 200,
+            "change": 0, "timestamp": datetime(2025, 6, 1, 10, 0), "pay_method_name": "現金",
+            "pay_amount": 200}
+
+
+def test_fit_text_counts_full_width_as_two():
+    assert fit_text("りんごジュース", 8) == "りんごジ"
+    assert fit_text("abc", 5) == "abc  "
+    assert fit_text("aあ", 2) == "a "
+
+
+def test_build_fills_items_and_footer(tmp_path):
+    path = tmp_path / "layout.yaml"
+    path.write_text(LAYOUT.format(title="領収書"), encoding="utf-8")
+    job = ReceiptBuilder(str(path)).build(_sale())
+    texts = [text for _, text, _ in job]
+    assert texts[0] == "領収書"
+    assert "りんごジ  2" in texts
+    assert ("text", "合計 200", {"align": "right"}) in job
+    assert job[-1] == ("cut", None, {})
+
+
+def test_layout_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "layout.yaml"
+    path.write_text(LAYOUT.format(title="領収書"), encoding="utf-8")
+    builder = ReceiptBuilder(str(path))
+    first = builder.template
+    assert builder.template is first
+    path.write_text(LAYOUT.format(title="お買上票"), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert builder.build(_sale())[0][1] == "お買上票"
+    # 壊れた YAML では前のテンプレートを使い続ける
+    path.write_text("header: [", encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+    assert builder.build(_sale())[0][1] == "お買上票"
+
+
+def test_missing_layout_raises_on_first_use(tmp_path):
+    builder = ReceiptBuilder(config_path=str(tmp_path / "missing.yaml"))
+    with pytest.raises(FileNotFoundError):
+        builder.build(_sale())
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from logic.cash_flow_recorder import CashFlowRecorder
+from logic.report_generator import ReportGenerator
+from logic.sales_journal import SalesJournal
+from utils.receipt_builder import ReceiptBuilder, disp_width
+
+
+def _sale(journal, tx, ts, due, payments, change=0):
+    journal.append({"transaction_id": tx, "timestamp": ts, "cart": [], "total_due": due,
+                    "payments": payments, "change": change})
+
+
+def test_daily_and_monthly_figures(tmp_path):
+    data_dir = str(tmp_path)
+    journal = SalesJournal(data_dir)
+    _sale(journal, "t1", "2025-06-01T10:00:00", 1600, [{"method": "現金", "amount": 2000.0}],
+          change=400)
+    _sale(journal, "t2", "2025-06-01T11:00:00", 3000,
+          [{"method": "現金", "amount": 1000.0}, {"method": "クレカ", "amount": 2000.0}])
+    _sale(journal, "t3", "2025-06-02T11:00:00", 500, [{"method": "QR", "amount": 500.0}])
+    _sale(journal, "t4", "2025-07-01T09:00:00", 999, [{"method": "現金", "amount": 999.0}])
+    cash = CashFlowRecorder(data_dir, journal=journal)
+    cash.record_deposit(30000, timestamp=datetime(2025, 6, 1, 9, 0))
+    cash.record_withdraw(5000, timestamp=datetime(2025, 6, 2, 18, 0))
+    gen = ReportGenerator(data_dir, journal=journal)
+
+    day = gen.daily("20250601")
+    assert (day["count"], day["cash_sales"], day["other_total"], day["total"]) == \
+        (2, 2600, 2000, 4600)
+    assert (day["deposit"], day["withdraw"]) == (30000, 0)
+
+    month = gen.monthly("202506")
+    assert (month["start"], month["end"]) == ("20250601", "20250630")
+    assert month["other_sales"] == {"クレカ": 2000, "QR": 500}
+    assert month["total"] == month["cash_sales"] + month["other_total"] == 5100
+    assert (month["deposit"], month["withdraw"]) == (30000, 5000)
+    assert month == gen.scan("20250601", "20250630") and day == gen.scan("20250601", "20250601")
+
+
+def test_rollups_follow_writes_and_rebuild_detects_drift(tmp_path):
+    data_dir = str(tmp_path)
+    journal = SalesJournal(data_dir)
+    _sale(journal, "t1", "2025-06-01T10:00:00", 1600, [{"method": "現金", "amount": 2000.0}],
+          change=400)
+    CashFlowRecorder(data_dir, journal=journal).record_deposit(1000)
+    today = datetime.now().strftime("%Y%m%d")
+    gen = ReportGenerator(data_dir, journal=journal)
+    assert gen.daily(today)["deposit"] == 1000
+    assert gen.daily("20250601") == gen.scan("20250601", "20250601")
+    assert journal.rebuild_rollups()["mismatched"] == []
+
+    with journal._conn() as conn:
+        conn.execute("UPDATE day_totals SET total = 0 WHERE day = '20250601'")
+    assert journal.rebuild_rollups()["mismatched"] == ["20250601"]
+    assert gen.daily("20250601")["total"] == 1600
+
+
+def test_report_prints_through_receipt_builder(tmp_path):
+    gen = ReportGenerator(str(tmp_path))
+    jobs = gen.to_jobs(gen.monthly("202506"), ReceiptBuilder("config/receipt_layout.yaml"))
+    texts = [text for kind, text, _ in jobs if kind == "text"]
+    assert texts[:2] == ["月次レポート", "2025/06/01 - 2025/06/30"]
+    assert any(t.startswith("総合計") and t.endswith(" 0") and disp_width(t) == 48 for t in texts)
+    assert jobs[-1][0] == "cut"
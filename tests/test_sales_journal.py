@@ -0,0 +1,45 @@
+from logic.sales_journal import SalesJournal
+from utils.file_utils import save_json
+
+
+def _record(tx, ts, total=100):
+    return {"transaction_id": tx, "timestamp": ts, "cart": [], "total_due": total,
+            "payments": [], "change": 0}
+
+
+def test_append_and_range_scans_in_record_order(tmp_path):
+    journal = SalesJournal(str(tmp_path))
+    journal.append(_record("a", "2025-06-01T10:00:00"))
+    journal.append(_record("b", "2025-06-02T10:00:00"))
+    journal.append(_record("c", "2025-07-01T09:00:00"))
+    assert [r["transaction_id"] for r in journal.iter_day("20250602")] == ["b"]
+    assert [r["transaction_id"] for r in journal.iter_month("202506")] == ["a", "b"]
+    assert journal.count() == 3
+
+
+def test_duplicate_transaction_id_gets_suffix(tmp_path):
+    journal = SalesJournal(str(tmp_path))
+    assert journal.append(_record("20250601_100000", "2025-06-01T10:00:00")) == "20250601_100000"
+    assert journal.append(_record("20250601_100000", "2025-06-01T10:00:00")) == "20250601_100000_2"
+
+
+def test_status_columns(tmp_path):
+    journal = SalesJournal(str(tmp_path))
+    journal.append(_record("a", "2025-06-01T10:00:00"))
+    journal.append(_record("b", "2025-06-01T11:00:00"))
+    journal.set_status("a", "sync", "done")
+    journal.set_status(["a", "b"], "print", "done")
+    assert [r["transaction_id"] for r in journal.pending("sync")] == ["b"]
+    assert journal.pending("print") == []
+    assert journal.get("a")["upload_status"] == "pending"
+
+
+def test_migrate_json_tree_is_idempotent(tmp_path):
+    save_json(tmp_path / "202506" / "sales_1.json", _record("x", "2025-06-01T10:00:00"))
+    save_json(tmp_path / "success" / "sales_2.json", _record("y", "2025-06-01T11:00:00"))
+    save_json(tmp_path / "pending" / "sales_3.json", _record("z", "2025-06-01T12:00:00"))
+    journal = SalesJournal(str(tmp_path))
+    assert journal.migrate_json_tree(str(tmp_path))["imported"] == 3
+    assert journal.migrate_json_tree(str(tmp_path)) == {"imported": 0, "skipped": 3, "error": 0}
+    assert sorted(r["transaction_id"] for r in journal.pending("sync")) == ["x", "z"]
+    assert journal.get("y")["upload_status"] == "done"
@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+from utils.startup_profile import StartupProfile
+
+
+def test_warm_up_tasks_run_in_parallel_and_report_once():
+    profile = StartupProfile()
+    with profile.step("ui"):
+        pass
+    gate = threading.Barrier(2, timeout=2)
+    a = profile.run("goods", lambda: gate.wait() or "index")
+    b = profile.run("printer", gate.wait)  # 2 つが同時に動いていないと Barrier で止まる
+    assert a.result(2) == "index" and b.result(2) is not None
+
+    def fail():
+        raise RuntimeError("offline")
+    err = profile.run("token", fail)
+    with pytest.raises(RuntimeError):
+        err.result(2)
+    profile.shown()
+    text = profile.summary()
+    assert "[ui " in text and "goods " in text and "token " in text and "(error: offline)" in text
+    assert profile._reported
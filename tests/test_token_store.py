@@ -0,0 +1,79 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from nextengine.token_store import END_DATE_FORMAT, TokenStore
+
+
+class FakeHttp:
+    def __init__(self):
+        self.calls = 0
+
+    def post(self, path, data=None):
+        self.calls += 1
+        time.sleep(0.05)
+        n = self.calls
+        end = (datetime.now() + timedelta(days=1)).strftime(END_DATE_FORMAT)
+        body = {"access_token": f"a{n}", "refresh_token": f"r{n}", "access_token_end_date": end}
+        return type("Resp", (), {"raise_for_status": lambda self: None,
+                                 "json": lambda self: body})()
+
+
+def _env(tmp_path, extra=""):
+    path = tmp_path / ".env"
+    path.write_text(
+        "NE_CLIENT_ID=c\nNE_CLIENT_SECRET=s\nNE_ACCESS_TOKEN=a0\nNE_REFRESH_TOKEN=r0\n" + extra,
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_concurrent_refresh_runs_once(tmp_path):
+    path = _env(tmp_path)
+    http = FakeHttp()
+    store = TokenStore(path, http=http)
+    threads = [threading.Thread(target=store.refresh, kwargs={"stale_access": "a0"})
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert http.calls == 1
+    assert store.access_token == "a1" and store.version == 1
+
+
+def test_other_instance_sees_refresh_without_http(tmp_path):
+    path = _env(tmp_path)
+    gui, daily = TokenStore(path, http=FakeHttp()), TokenStore(path, http=FakeHttp())
+    gui.refresh(stale_access="a0")
+    assert daily.refresh(stale_access="a0") == "a1"
+    assert daily.http.calls == 0
+    text = open(path, encoding="utf-8").read()
+    assert "NE_CLIENT_ID=c\n" in text and "NE_TOKEN_VERSION=1\n" in text
+
+
+def test_ensure_fresh_refreshes_only_near_expiry(tmp_path):
+    soon = (datetime.now() + timedelta(minutes=2)).strftime(END_DATE_FORMAT)
+    store = TokenStore(_env(tmp_path, f"NE_ACCESS_TOKEN_END_DATE={soon}\n"), http=FakeHttp())
+    assert store.ensure_fresh() is True
+    assert store.ensure_fresh() is False
+    assert store.http.calls == 1
+
+
+def test_absorb_keeps_tokens_refreshed_elsewhere(tmp_path):
+    path = _env(tmp_path)
+    store = TokenStore(path, http=FakeHttp())
+    reload = store._reload
+
+    def racing_reload():
+        # ロック待ちの間に別プロセスが新しいトークンを書いた
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("NE_CLIENT_ID=c\nNE_ACCESS_TOKEN=a9\nNE_REFRESH_TOKEN=r9\n")
+        reload()
+
+    store._reload = racing_reload
+    store.absorb({"access_token": "a1", "refresh_token": "r1"})
+    assert (store.access_token, store.refresh_token) == ("a9", "r9")
+    store._reload = reload
+    store.absorb({"access_token": "a10", "refresh_token": "r10"})
+    assert store.access_token == "a10" and store.version == 1
@@ -0,0 +1,71 @@
+# ui/cart_view.py
+"""
+カート（logic.cart.Cart）を Listbox に表示するビュー。
+・Cart の変更通知を受けて、変わった行だけを挿入・置換・削除する
+・行ごとの対象（CartLine / CartDiscount）を Python 側のリストで持つので、
+  選択行の特定に Listbox の文字列を読み返さない
+"""
+import tkinter as tk
+
+from logic.cart import Cart, CartDiscount, CartLine
+
+
+def line_text(line: CartLine) -> str:
+    name = line.name if len(line.name) <= 20 else line.name[:20] + "…"
+    qty = f" ×{line.quantity}" if line.quantity > 1 else ""
+    return f"{name}  ¥{line.price}円{qty}"
+
+
+def discount_text(disc: CartDiscount) -> str:
+    label = "個別" if disc.line_id is not None else "全体"
+    if disc.kind == "percent":
+        label += "％"
+    indent = "  " if disc.line_id is not None else ""
+    return f"{indent}{label}値引き –¥{int(disc.amount)}円"
+
+
+class CartListView:
+    def __init__(self, listbox: tk.Listbox, cart: Cart):
+        self.listbox = listbox
+        self.rows = []     # 表示行ごとの CartLine / CartDiscount
+        self._orders = 0   # 末尾に並ぶ全体割引の行数
+        cart.on_change = self.apply
+
+    def selected(self):
+        """選択中の行の対象（無ければ None）"""
+        sel = self.listbox.curselection()
+        return self.rows[sel[0]] if sel else None
+
+    def _insert(self, pos: int, obj, text: str):
+        self.rows.insert(pos, obj)
+        self.listbox.insert(pos, text)
+
+    def _delete(self, pos: int, count: int = 1):
+        del self.rows[pos:pos + count]
+        self.listbox.delete(pos, pos + count - 1)
+
+    def apply(self, event: str, obj=None):
+        """Cart の変更通知 1 件を表示に反映"""
+        if event == "line_added":
+            self._insert(len(self.rows) - self._orders, obj, line_text(obj))
+        elif event == "line_changed":
+            pos = self.rows.index(obj)
+            self.listbox.delete(pos)
+            self.listbox.insert(pos, line_text(obj))
+        elif event == "line_removed":
+            self._delete(self.rows.index(obj), 1 + len(obj.discounts))
+        elif event == "item_discount_added":
+            line_pos = next(i for i, r in enumerate(self.rows)
+                            if isinstance(r, CartLine) and r.line_id == obj.line_id)
+            self._insert(line_pos + len(self.rows[line_pos].discounts), obj, discount_text(obj))
+        elif event == "order_discount_added":
+            self._insert(len(self.rows), obj, discount_text(obj))
+            self._orders += 1
+        elif event in ("item_discount_removed", "order_discount_removed"):
+            self._delete(self.rows.index(obj))
+            if event == "order_discount_removed":
+                self._orders -= 1
+        elif event == "cleared":
+            self.rows.clear()
+            self._orders = 0
+            self.listbox.delete(0, tk.END)
@@ -1,12 +1,14 @@
 import logging
 import os
-import shutil
 import sys
 from pathlib import Path
 
 # プロジェクトルートをパスに追加して nextengine モジュールを解決
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from config import Config
+from logic.sales_journal import SalesJournal
+from nextengine.goods_sync import GoodsMasterSync
 from nextengine.inventory_updater import InventoryUpdater
 from nextengine.sales_uploader import SalesUploader
 from utils.date_utils import get_current_timestamp
@@ -23,11 +25,13 @@ def main():
     token_env = ".env.test" if sim_flag else ".env"
 
     logging.info("=== 日次同期＆バックアップ開始 ===")
+    journal = SalesJournal("data")
 
     # ① 在庫同期処理
     try:
-        updater = InventoryUpdater(token_env=token_env, simulate=sim_flag)
-        res_inv = updater.update_all(data_dir="data")
+        updater = InventoryUpdater(token_env=token_env, simulate=sim_flag, data_dir="data")
+        batch_size = Config.INVENTORY_BATCH_MAX_SALES if Config.INVENTORY_BATCH_ENABLED else 0
+        res_inv = updater.update_all(journal, batch_size=batch_size)
         logging.info(f"Inventory update results: {res_inv}")
     except Exception as e:
         logging.error(f"Inventory update failed: {e}", exc_info=True)
@@ -35,23 +39,30 @@ def main():
     # ② 売上アップロード処理
     try:
         uploader = SalesUploader(token_env=token_env, pattern_id=1, wait_flag=1)
-        res_sales = uploader.upload_all(data_dir="data")
+        if Config.SALES_UPLOAD_CONSOLIDATE:
+            res_sales = uploader.upload_consolidated(
+                journal, data_dir="data", max_rows=Config.SALES_UPLOAD_MAX_ROWS
+            )
+        else:
+            res_sales = uploader.upload_all(journal)
         logging.info(f"Sales upload results: {res_sales}")
     except Exception as e:
         logging.error(f"Sales upload failed: {e}", exc_info=True)
 
-    # ③ 日次バックアップ処理
+    # ③ 商品マスタ同期（前回同期以降の更新分のみ。POS 側は再起動せずに差し替わる）
+    try:
+        res_goods = GoodsMasterSync(token_env=token_env, data_dir="data").run()
+        logging.info(f"Goods master sync results: {res_goods}")
+    except Exception as e:
+        logging.error(f"Goods master sync failed: {e}", exc_info=True)
+
+    # ④ 日次バックアップ処理（売上ジャーナルを稼働中のまま一貫したコピーで保存）
     yyyymm = get_current_timestamp(fmt="%Y%m")
-    src_dir = os.path.join("data", yyyymm)
     dst_dir = os.path.join(r"Z:\backup\pos", yyyymm)
     try:
-        if os.path.isdir(src_dir):
-            os.makedirs(dst_dir, exist_ok=True)
-            for fname in os.listdir(src_dir):
-                shutil.copy2(os.path.join(src_dir, fname), dst_dir)
-            logging.info(f"Backed up {src_dir} → {dst_dir}")
-        else:
-            logging.warning(f"Source directory not found: {src_dir}")
+        dst = os.path.join(dst_dir, "sales.db")
+        journal.backup(dst)
+        logging.info(f"Backed up {journal.path} → {dst}")
     except Exception as e:
         logging.error(f"Backup failed: {e}", exc_info=True)
 
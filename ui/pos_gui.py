@@ -7,24 +7,29 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 import os
 import subprocess
 import threading
+import time
 import tkinter as tk
-import winsound
 from tkinter import messagebox, Toplevel, Text, Button
 from dotenv import load_dotenv
 
-from ui.daily_tasks import run_daily_tasks
+from config import Config
 from logic.cash_flow_recorder import CashFlowRecorder
-from logic.discount_manager import DiscountManager
+from logic.cart import Cart, CartLine
 from logic.goods_manager import GoodsManager
 from logic.payment_manager import reset_payments, get_initial_amount, get_payments_summary, process_payment
+from logic.report_generator import ReportGenerator
 from logic.sales_recorder import SalesRecorder
+from ui.cart_view import CartListView
 from ui.tenkey_popup import ask_price
+from utils.metrics import get_metrics
+from utils.startup_profile import StartupProfile
 
 # ビープ音再生用ファイルパス
 WAVE_PATH = os.path.join(os.path.dirname(__file__), "..", "wave", "key.wav")
 
 def play_beep():
     try:
+        import winsound  # Windows のみ
         winsound.PlaySound(WAVE_PATH, winsound.SND_FILENAME | winsound.SND_ASYNC)
     except Exception:
         pass
@@ -34,36 +39,70 @@ class POSApp:
         self.root = root
         self.root.title("Sakatsu POS")
 
-        # 起動時アクセストークン更新
-        try:
-            from nextengine.inventory_updater import InventoryUpdater
-            InventoryUpdater(simulate=False)
-        except Exception as e:
-            print(f"[POSApp] Initial token refresh failed: {e}")
+        # 起動の内訳（画面表示まで／並列ウォームアップ）は起動のたびにログへ出す
+        self.startup = StartupProfile()
+        # スキャン・会計・印刷・NE 呼び出しの処理時間（一定間隔で data/metrics に書き出す）
+        self.metrics = get_metrics()
+        self.metrics.start()
 
         # 環境変数読み込みとプリンター IP の取得
-        load_dotenv(os.path.join(Path(__file__).resolve().parent.parent, ".env"), override=True)
-        printer_ip = os.getenv("PRINTER_IP", "192.168.1.24")
+        with self.startup.step("env"):
+            load_dotenv(os.path.join(Path(__file__).resolve().parent.parent, ".env"), override=True)
+            printer_ip = os.getenv("PRINTER_IP", "192.168.1.24")
 
-        # 各マネージャ初期化
-        self.gm = GoodsManager()
-        self.gm.load_index()
-        self.cf_recorder = CashFlowRecorder(data_dir="data")
-        self.sales_recorder = SalesRecorder(data_dir="data", printer_ip=printer_ip)
-        self.discount_manager = DiscountManager()
+        # 各マネージャ初期化（商品マスタの読み込みとプリンタ接続は表示後に並列で行う）
+        with self.startup.step("recorders"):
+            self.gm = GoodsManager()
+            self.sales_recorder = SalesRecorder(data_dir="data", printer_ip=printer_ip)
+            self.cf_recorder = CashFlowRecorder(data_dir="data",
+                                                journal=self.sales_recorder.journal)
 
         # カート・未決済額
-        self.cart = []
+        self.cart = Cart()
         self.remaining_due = 0.0
 
-        self.setup_ui()
+        with self.startup.step("ui"):
+            self.setup_ui()
+
+            # ステータスバーの追加
+            self.status_var = tk.StringVar(value="")
+            self.status_bar = tk.Label(self.root, textvariable=self.status_var,
+                                       bd=1, relief="sunken", anchor="w")
+            self.status_bar.pack(side="bottom", fill="x")
+            self.status_bar.bind("<Button-1>", self._on_status_click)
+
+        # ウォームアップ: 商品マスタ・アクセストークン確認（期限が近ければ先回りで更新）・プリンタ接続。
+        # スキャンは商品マスタが読めるまでだけ止める
+        self.code_entry.config(state="disabled")
+        self.status_var.set("商品マスタ読み込み中…")
+        self._goods_ready = self.startup.run("goods", self.gm.load_index)
+        self.startup.run("token", self._warm_token)
+        self.startup.run("printer", lambda: self.sales_recorder.spooler.warm().wait(15))
+        self.root.after_idle(self.startup.shown)
+        self.root.after(20, self._poll_goods_ready)
+
+    @staticmethod
+    def _warm_token():
+        from nextengine.token_store import get_token_store
+        try:
+            get_token_store(".env").ensure_fresh()
+        except Exception as e:
+            print(f"[POSApp] Initial token refresh failed: {e}")
+            raise
 
-        # ステータスバーの追加
-        self.status_var = tk.StringVar(value="")
-        self.status_bar = tk.Label(self.root, textvariable=self.status_var,
-                                   bd=1, relief="sunken", anchor="w")
-        self.status_bar.pack(side="bottom", fill="x")
-        self.status_bar.bind("<Button-1>", self._on_status_click)
+    def _poll_goods_ready(self):
+        if not self._goods_ready.done():
+            self.root.after(20, self._poll_goods_ready)
+            return
+        error = self._goods_ready.exception()
+        if error is not None:
+            self.show_error(f"商品マスタを読み込めません: {error}")
+            return
+        self.status_var.set("")
+        self.code_entry.config(state="normal")
+        self.code_entry.focus_set()
+        # 商品マスタの更新（日次処理の同期など）を定期的に確認し、再起動せずに差し替える
+        self._schedule_goods_refresh()
 
     def setup_ui(self):
         frame = tk.Frame(self.root)
@@ -100,6 +139,7 @@ class POSApp:
             ("確定", self.finalize_sale),
             ("入金", self.handle_deposit),
             ("出金", self.handle_withdraw),
+            ("点検", self.handle_cash_count),
             ("個別¥値引き", self.handle_item_fixed_discount),
             ("個別％値引き", self.handle_item_percent_discount),
             ("全体¥値引き", self.handle_order_fixed_discount),
@@ -117,6 +157,7 @@ class POSApp:
         tk.Label(frame, text="登録リスト").grid(row=4, column=0, sticky="nw")
         self.listbox = tk.Listbox(frame, width=50, height=12)
         self.listbox.grid(row=4, column=1, columnspan=len(buttons)-1, sticky="w")
+        self.cart_view = CartListView(self.listbox, self.cart)
 
         # 合計表示
         self.total_var = tk.StringVar(value="合計: ¥0 円")
@@ -128,6 +169,20 @@ class POSApp:
         self.daily_btn = tk.Button(frame, text="日次処理実行", command=self.run_daily_tasks)
         self.daily_btn.grid(row=6, column=0, columnspan=len(buttons), pady=10)
 
+        # 商品名検索（入力のたびに候補を更新、ダブルクリック／Enter で登録）
+        tk.Label(frame, text="商品名検索").grid(row=7, column=0, sticky="w")
+        self.name_search_entry = tk.Entry(frame, width=30)
+        self.name_search_entry.grid(row=7, column=1, columnspan=3, sticky="w")
+        self.name_search_entry.bind("<KeyRelease>", lambda e: self.update_name_search())
+        self.name_results = []
+        self._name_retry = None
+        self.name_listbox = tk.Listbox(frame, width=70, height=6)
+        self.name_listbox.grid(row=8, column=1, columnspan=len(buttons)-1, sticky="w")
+        self.name_listbox.bind("<Double-Button-1>",
+                               lambda e: (play_beep(), self.register_from_name_search()))
+        self.name_listbox.bind("<Return>",
+                               lambda e: (play_beep(), self.register_from_name_search()))
+
     # ――――― 商品検索まわり ―――――
     def reset_code_entry(self):
         self.code_entry.delete(0, tk.END)
@@ -135,17 +190,63 @@ class POSApp:
         self.price_var.set("")
         self.suggestion_var.set("")
 
+    def _schedule_goods_refresh(self):
+        def task():
+            try:
+                self.gm.refresh()
+            except Exception as e:
+                print(f"[POSApp] Goods master refresh failed: {e}")
+        # 読み直しは別スレッドで行い、その間もスキャンは現在の索引で続ける
+        threading.Thread(target=task, daemon=True).start()
+        self.root.after(Config.GOODS_REFRESH_INTERVAL_SEC * 1000, self._schedule_goods_refresh)
+
     def update_suggestion(self):
         code = self.code_entry.get().strip().lower()
         product = self.gm.lookup(code)
+        if product is None and code:
+            # 完全一致がなければ前方一致の先頭候補を表示
+            hits = self.gm.prefix_search(code, limit=2)
+            product = hits[0] if hits else None
+            if product and len(hits) > 1:
+                self.suggestion_var.set(f"候補: {product.get('goods_name','')} 他")
+                return
         self.suggestion_var.set(f"候補: {product.get('goods_name','')}" if product else "")
 
+    def update_name_search(self):
+        query = self.name_search_entry.get().strip()
+        if query and not self.gm.name_index_ready:
+            # 起動直後で商品名索引の作成中。Tk スレッドを止めず、少し後で検索し直す
+            self.name_results = []
+            self.name_listbox.delete(0, tk.END)
+            self.name_listbox.insert(tk.END, "商品名索引を作成中…")
+            if self._name_retry is None:
+                self._name_retry = self.root.after(200, self._retry_name_search)
+            return
+        self.name_results = self.gm.search_name(query, limit=20) if query else []
+        self.name_listbox.delete(0, tk.END)
+        for product in self.name_results:
+            self.name_listbox.insert(tk.END, f"{product.goods_name}  ¥{product.price:,}")
+
+    def _retry_name_search(self):
+        self._name_retry = None
+        self.update_name_search()
+
+    def register_from_name_search(self):
+        sel = self.name_listbox.curselection()
+        if not sel or sel[0] >= len(self.name_results):
+            return
+        product = self.name_results[sel[0]]
+        code = product.get("goods_6_item") or product.get("goods_id", "")
+        self.code_entry.delete(0, tk.END)
+        self.code_entry.insert(0, code)
+        self.register_product()
+
     def search_product(self, auto_register=False):
         code = self.code_entry.get().strip().lower()
         product = self.gm.lookup(code)
         if product:
             self.name_var.set(product.get("goods_name",""))
-            self.price_var.set(str(product.get("goods_selling_price","")))
+            self.price_var.set(str(product.price))
         else:
             self.name_var.set(code[:20])
             self.price_var.set("")
@@ -154,11 +255,13 @@ class POSApp:
 
     # ――――― カート登録まわり ―――――
     def register_product(self):
+        start = time.perf_counter()
         code = self.code_entry.get().strip().lower()
-        product = self.gm.lookup(code)
+        with self.metrics.span("scan.lookup"):
+            product = self.gm.lookup(code)
         if product:
             item_name = product.get("goods_name","")
-            price_value = int(float(product.get("goods_selling_price",0)))
+            price_value = product.price
         else:
             raw = code
             amt = ask_price(self.root, title="未登録商品の価格入力", prompt="価格を入力してください：")
@@ -167,103 +270,75 @@ class POSApp:
             item_name = raw[:20]
             price_value = int(amt)
 
-        item = {"goods_id": code if product else "",
-                "name": item_name,
-                "price": price_value,
-                "quantity": 1}
-        self.cart.append(item)
-        display_name = item_name if len(item_name)<=20 else item_name[:20]+"…"
-        self.listbox.insert(tk.END, f"{display_name}  ¥{price_value}円")
+        self.cart.add(code if product else "", item_name, price_value)
         self.update_total()
         self.reset_code_entry()
+        if product:
+            # スキャン → 検索 → カート表示まで（価格入力を待つ未登録商品は除く）
+            self.metrics.record("scan.register", (time.perf_counter() - start) * 1000)
 
     def update_total(self):
-        total = self.discount_manager.calculate_total(self.cart)
+        total = self.cart.total
         self.total_var.set(f"合計: ¥{int(total)} 円")
 
     # ――――― 割引まわり ―――――
-    def handle_item_fixed_discount(self):
-        sel = self.listbox.curselection()
-        if not sel:
+    def _selected_line(self):
+        line = self.cart_view.selected()
+        if line is None:
             messagebox.showwarning("選択エラー","割引対象を選択してください")
-            return
-        idx = sel[0]
-        if self.listbox.get(idx).startswith("  "):
+            return None
+        if not isinstance(line, CartLine):
             messagebox.showwarning("選択エラー","商品行を選択してください")
+            return None
+        return line
+
+    def handle_item_fixed_discount(self):
+        line = self._selected_line()
+        if line is None:
             return
         amt = ask_price(self.root,title="個別金額割引",prompt="割引額を入力してください：")
         if amt is None:
             return
-        item_index = sum(1 for j in range(idx+1) if not self.listbox.get(j).startswith("  "))-1
-        self.discount_manager.apply_item_discount(item_index,amt)
-        self.listbox.insert(idx+1,f"  個別値引き –¥{int(amt)}円")
+        self.cart.discount_line(line.line_id,"fixed",amt)
         self.update_total()
 
     def handle_item_percent_discount(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showwarning("選択エラー","割引対象を選択してください")
-            return
-        idx = sel[0]
-        if self.listbox.get(idx).startswith("  "):
-            messagebox.showwarning("選択エラー","商品行を選択してください")
+        line = self._selected_line()
+        if line is None:
             return
         pct = ask_price(self.root,title="個別％割引",prompt="割引率(％)を入力してください：")
         if pct is None:
             return
-        item_index = sum(1 for j in range(idx+1) if not self.listbox.get(j).startswith("  "))-1
-        self.discount_manager.apply_item_percent(item_index,pct)
-        original = self.cart[item_index]["price"]
-        disc = int(original*pct/100+0.5)
-        self.listbox.insert(idx+1,f"  個別％値引き –¥{disc}円")
+        self.cart.discount_line(line.line_id,"percent",pct)
         self.update_total()
 
     def handle_order_fixed_discount(self):
         amt = ask_price(self.root,title="全体金額割引",prompt="割引額を入力してください：")
         if amt is None:
             return
-        self.discount_manager.apply_order_discount(amt)
-        self.listbox.insert(tk.END,f"全体値引き –¥{int(amt)}円")
+        self.cart.discount_order("fixed",amt)
         self.update_total()
 
     def handle_order_percent_discount(self):
         pct = ask_price(self.root,title="全体％割引",prompt="割引率(％)を入力してください：")
         if pct is None:
             return
-        old_total = self.discount_manager.calculate_total(self.cart)
-        self.discount_manager.apply_order_percent(pct)
-        new_total = self.discount_manager.calculate_total(self.cart)
-        disc = old_total-new_total
-        self.listbox.insert(tk.END,f"全体％値引き –¥{int(disc)}円")
+        self.cart.discount_order("percent",pct)
         self.update_total()
 
     # ――――― クリアまわり ―――――
     def clear_last(self):
-        sel = self.listbox.curselection()
-        if sel:
-            self.listbox.delete(sel[0])
-            self.update_total()
-            return
-        last = self.listbox.size()-1
-        if last<0:
+        target = self.cart_view.selected()
+        if isinstance(target, CartLine):
+            self.cart.remove(target.line_id)
+        elif target is not None:
+            self.cart.remove_discount(target)
+        elif not self.cart.undo_last():
             return
-        text = self.listbox.get(last)
-        if text.startswith("全体"):
-            self.discount_manager.order_discounts.pop()
-        elif text.startswith("  "):
-            self.discount_manager.item_discounts.pop()
-        else:
-            self.cart.pop()
-            if last>0 and self.listbox.get(last-1).startswith("  "):
-                self.discount_manager.item_discounts.pop()
-        self.listbox.delete(last)
         self.update_total()
 
     def clear_all(self):
         self.cart.clear()
-        self.listbox.delete(0,tk.END)
-        self.discount_manager.item_discounts.clear()
-        self.discount_manager.order_discounts.clear()
         self.update_total()
 
     # ――――― 会計／決済まわり ―――――
@@ -271,7 +346,7 @@ class POSApp:
         if not self.cart:
             messagebox.showinfo("確認","登録されている商品がありません")
             return
-        total_due=self.discount_manager.calculate_total(self.cart)
+        total_due=self.cart.total
         reset_payments()
         self.remaining_due=total_due
         self.open_payment_popup(total_due)
@@ -312,21 +387,21 @@ class POSApp:
         tk.Button(popup,text="キャンセル",command=popup.destroy).pack(side="left",padx=5)
 
     def complete_payment(self,total_due):
+        start=time.perf_counter()
         summary=get_payments_summary()
         payments=[{"method":m,"amount":a} for m,a in summary.items() if a>0]
         total_paid=sum(summary.values())
         change=max(0,int(total_paid-total_due))
-        path=self.sales_recorder.record_sale(self.cart,total_due=total_due,payments=payments,change=change)
+        tx_id=self.sales_recorder.record_sale(self.cart.to_records(),total_due=total_due,
+                                              payments=payments,change=change)
+        self.metrics.record("checkout.finalize",(time.perf_counter()-start)*1000)
         info="売上を記録しました。\n"
         if change>0:
             info+=f"おつり：¥{change}\n"
-        info+=path
+        info+=f"取引ID: {tx_id}"
         messagebox.showinfo("会計完了",info)
         self.cart.clear()
-        self.listbox.delete(0,tk.END)
         self.update_total()
-        self.discount_manager.item_discounts.clear()
-        self.discount_manager.order_discounts.clear()
         reset_payments()
 
     # ――――― 入出金 ―――――
@@ -334,15 +409,25 @@ class POSApp:
         amt=ask_price(self.root,title="入金額入力",prompt="現金入金額を入力してください：")
         if amt is None:
             return
-        path=self.cf_recorder.record_deposit(amount=amt)
-        messagebox.showinfo("入金完了",f"{int(amt):,} 円を入金として記録しました。\n{path} へ保存されました。")
+        balance=self.cf_recorder.record_deposit(amount=amt)
+        messagebox.showinfo("入金完了",f"{int(amt):,} 円を入金として記録しました。\nドロアー残高（理論値）: ¥{balance:,}")
 
     def handle_withdraw(self):
         amt=ask_price(self.root,title="出金額入力",prompt="現金出金額を入力してください：")
         if amt is None:
             return
-        path=self.cf_recorder.record_withdraw(amount=amt)
-        messagebox.showinfo("出金完了",f"{int(amt):,} 円を出金として記録しました。\n{path} へ保存されました。")
+        balance=self.cf_recorder.record_withdraw(amount=amt)
+        messagebox.showinfo("出金完了",f"{int(amt):,} 円を出金として記録しました。\nドロアー残高（理論値）: ¥{balance:,}")
+
+    def handle_cash_count(self):
+        expected=self.cf_recorder.expected_cash()
+        counted=ask_price(self.root,title="現金点検",
+                          prompt=f"ドロアーの現金を数えて入力してください：\n(理論値 ¥{expected:,})")
+        if counted is None:
+            return
+        expected,diff=self.cf_recorder.record_count(counted)
+        result="過不足なし" if diff==0 else (f"過剰 ¥{diff:,}" if diff>0 else f"不足 ¥{-diff:,}")
+        messagebox.showinfo("現金点検",f"実査 ¥{int(counted):,} / 理論値 ¥{expected:,}\n{result}")
 
     # ――――― 日次／月次 ―――――
     def run_daily_tasks(self):
@@ -353,7 +438,15 @@ class POSApp:
             messagebox.showerror("日次処理エラー",str(e))
 
     def show_features(self):
-        features=["日次処理実行"]
+        features=["日次処理実行",""]
+        for name,st in self.sales_recorder.pipeline_status().items():
+            last=f"{st['last_ms']:.0f}ms" if st["last_ms"] is not None else "-"
+            features.append(f"{name}: {st['state']} 待ち{st['pending']} 完了{st['done']} "
+                            f"失敗{st['failed_on_disk']} 前回{last}")
+        features+=["","処理時間 p50 / p95 / p99（ms）"]
+        for name,st in self.metrics.summary().items():
+            features.append(f"{name}: {st['p50']:.1f} / {st['p95']:.1f} / {st['p99']:.1f}  "
+                            f"({st['count']}件)")
         messagebox.showinfo("機能一覧","\n".join(features))
 
     def show_toast(self,message:str,duration:int=3000):
@@ -370,7 +463,9 @@ class POSApp:
     def run_daily(self):
         def task():
             try:
+                from ui.daily_tasks import run_daily_tasks
                 run_daily_tasks(mode="daily")
+                self.print_report("daily")
                 self.show_toast("日次処理完了")
             except Exception as e:
                 messagebox.showerror("日次処理エラー",str(e))
@@ -379,12 +474,21 @@ class POSApp:
     def run_monthly(self):
         def task():
             try:
+                from ui.daily_tasks import run_daily_tasks
                 run_daily_tasks(mode="monthly")
+                self.print_report("monthly")
                 self.show_toast("月次処理完了")
             except Exception as e:
                 messagebox.showerror("月次処理エラー",str(e))
         threading.Thread(target=task,daemon=True).start()
 
+    def print_report(self,mode:str):
+        """当日（月次は当月）のレポートを集計してレシートプリンタに印字"""
+        gen=ReportGenerator("data",journal=self.sales_recorder.journal)
+        report=gen.monthly() if mode=="monthly" else gen.daily()
+        jobs=gen.to_jobs(report,self.sales_recorder.receipt_builder)
+        self.sales_recorder.spooler.submit(jobs,kick_drawer=False)
+
     def _on_status_click(self,event):
         dlg=Toplevel(self.root)
         dlg.title("エラー履歴")
@@ -5,6 +5,7 @@ log = get_logger(__name__)
 
 import os
 from utils.date_utils import get_current_timestamp
+from utils.escpos_renderer import render
 
 # Try to import real printer driver
 try:
@@ -40,6 +41,18 @@ class MockPrinter:
     def cashdraw(self, pin):
         print(f"--- [Simulated Drawer Open: pin {pin}] ---")
 
+    def preview(self, jobs):
+        """印刷ジョブをコンソールに表示（実機の _raw 送信の代わり）"""
+        for cmd, text, opts in jobs:
+            if cmd == "text" and text:
+                print(text)
+            elif cmd == "image":
+                self.image(text)
+            elif cmd == "qr":
+                self.qr(text)
+            elif cmd == "cut":
+                self.cut()
+
 
 class PrinterController:
     def __init__(self, simulate=None):
@@ -79,46 +92,52 @@ class PrinterController:
         homepage_url: URL for QR code
         transaction_id: unique identifier
         """
-        p = self.printer
+        jobs = []
         # Header: logo and QR
-        if logo_path and hasattr(p, "image"):
-            p.image(logo_path)
-        if homepage_url and hasattr(p, "qr"):
-            p.qr(homepage_url, size=4)
-            p.text("\n")
+        if logo_path:
+            jobs.append(("image", logo_path, {}))
+        if homepage_url:
+            jobs.append(("qr", homepage_url, {"size": 4}))
         # Store details
         if store_info:
-            p.set(align="center", bold=True)
-            p.text(f"{store_info.get('name','')}\n")
-            p.set(align="center")
-            p.text(f"{store_info.get('address','')}\n")
-            p.text(f"TEL: {store_info.get('tel','')}\n")
-            p.text(f"{store_info.get('company_name','')}\n")
-            p.text(f"{store_info.get('business_license','')}\n")
+            jobs.append(("text", store_info.get("name", ""), {"align": "center", "bold": True}))
+            for line in (
+                store_info.get("address", ""),
+                f"TEL: {store_info.get('tel', '')}",
+                store_info.get("company_name", ""),
+                store_info.get("business_license", ""),
+            ):
+                jobs.append(("text", line, {"align": "center"}))
         # Date/time and transaction ID
         now = get_current_timestamp(fmt="%Y/%m/%d %H:%M")
-        p.text(f"{now}\n")
+        jobs.append(("text", now, {}))
         if transaction_id:
-            p.text(f"取引ID: {transaction_id}\n")
-        p.text("--------------------------------\n")
+            jobs.append(("text", f"取引ID: {transaction_id}", {}))
+        jobs.append(("text", "--------------------------------", {}))
         # Items
         for name, price in cart:
-            p.set(align="left")
-            p.text(f"{name}\n")
-            p.text(f"  {int(price):>8,} 円\n")
-        p.text("--------------------------------\n")
+            jobs.append(("text", name, {}))
+            jobs.append(("text", f"  {int(price):>8,} 円", {}))
+        jobs.append(("text", "--------------------------------", {}))
         # Totals
-        p.set(bold=True)
-        p.text(f"合計: {int(total_due):,} 円\n")
-        p.set(bold=False)
+        jobs.append(("text", f"合計: {int(total_due):,} 円", {"bold": True}))
         # Payments
         for method, amount in payments:
-            p.text(f"{method}: {int(amount):,} 円\n")
-        p.text(f"お釣り: {int(change):,} 円\n")
+            jobs.append(("text", f"{method}: {int(amount):,} 円", {}))
+        jobs.append(("text", f"お釣り: {int(change):,} 円", {}))
         # Footer
-        p.text("\nご利用ありがとうございました。\n")
-        p.text("またのご来店お待ちしております。\n")
-        p.cut()
+        jobs.append(("text", " ", {}))
+        jobs.append(("text", "ご利用ありがとうございました。", {}))
+        jobs.append(("text", "またのご来店お待ちしております。", {}))
+        jobs.append(("cut", None, {}))
+        self.send(jobs)
+
+    def send(self, jobs):
+        """印刷ジョブを 1 本の ESC/POS バイト列にして 1 回で送信"""
+        if isinstance(self.printer, MockPrinter):
+            self.printer.preview(jobs)
+            return
+        self.printer._raw(render(jobs))
 
     def open_drawer(self):
         """Open the attached cash drawer."""
@@ -0,0 +1,106 @@
+# utils/durable_queue.py
+"""
+ディスク永続化付き FIFO ジョブキュー。
+ジョブは 1 件ごとに JSON ファイルとして保存されるため、
+アプリが落ちても次回起動時に未処理ジョブを同じ順序で再投入できます。
+"""
+import itertools
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from logger import get_logger
+from utils.file_utils import ensure_dir, load_json, save_json_atomic
+
+log = get_logger(__name__)
+
+
+class DurableQueue:
+    def __init__(self, root, name: str):
+        """
+        root: キュー保存ルート（例: data/queue）
+        name: キュー名。root/name/ 以下にジョブファイルを置きます。
+        """
+        self.name = name
+        self.dir = Path(root) / name
+        self.failed_dir = self.dir / "failed"
+        ensure_dir(self.dir)
+        self._q: "queue.Queue[Path]" = queue.Queue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._restore()
+
+    def _restore(self):
+        """前回終了時に残っていたジョブをファイル名順（＝投入順）で再投入"""
+        restored = sorted(self.dir.glob("*.json"))
+        for path in restored:
+            self._q.put(path)
+        if restored:
+            log.info(f"[{self.name}] restored {len(restored)} pending job(s)")
+
+    def put(self, payload: Dict[str, Any]) -> str:
+        """ジョブをディスクに書いてからキューに積み、ジョブ ID を返す"""
+        with self._lock:
+            job_id = f"{time.time_ns():020d}_{next(self._seq):06d}"
+        job = {
+            "id": job_id,
+            "payload": payload,
+            "attempts": 0,
+            "enqueued_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "last_error": None,
+        }
+        path = self.dir / f"{job_id}.json"
+        save_json_atomic(path, job)
+        self._q.put(path)
+        return job_id
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[Path, Dict[str, Any]]]:
+        """次のジョブを (パス, ジョブ辞書) で返す。timeout 内に無ければ None"""
+        try:
+            path = self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        try:
+            return path, load_json(path)
+        except Exception as e:
+            log.error(f"[{self.name}] broken job file {path}: {e}")
+            self._q.task_done()
+            return None
+
+    def update(self, path: Path, job: Dict[str, Any]):
+        """リトライ回数やエラー内容をジョブファイルに書き戻す"""
+        save_json_atomic(path, job)
+
+    def ack(self, path: Path):
+        """処理完了したジョブを削除"""
+        path.unlink(missing_ok=True)
+        self._q.task_done()
+
+    def fail(self, path: Path, job: Dict[str, Any]):
+        """リトライ上限に達したジョブを failed/ に退避"""
+        ensure_dir(self.failed_dir)
+        save_json_atomic(path, job)
+        shutil.move(str(path), str(self.failed_dir / path.name))
+        self._q.task_done()
+
+    def payloads(self) -> List[Dict[str, Any]]:
+        """未完了ジョブ（failed/ は除く）の payload を投入順に返す"""
+        out = []
+        for path in sorted(self.dir.glob("*.json")):
+            try:
+                out.append(load_json(path)["payload"])
+            except Exception as e:
+                log.error(f"[{self.name}] broken job file {path}: {e}")
+        return out
+
+    def depth(self) -> int:
+        """未完了ジョブ数（処理中を含む）"""
+        return self._q.unfinished_tasks
+
+    def failed_count(self) -> int:
+        if not self.failed_dir.exists():
+            return 0
+        return sum(1 for _ in self.failed_dir.glob("*.json"))
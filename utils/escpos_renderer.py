@@ -0,0 +1,132 @@
+# utils/escpos_renderer.py
+"""
+印刷ジョブ（ReceiptBuilder.build の戻り値）を 1 本の ESC/POS バイト列に変換する。
+・書式（揃え・太字・倍角など）は直前の行と異なる場合だけコマンドを出す
+・行ごとの set()/_raw() 呼び出しをやめ、1 回の書き込みで送れるようにする
+・書式指定は行ごとに完結（opts に無い項目は標準に戻す）
+"""
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+ESC = b"\x1b"
+GS = b"\x1d"
+
+INIT = ESC + b"@"
+CODEPAGE_CP932 = ESC + b"t\x11"
+DRAWER_KICK = ESC + b"p\x00\x32\xfa"
+FEED_AND_CUT = ESC + b"d\x06" + GS + b"V\x00"
+
+_ALIGN = {"left": 0, "center": 1, "right": 2}
+_FONT = {"a": 0, "b": 1}
+# 標準書式: (align, bold, underline, font, width, height)
+DEFAULT_STYLE = ("left", False, 0, "a", 1, 1)
+
+
+def style_of(opts: Dict[str, Any]):
+    """opts（escpos の set() 引数相当）を比較可能な書式タプルにする"""
+    if opts.get("double_width"):
+        opts = {**opts, "width": 2}
+    if opts.get("double_height"):
+        opts = {**opts, "height": 2}
+    return (
+        opts.get("align", "left"),
+        bool(opts.get("bold", False)),
+        int(opts.get("underline", 0)),
+        opts.get("font", "a"),
+        int(opts.get("width", 1)),
+        int(opts.get("height", 1)),
+    )
+
+
+def style_bytes(prev, new) -> bytes:
+    """prev から new へ切り替えるのに必要なコマンドだけを返す"""
+    out = bytearray()
+    align, bold, underline, font, width, height = new
+    if align != prev[0]:
+        out += ESC + b"a" + bytes([_ALIGN.get(align, 0)])
+    if bold != prev[1]:
+        out += ESC + b"E" + bytes([1 if bold else 0])
+    if underline != prev[2]:
+        out += ESC + b"-" + bytes([underline])
+    if font != prev[3]:
+        out += ESC + b"M" + bytes([_FONT.get(font, 0)])
+    if (width, height) != prev[4:]:
+        out += GS + b"!" + bytes([((width - 1) << 4) | (height - 1)])
+    return bytes(out)
+
+
+def qr_bytes(data: str, size: int = 4) -> bytes:
+    """QR コード（モデル 2、誤り訂正 L）の GS ( k コマンド列"""
+    payload = data.encode("cp932", errors="replace")
+    store_len = len(payload) + 3
+
+    def gs_k(body: bytes) -> bytes:
+        return GS + b"(k" + bytes([len(body) & 0xFF, len(body) >> 8]) + body
+
+    return b"".join([
+        gs_k(b"\x31\x41\x32\x00"),
+        gs_k(b"\x31\x43" + bytes([size])),
+        gs_k(b"\x31\x45\x30"),
+        GS + b"(k" + bytes([store_len & 0xFF, store_len >> 8]) + b"\x31\x50\x30" + payload,
+        gs_k(b"\x31\x51\x30"),
+    ])
+
+
+def rasterize(path: str):
+    """画像を (幅バイト数, 高さドット, ラスタデータ) に変換（python-escpos の画像処理を利用）"""
+    from escpos.image import EscposImage
+
+    im = EscposImage(path)
+    return im.width_bytes, im.height, im.to_raster_format()
+
+
+def raster_command(width_bytes: int, height: int, data: bytes) -> bytes:
+    """GS v 0 ラスタ画像コマンド"""
+    return b"".join([
+        GS + b"v0\x00",
+        bytes([width_bytes & 0xFF, width_bytes >> 8]),
+        bytes([height & 0xFF, height >> 8]),
+        data,
+    ])
+
+
+def raster_image(path: str) -> bytes:
+    return raster_command(*rasterize(path))
+
+
+def render(jobs: Iterable, kick_drawer: bool = False,
+           image_renderer: Optional[Callable[[str], bytes]] = None) -> bytes:
+    """
+    jobs: [(cmd, text, opts), ...]  cmd は text / image / qr / cut
+    kick_drawer: 末尾にドロワーキックを付けるか
+    image_renderer: 画像パス → ラスタバイト列（省略時は raster_image）
+    """
+    image_renderer = image_renderer or raster_image
+    buf = bytearray(INIT + CODEPAGE_CP932)
+    style = DEFAULT_STYLE
+    for cmd, text, opts in jobs:
+        opts = opts or {}
+        if cmd in ("text", "image", "qr"):
+            # 画像・QR は揃えの指定だけ反映し、他の書式はそのまま
+            new = style_of(opts) if cmd == "text" else (opts.get("align", "left"),) + style[1:]
+            buf += style_bytes(style, new)
+            style = new
+        if cmd == "text":
+            # 空文字は書式の切り替えのみ（従来の execute と同じ出力）
+            if text:
+                buf += text.encode("cp932", errors="replace") + b"\n"
+        elif cmd == "image":
+            try:
+                buf += image_renderer(text)
+            except Exception as e:
+                log.error(f"Image {text} skipped: {e}")
+        elif cmd == "qr":
+            buf += qr_bytes(text, size=opts.get("size", 4)) + b"\n"
+        elif cmd == "cut":
+            buf += FEED_AND_CUT
+    if kick_drawer:
+        buf += DRAWER_KICK
+    return bytes(buf)
@@ -0,0 +1,67 @@
+# utils/file_lock.py
+"""
+プロセス間で共有する排他ロック（ロック用ファイルを使用）。
+Windows は msvcrt、それ以外は fcntl を利用します。
+"""
+import os
+import time
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+class FileLock:
+    def __init__(self, path, timeout: float = 30.0, poll: float = 0.05):
+        """
+        path: ロックファイルのパス（無ければ作成）
+        timeout: 取得を待つ最大秒数。超えたら TimeoutError
+        """
+        self.path = str(path)
+        self.timeout = timeout
+        self.poll = poll
+        self._fh = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if msvcrt:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._fh = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                self._fh.close()
+                self._fh = None
+                raise TimeoutError(f"Could not lock {self.path} within {self.timeout}s")
+            time.sleep(self.poll)
+
+    def release(self):
+        if self._fh is None:
+            return
+        try:
+            if msvcrt:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -1,5 +1,7 @@
 import csv
 import json
+import os
+import sqlite3
 from pathlib import Path
 
 def ensure_dir(path):
@@ -20,6 +22,17 @@ def save_json(path, data):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+def save_json_atomic(path, data):
+    """Save JSON via a temp file + os.replace so readers never see a partial file."""
+    path = Path(path)
+    ensure_dir(path.parent)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
 def load_csv(path):
     """Load CSV file and return a list of rows."""
     with open(path, newline="", encoding="utf-8") as f:
@@ -37,3 +50,12 @@ def save_csv(path_or_buffer, rows=None):
     with open(path_or_buffer, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerows(rows)
+
+def open_sqlite(path, timeout=30.0):
+    """Open a SQLite DB in WAL mode (readers never block the single writer)."""
+    ensure_dir(Path(path).parent)
+    conn = sqlite3.connect(str(path), timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,141 @@
+# utils/logo_cache.py
+"""
+レシートロゴのラスタデータキャッシュ。
+・PNG の読み込み・ディザ・ラスタ変換は初回だけ行い、結果をメモリとディスクに保持
+・キャッシュはロゴのパス・更新時刻・サイズ・プリンタ機種で識別し、どれかが変われば作り直す
+・nv_key を指定するとロゴをプリンタの NV グラフィックスメモリに登録し、
+  以降の印刷は数バイトの呼び出しコマンドだけを送る
+  （プリンタを交換したときは cache_dir/nv.json を削除して再登録させる）
+"""
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from logger import get_logger
+from utils.escpos_renderer import GS, rasterize, raster_command
+from utils.file_utils import ensure_dir, load_json, save_json_atomic
+
+log = get_logger(__name__)
+
+Raster = Tuple[int, int, bytes]
+
+
+def nv_define_command(key: str, width_bytes: int, height: int, data: bytes) -> bytes:
+    """
+    GS ( L fn=67: ラスタ画像を NV グラフィックスとしてキー key（2 文字）で登録。
+    データ長が 2 バイトに収まらない大きな画像は GS 8 L（4 バイト長）で送る
+    """
+    body = b"".join([
+        b"\x30\x43\x30" + key.encode("ascii") + b"\x01",
+        bytes([(width_bytes * 8) & 0xFF, (width_bytes * 8) >> 8]),
+        bytes([height & 0xFF, height >> 8]),
+        b"\x31" + data,
+    ])
+    if len(body) > 0xFFFF:
+        return GS + b"8L" + len(body).to_bytes(4, "little") + body
+    return GS + b"(L" + len(body).to_bytes(2, "little") + body
+
+
+def nv_print_command(key: str) -> bytes:
+    """GS ( L fn=69: 登録済み NV グラフィックスを等倍で印刷"""
+    return GS + b"(L\x06\x00\x30\x45" + key.encode("ascii") + b"\x01\x01"
+
+
+class LogoCache:
+    def __init__(self, cache_dir: str = "data/cache/logo", profile: str = "",
+                 nv_key: Optional[str] = None,
+                 rasterizer: Callable[[str], Raster] = rasterize):
+        """
+        cache_dir: ラスタデータの保存先
+        profile: プリンタ機種名（変わったらキャッシュを作り直す）
+        nv_key: NV グラフィックスのキー（2 文字、例 "LG"）。None なら毎回ラスタを送る
+        rasterizer: 画像パス → (幅バイト数, 高さ, データ)
+        """
+        self.cache_dir = cache_dir
+        self.profile = profile
+        self.nv_key = nv_key
+        self.rasterizer = rasterizer
+        self._mem: Dict[str, Tuple[str, Raster]] = {}
+        self._lock = threading.Lock()
+        self._nv_path = os.path.join(cache_dir, "nv.json")
+        self._nv_pending: Optional[str] = None
+        ensure_dir(cache_dir)
+
+    def fingerprint(self, path: str) -> str:
+        st = os.stat(path)
+        src = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{self.profile}"
+        return hashlib.sha1(src.encode("utf-8")).hexdigest()
+
+    def raster(self, path: str) -> Raster:
+        """ロゴのラスタデータを返す（メモリ → ディスク → 変換 の順に探す）"""
+        fp = self.fingerprint(path)
+        with self._lock:
+            hit = self._mem.get(path)
+            if hit and hit[0] == fp:
+                return hit[1]
+            raster = self._load(path, fp)
+            if raster is None:
+                raster = self.rasterizer(path)
+                self._save(path, fp, raster)
+                log.info(f"Rasterized logo {path}: {raster[0] * 8}x{raster[1]} dots, "
+                         f"{len(raster[2])} bytes")
+            self._mem[path] = (fp, raster)
+            return raster
+
+    def warm(self, paths):
+        """起動時の事前変換。失敗してもレシート印刷自体は止めない"""
+        for path in paths:
+            try:
+                self.raster(path)
+            except Exception as e:
+                log.error(f"Logo cache warm-up failed for {path}: {e}")
+
+    def command(self, path: str) -> bytes:
+        """render() の image_renderer として使う。ロゴ印刷用の ESC/POS バイト列を返す"""
+        raster = self.raster(path)
+        if not self.nv_key:
+            return raster_command(*raster)
+        fp = self.fingerprint(path)
+        if self._nv_registered() == fp:
+            return nv_print_command(self.nv_key)
+        # 未登録（またはロゴ変更後）は登録コマンドを前置。送信成功後に commit_nv() で記録
+        self._nv_pending = fp
+        return nv_define_command(self.nv_key, *raster) + nv_print_command(self.nv_key)
+
+    def commit_nv(self):
+        """NV 登録コマンドを含むデータの送信が成功したら呼ぶ"""
+        if self._nv_pending:
+            save_json_atomic(self._nv_path, {"key": self.nv_key, "fingerprint": self._nv_pending})
+            self._nv_pending = None
+
+    def _nv_registered(self) -> Optional[str]:
+        if not os.path.exists(self._nv_path):
+            return None
+        state = load_json(self._nv_path)
+        return state.get("fingerprint") if state.get("key") == self.nv_key else None
+
+    def _files(self, path: str):
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, digest)
+        return base + ".json", base + ".bin"
+
+    def _load(self, path: str, fp: str) -> Optional[Raster]:
+        meta_path, bin_path = self._files(path)
+        try:
+            meta = load_json(meta_path)
+            if meta.get("fingerprint") != fp:
+                return None
+            with open(bin_path, "rb") as f:
+                return meta["width_bytes"], meta["height"], f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, path: str, fp: str, raster: Raster):
+        meta_path, bin_path = self._files(path)
+        with open(bin_path, "wb") as f:
+            f.write(raster[2])
+        save_json_atomic(meta_path, {
+            "path": path, "fingerprint": fp, "profile": self.profile,
+            "width_bytes": raster[0], "height": raster[1],
+        })
@@ -0,0 +1,186 @@
+# utils/metrics.py
+"""
+処理時間の計測（スパン／タイマー）と固定サイズのヒストグラム。
+・record(name, ms) または with span(name): で 1 件記録（ロック 1 回と配列の加算だけ）
+・ヒストグラムは等比のバケット（上限 BASE_MS × GROWTH^i、誤差はおよそ ±10%）で、件数によらず大きさ一定
+・flush() で前回以降の分を data/metrics/YYYYMMDD.jsonl に 1 行追記（POS では一定間隔と終了時）
+・summary() は起動からの累計の p50 / p95 / p99（機能一覧の表示用）
+
+主なステージ名:
+  scan.lookup / scan.register        スキャン → 商品検索 → カート登録
+  checkout.finalize / checkout.record / checkout.print   会計確定 → 売上記録 → レシート印刷完了
+  print.send                         レシート 1 枚の変換と送信
+  ne:<API パス> / sync.inventory / sync.sales_upload   Next Engine 呼び出し（1 回ごと／再試行込み）
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import Config
+from logger import get_logger
+
+log = get_logger(__name__)
+
+BASE_MS = 0.01
+GROWTH = 1.2
+BUCKETS = 100  # 0.01 ms 〜 約 8 分。超えた分は最後のバケット
+_BOUNDS = [BASE_MS * GROWTH ** i for i in range(BUCKETS - 1)]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(_BOUNDS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p: float) -> float:
+        """p パーセンタイル（そのバケットの上限。最大値を超えない）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return min(_BOUNDS[i], self.max_ms) if i < len(_BOUNDS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "p99": round(self.percentile(99), 3),
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+        }
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class Metrics:
+    def __init__(self, out_dir="data/metrics", interval: float = 60):
+        """
+        out_dir: flush() の書き出し先（日別の JSON Lines）
+        interval: start() 後に自動で flush() する間隔（秒）
+        """
+        self.out_dir = out_dir
+        self.interval = interval
+        self._total: Dict[str, Histogram] = {}
+        self._window: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, name: str, ms: float):
+        with self._lock:
+            for hists in (self._total, self._window):
+                hist = hists.get(name)
+                if hist is None:
+                    hist = hists[name] = Histogram()
+                hist.add(ms)
+
+    def span(self, name: str) -> _Span:
+        """with metrics.span("scan.lookup"): ... でブロックの所要時間を記録"""
+        return _Span(self, name)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ステージ名 → 起動からの件数と p50 / p95 / p99 / 最大（ms）"""
+        with self._lock:
+            return {
+                name: {"count": h.count, "p50": h.percentile(50), "p95": h.percentile(95),
+                       "p99": h.percentile(99), "max": h.max_ms}
+                for name, h in sorted(self._total.items())
+            }
+
+    def flush(self) -> Optional[str]:
+        """前回の flush 以降の記録を追記し、書き出したファイルのパスを返す（記録が無ければ None）"""
+        with self._lock:
+            window, self._window = self._window, {}
+        if not window:
+            return None
+        now = datetime.now()
+        path = os.path.join(self.out_dir, f"{now:%Y%m%d}.jsonl")
+        line = json.dumps({
+            "ts": now.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "stages": {name: h.to_dict() for name, h in sorted(window.items())},
+        }, ensure_ascii=False)
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            log.error(f"Metrics flush failed: {e}")
+            return None
+        return path
+
+    def start(self):
+        """interval 秒ごとに flush() するスレッドを起動"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """プロセス共有の Metrics を返す（終了時に残りを flush する）"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                m = Metrics(out_dir=Config.METRICS_DIR, interval=Config.METRICS_FLUSH_SEC)
+                atexit.register(m.stop)
+                _metrics = m
+    return _metrics
+
+
+def record(name: str, ms: float):
+    get_metrics().record(name, ms)
+
+
+def span(name: str) -> _Span:
+    return get_metrics().span(name)
@@ -0,0 +1,203 @@
+# utils/print_spooler.py
+"""
+レシート印刷スプーラ。
+・プリンタ接続（TCP/9100）を専用スレッドで保持し、会計処理は接続を待たない
+・ジョブは DurableQueue に保存するため、プリンタ停止中のレシートも復旧後に順番どおり印刷される
+・接続失敗時は指数バックオフで再接続（上限 max_backoff 秒）
+・待ち件数・印刷所要時間・投入から印刷までの遅延を status() で返す
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from logger import get_logger
+from utils.durable_queue import DurableQueue
+
+log = get_logger(__name__)
+
+
+class PrintSpooler:
+    def __init__(self, printer_factory: Callable[[], Any], queue_dir="data/queue",
+                 backoff: float = 1.0, max_backoff: float = 30.0, max_attempts: int = 5,
+                 drawer_window: float = 30.0,
+                 on_printed: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        printer_factory: connect()/execute(jobs, kick_drawer)/close() を持つプリンタを返す関数
+        queue_dir: ジョブファイル保存先（queue_dir/spool/ 以下）
+        backoff, max_backoff: 再試行待ち秒数（backoff, 2*backoff, ... 最大 max_backoff）
+        max_attempts: 接続後の印刷エラーがこの回数続いたジョブは failed/ へ退避
+                      （接続できない間は何度でも待つ）
+        drawer_window: 投入からこの秒数を過ぎたジョブはドロワーを開けずに印刷
+        on_printed: 印刷完了時にジョブの payload を受け取るコールバック
+        """
+        self.printer_factory = printer_factory
+        self.queue = DurableQueue(queue_dir, "spool")
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.drawer_window = drawer_window
+        self.on_printed = on_printed
+        self._printer = None
+        self._warm: Optional[threading.Event] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "idle"
+        self.printed = 0
+        self.failed = 0
+        self.connects = 0
+        self.last_ms: Optional[float] = None
+        self.total_ms = 0.0
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    # ――――― 制御 ―――――
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, name="print-spooler", daemon=True)
+        self._thread.start()
+
+    def warm(self) -> threading.Event:
+        """
+        ジョブを待たずにプリンタへ接続しておく（起動時用）。接続はスプーラのスレッドで行い、
+        試行が終わると（失敗でも）返したイベントがセットされる
+        """
+        done = threading.Event()
+        self._warm = done
+        return done
+
+    def stop(self, timeout: float = 5.0):
+        """スレッドを止めて接続を閉じる。未印刷ジョブはディスクに残る"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._drop_printer()
+
+    def submit(self, commands: List[Any], transaction_id: Optional[str] = None,
+               kick_drawer: bool = True) -> str:
+        """印刷ジョブを投入してジョブ ID を返す（即時復帰）"""
+        return self.queue.put({
+            "transaction_id": transaction_id,
+            "commands": commands,
+            "kick_drawer": kick_drawer,
+            "submitted": time.time(),
+        })
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "connected": self._printer is not None,
+            "pending": self.queue.depth(),
+            "done": self.printed,
+            "failed": self.failed,
+            "failed_on_disk": self.queue.failed_count(),
+            "connects": self.connects,
+            "last_ms": self.last_ms,
+            "avg_ms": self.total_ms / self.printed if self.printed else None,
+            "latency_ms": self.last_latency_ms,
+            "last_error": self.last_error,
+        }
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.queue.depth() == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    # ――――― ワーカー ―――――
+    def _worker(self):
+        while not self._stop.is_set():
+            warm, self._warm = self._warm, None
+            if warm is not None:
+                try:
+                    self._connect()
+                except Exception as e:
+                    # 失敗しても最初のジョブで再試行する
+                    self.state = "offline"
+                    self.last_error = f"connect: {e}"
+                    log.warning(f"Printer warm-up failed: {e}")
+                warm.set()
+            item = self.queue.get(timeout=0.5)
+            if item is None:
+                continue
+            self._print_job(*item)
+
+    def _print_job(self, path, job: Dict[str, Any]):
+        """1 ジョブを印刷できるまで順番を崩さずに再試行する"""
+        payload = job["payload"]
+        waits = 0
+        while not self._stop.is_set():
+            try:
+                printer = self._connect()
+            except Exception as e:
+                self._retry_wait(f"connect: {e}", waits)
+                waits += 1
+                continue
+            # 投入から時間が経ったレシート（オフライン中の分）ではドロワーを開けない
+            fresh = time.time() - payload.get("submitted", 0) <= self.drawer_window
+            start = time.perf_counter()
+            try:
+                kick = payload.get("kick_drawer") and fresh
+                printer.execute(payload["commands"], kick_drawer=kick)
+            except Exception as e:
+                # 途中で切れた可能性があるので接続は張り直す
+                self._drop_printer()
+                job["attempts"] += 1
+                job["last_error"] = str(e)
+                if job["attempts"] >= self.max_attempts:
+                    self.failed += 1
+                    self.last_error = str(e)
+                    self.state = "error"
+                    self.queue.fail(path, job)
+                    log.error(
+                        f"Print job {job['id']} gave up after {job['attempts']} attempts: {e}"
+                    )
+                    return
+                self.queue.update(path, job)
+                self._retry_wait(str(e), waits)
+                waits += 1
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            self.printed += 1
+            self.last_ms = elapsed
+            self.total_ms += elapsed
+            self.last_latency_ms = (time.time() - payload.get("submitted", time.time())) * 1000
+            self.state = "idle"
+            self.queue.ack(path)
+            log.info(
+                f"Printed {payload.get('transaction_id') or job['id']} in {elapsed:.1f} ms "
+                f"(latency {self.last_latency_ms:.0f} ms)"
+            )
+            if self.on_printed:
+                try:
+                    self.on_printed(payload)
+                except Exception as e:
+                    log.error(f"on_printed callback failed: {e}", exc_info=True)
+            return
+
+    def _retry_wait(self, error: str, waits: int):
+        delay = min(self.max_backoff, self.backoff * (2 ** waits))
+        self.last_error = error
+        self.state = "offline" if self._printer is None else "retrying"
+        log.warning(f"Printer unavailable ({error}); retry in {delay:.1f} s")
+        self._stop.wait(delay)
+
+    def _connect(self):
+        if self._printer is None:
+            printer = self.printer_factory()
+            printer.connect()
+            self._printer = printer
+            self.connects += 1
+            log.info("Printer connected")
+        return self._printer
+
+    def _drop_printer(self):
+        printer, self._printer = self._printer, None
+        if printer is not None:
+            try:
+                printer.close()
+            except Exception:
+                pass
@@ -1,56 +1,74 @@
 # utils/printer.py
-from escpos.printer import Network
+from utils.escpos_renderer import render
+from utils.metrics import span
 
 class ReceiptPrinter:
     """
     ESC/POS サーマルプリンタへの印刷をラップするクラスです。
     """
 
-    def __init__(self, host: str, port: int = 9100, timeout: int = 10):
+    def __init__(self, host: str, port: int = 9100, timeout: int = 10, lazy: bool = False,
+                 logo_cache=None):
         """
         host: プリンターの IP アドレス
         port: ESC/POS 通常ポート (デフォルト 9100)
         timeout: タイムアウト秒数
+        lazy: True なら接続を connect() 呼び出しまで遅らせる（PrintSpooler 用）
+        logo_cache: utils.logo_cache.LogoCache（画像のラスタ変換を使い回す）
         """
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.logo_cache = logo_cache
+        self.printer = None
+        self.bytes_sent = 0
+        self.writes = 0
+        if not lazy:
+            self.connect()
+
+    @property
+    def connected(self) -> bool:
+        return self.printer is not None
+
+    def connect(self):
+        """接続を確立（接続済みなら何もしない）。失敗時は RuntimeError"""
+        if self.printer is not None:
+            return
         try:
+            # escpos（Pillow・qrcode・USB バックエンドを含む）は最初の接続まで読み込まない
+            from escpos.printer import Network
             # ネットワーク接続を確立
-            self.printer = Network(self.host, port=self.port, timeout=self.timeout)
+            printer = Network(self.host, port=self.port, timeout=self.timeout)
             # 日本語コードページ CP932 (0x11) に設定
-            self.printer._raw(b"\x1B\x74\x11")
+            printer._raw(b"\x1B\x74\x11")
         except Exception as e:
             raise RuntimeError(f"Printer connection failed: {e}")
+        self.printer = printer
+
+    def close(self):
+        """ソケットを閉じる。次回 connect() で張り直す"""
+        printer, self.printer = self.printer, None
+        if printer is not None:
+            try:
+                printer.close()
+            except Exception:
+                pass
 
-    def execute(self, jobs):
+    def execute(self, jobs, kick_drawer: bool = True):
         """
         jobs: List[Tuple[str, Optional[str], Dict[str, Any]]]
-          - cmd: 'text' or 'cut'
-          - text: 印字する文字列 (None 可能)
-          - opts: set() に渡すパラメータ辞書
+          - cmd: 'text' / 'image' / 'qr' / 'cut'
+          - text: 印字する文字列・画像パス (None 可能)
+          - opts: 書式指定（set() の引数相当、utils/escpos_renderer 参照）
+        kick_drawer: 印刷後にキャッシュドロワーを開くか
         """
-        for cmd, text, opts in jobs:
-            if cmd == 'text':
-                # 文字スタイル設定
-                self.printer.set(**opts)
-                if text:
-                    # 日本語をCP932でエンコード
-                    raw = text.encode('cp932', errors='replace')
-                    self.printer._raw(raw + b"\n")
-            elif cmd == 'cut':
-                # レシートカット
-                self.printer.cut()
-            elif cmd == 'image':
-                # 画像印字：Python-escpos の image() を呼ぶ
-                # text は画像パス
-                self.printer.image(text)
-            else:
-                # 追加コマンドがあればここで分岐
-                pass
-        # キャッシュドロワーキック（ドロワー1）
-        try:
-            self.printer.cashdraw(0)
-        except Exception:
-            # ESC p m t1 t2: m=0, t1=50ms, t2=250ms
-            self.printer._raw(b"\x1B\x70\x00\x32\xFA")
+        self.connect()
+        # 1 枚分を 1 本のバイト列にまとめ、1 回の書き込みで送る
+        image_renderer = self.logo_cache.command if self.logo_cache else None
+        with span("print.send"):
+            data = render(jobs, kick_drawer=kick_drawer, image_renderer=image_renderer)
+            self.printer._raw(data)
+        if self.logo_cache:
+            self.logo_cache.commit_nv()
+        self.bytes_sent += len(data)
+        self.writes += 1
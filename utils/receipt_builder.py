@@ -1,38 +1,58 @@
-import yaml
+import os
+import threading
 from typing import List, Tuple, Dict, Any
 
-class ReceiptBuilder:
+from logger import get_logger
+
+log = get_logger(__name__)
+
+# 列名 → 明細行で埋める値の種類
+_COLUMN_KINDS = {'商品名': 'name', '数量': 'qty', '数': 'qty', '単価': 'price', '金額': 'amount'}
+
+
+def disp_width(text: str) -> int:
+    """全角を2、半角を1として表示幅を数える"""
+    if text.isascii():
+        return len(text)
+    # 非 ASCII 文字数 = 全体 - ASCII 文字数
+    return 2 * len(text) - len(text.encode('ascii', 'ignore'))
+
+
+def fit_text(text: str, width: int) -> str:
     """
-    レイアウト設定（YAML）をもとに、ReceiptPrinter に渡す印刷ジョブを生成します。
+    全角を2文字、半角を1文字として幅を計算し、指定幅に収まるよう切り詰め、足りない分はスペースで埋める
     """
+    if width <= 0:
+        return ''
+    if text.isascii():
+        return text[:width].ljust(width)
+    w = disp_width(text)
+    if w <= width:
+        return text + ' ' * (width - w)
+    w = 0
+    for i, ch in enumerate(text):
+        char_width = 2 if ord(ch) > 127 else 1
+        if w + char_width > width:
+            return text[:i] + ' ' * (width - w)
+        w += char_width
+    return text + ' ' * (width - w)
 
-    def __init__(self, config_path: str):
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config: Dict[str, Any] = yaml.safe_load(f)
 
-    def _fit_text(self, text: str, width: int) -> str:
-        """
-        全角を2文字、半角を1文字として幅を計算し、指定幅に収まるよう切り詰め、足りない分はスペースで埋める
-        """
-        w = 0
-        out = ''
-        for ch in text:
-            char_width = 2 if ord(ch) > 127 else 1
-            if w + char_width > width:
-                break
-            out += ch
-            w += char_width
-        out += ' ' * (width - w)
-        return out
+class ReceiptTemplate:
+    """
+    YAML レイアウトをコンパイルした不変テンプレート。
+    ヘッダー・明細見出し・区切り線は組み立て済みで、build 時は日時・明細・税・フッターだけを埋める。
+    """
+    __slots__ = ("config", "head", "dt_label", "dt_fmt", "sep", "table_head", "columns", "footer")
 
-    def build(self, sale: Dict[str, Any]) -> List[Tuple[str, Any, Dict[str, Any]]]:
-        job: List[Tuple[str, Any, Dict[str, Any]]] = []
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
 
         # ヘッダー部（画像対応含む）
-        for entry in self.config.get('header', []):
+        head: List[Tuple[str, Any, Dict[str, Any]]] = []
+        for entry in config.get('header', []):
             if 'image' in entry:
-                opts = {'align': entry.get('align', 'center')}
-                job.append(('image', entry['image'], opts))
+                head.append(('image', entry['image'], {'align': entry.get('align', 'center')}))
             else:
                 opts: Dict[str, Any] = {}
                 if 'align' in entry:
@@ -42,85 +62,161 @@ class ReceiptBuilder:
                 if entry.get('size') == 'large':
                     opts['width'] = 2
                     opts['height'] = 2
-                job.append(('text', entry['text'], opts))
-        job.append(('text', '', {}))
+                head.append(('text', entry['text'], opts))
+        head.append(('text', '', {}))
+        self.head = tuple(head)
 
-        # 日時表示
-        body_cfg = self.config.get('body', {})
+        body_cfg = config.get('body', {})
         dt_cfg = body_cfg.get('datetime', {})
-        dt_label = dt_cfg.get('label', '')
-        dt_fmt = dt_cfg.get('format', '%Y/%m/%d %H:%M:%S')
-        dt_str = sale['timestamp'].strftime(dt_fmt)
-        job.append(('text', f"{dt_label} {dt_str}", {}))
+        self.dt_label = dt_cfg.get('label', '')
+        self.dt_fmt = dt_cfg.get('format', '%Y/%m/%d %H:%M:%S')
+        self.sep = body_cfg.get('separator', '-' * 48)
 
-        # 区切り線
-        sep = body_cfg.get('separator', '-' * 48)
-        job.append(('text', sep, {}))
-
-        # 明細ヘッダー
-        cols = body_cfg.get('columns', [])
+        # 明細見出し（区切り線で挟む）と明細行の列定義
         header_line = ''
-        # 全角2、半角1の幅を数える
-        def disp_width(text: str) -> int:
-            return sum(2 if ord(ch) > 127 else 1 for ch in text)
-        for col in cols:
+        columns = []
+        for col in body_cfg.get('columns', []):
             name = col['name']
             width = col['width']
-            align = col.get('align', 'left')
             display = '数' if name in ('数量', '数') else name
-            if align == 'right':
-                pad = width - disp_width(display)
-                header_line += ' ' * pad + display
+            if col.get('align', 'left') == 'right':
+                header_line += ' ' * (width - disp_width(display)) + display
             else:
-                header_line += self._fit_text(display, width)
-        job.append(('text', header_line, {'bold': True}))
-        job.append(('text', sep, {}))
+                header_line += fit_text(display, width)
+            columns.append((_COLUMN_KINDS.get(name, 'blank'), width))
+        self.columns = tuple(columns)
+        self.table_head = (
+            ('text', self.sep, {}),
+            ('text', header_line, {'bold': True}),
+            ('text', self.sep, {}),
+        )
+
+        # フッター部（書式文字列と揃えだけ保持）
+        self.footer = tuple(
+            (entry['text'], {'align': entry['align']} if 'align' in entry else {})
+            for entry in config.get('footer', [])
+        )
+
+    def item_line(self, item: Dict[str, Any]) -> str:
+        parts = []
+        for kind, width in self.columns:
+            if kind == 'name':
+                parts.append(fit_text(item.get('name', ''), width))
+            elif kind == 'qty':
+                parts.append(str(item.get('quantity', 0)).rjust(width))
+            elif kind == 'price':
+                parts.append(f"{item.get('price', 0):,}".rjust(width))
+            elif kind == 'amount':
+                parts.append(f"{item.get('price', 0) * item.get('quantity', 0):,}".rjust(width))
+            else:
+                parts.append(' ' * width)
+        return ''.join(parts)
+
+
+class ReceiptBuilder:
+    """
+    レイアウト設定（YAML）をもとに、ReceiptPrinter に渡す印刷ジョブを生成します。
+    YAML はテンプレートにコンパイルして保持し、ファイルの更新時刻が変わったら読み直します。
+    コンパイル（と yaml の import）は最初にテンプレートを使うときに行います。
+    """
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._template = None
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.template.config
+
+    @property
+    def template(self) -> ReceiptTemplate:
+        """現在のテンプレート（YAML が更新されていれば再コンパイル）"""
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            if self._template is None:
+                # まだ一度も読めていなければ FileNotFoundError 等をそのまま送出
+                self._reload()
+            return self._template
+        if mtime != self._mtime:
+            self._reload()
+        return self._template
+
+    def _reload(self):
+        import yaml  # 起動時の import を軽くするため、初回のコンパイルまで遅らせる
+        with self._lock:
+            mtime = os.stat(self.config_path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            try:
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    template = ReceiptTemplate(yaml.safe_load(f) or {})
+            except Exception:
+                if self._template is None:
+                    raise
+                # 編集途中などで読めない場合は前のテンプレートを使い続ける
+                log.error(f"Receipt layout reload failed: {self.config_path}", exc_info=True)
+                return
+            self._template, self._mtime = template, mtime
+            log.info(f"Receipt layout compiled: {self.config_path}")
+
+    def _fit_text(self, text: str, width: int) -> str:
+        return fit_text(text, width)
+
+    def build(self, sale: Dict[str, Any]) -> List[Tuple[str, Any, Dict[str, Any]]]:
+        t = self.template
+        job: List[Tuple[str, Any, Dict[str, Any]]] = list(t.head)
+
+        # 日時表示と明細見出し
+        job.append(('text', f"{t.dt_label} {sale['timestamp'].strftime(t.dt_fmt)}", {}))
+        job.extend(t.table_head)
 
         # 商品明細
-        for item in sale['items']:
-            line = ''
-            for col in cols:
-                name = col['name']
-                width = col['width']
-                if name == '商品名':
-                    text = self._fit_text(item.get('name', ''), width)
-                elif name in ('数量', '数'):
-                    text = str(item.get('quantity', 0)).rjust(width)
-                elif name == '単価':
-                    text = f"{item.get('price', 0):,}".rjust(width)
-                elif name == '金額':
-                    amt = item.get('price', 0) * item.get('quantity', 0)
-                    text = f"{amt:,}".rjust(width)
-                else:
-                    text = ' ' * width
-                line += text
-            job.append(('text', line, {}))
-        job.append(('text', sep, {}))
+        job.extend(('text', t.item_line(item), {}) for item in sale['items'])
+        job.append(('text', t.sep, {}))
 
         # 税サマリー
         total = sale.get('total', 0)
-        tax_base = total * 10 // 11
-        tax_value = total - tax_base
-        line1 = self._fit_text('10%対象', 48 - disp_width(f"{total:,}")) + f"{total:,}"
-        job.append(('text', line1, {}))
+        tax_value = total - total * 10 // 11
+        total_str = f"{total:,}"
+        job.append(('text', fit_text('10%対象', 48 - len(total_str)) + total_str, {}))
         prefix = '(内消費税等 10%'
         suffix = f"{tax_value:,})"
-        spaces = 48 - disp_width(prefix) - disp_width(suffix)
-        line2 = prefix + (' ' * max(spaces, 0)) + suffix
-        job.append(('text', line2, {}))
-        job.append(('text', sep, {}))
+        spaces = 48 - disp_width(prefix) - len(suffix)
+        job.append(('text', prefix + (' ' * max(spaces, 0)) + suffix, {}))
+        job.append(('text', t.sep, {}))
 
         # フッター部（YAML制御）
-        for entry in self.config.get('footer', []):
-            opts: Dict[str, Any] = {}
-            if 'align' in entry:
-                opts['align'] = entry['align']
-            text = entry['text'].format(
-                total=sale.get('total', 0),
-                pay_amount=sale.get('pay_amount', 0),
-                change=sale.get('change', 0),
-                pay_method_name=sale.get('pay_method_name', '')
-            )
-            job.append(('text', text, opts))
+        fields = {
+            'total': total,
+            'pay_amount': sale.get('pay_amount', 0),
+            'change': sale.get('change', 0),
+            'pay_method_name': sale.get('pay_method_name', ''),
+        }
+        for text, opts in t.footer:
+            job.append(('text', text.format(**fields), opts))
+        job.append(('cut', None, {}))
+        return job
+
+    def build_report(self, title: str, period: str,
+                     rows: List[Tuple[str, Any]]) -> List[Tuple[str, Any, Dict[str, Any]]]:
+        """
+        日次／月次レポートの印刷ジョブ。rows は (項目名, 金額) の並びで、金額 None は区切り線
+        """
+        t = self.template
+        job: List[Tuple[str, Any, Dict[str, Any]]] = [
+            ('text', title, {'align': 'center', 'bold': True, 'width': 2, 'height': 2}),
+            ('text', period, {'align': 'center'}),
+            ('text', t.sep, {}),
+        ]
+        for label, value in rows:
+            if value is None:
+                job.append(('text', t.sep, {}))
+                continue
+            value_str = f"{value:,}"
+            job.append(('text', fit_text(label, 48 - len(value_str)) + value_str, {}))
+        job.append(('text', t.sep, {}))
         job.append(('cut', None, {}))
         return job
@@ -0,0 +1,84 @@
+# utils/startup_profile.py
+"""
+起動処理の計時と並列ウォームアップ。
+・step() で UI スレッド上の処理を、run() で別スレッドのウォームアップを計時
+・すべてのウォームアップと画面表示が終わったら、内訳を 1 行でログに出す（起動のたびに記録）
+"""
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+from logger import get_logger
+
+log = get_logger(__name__)
+
+
+class StartupProfile:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.steps: List[Tuple[str, float]] = []
+        self.tasks: Dict[str, Tuple[float, str]] = {}
+        self.shown_ms = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def _ms(self, since: float) -> float:
+        return (time.perf_counter() - since) * 1000
+
+    @contextmanager
+    def step(self, name: str):
+        """同期処理（画面表示までにかかる分）を計時"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, self._ms(start)))
+
+    def run(self, name: str, fn: Callable[[], Any]) -> Future:
+        """fn を別スレッドで実行し、結果の Future を返す（例外も Future に入る）"""
+        future: Future = Future()
+        with self._lock:
+            self._pending += 1
+
+        def task():
+            start = time.perf_counter()
+            result, error = None, None
+            try:
+                result = fn()
+            except BaseException as e:
+                error = e
+            self.tasks[name] = (self._ms(start), "ok" if error is None else f"error: {error}")
+            with self._lock:
+                self._pending -= 1
+            self._maybe_report()
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+        threading.Thread(target=task, name=f"startup-{name}", daemon=True).start()
+        return future
+
+    def shown(self):
+        """画面が操作可能になった時点を記録"""
+        self.shown_ms = self._ms(self.t0)
+        self._maybe_report()
+
+    def _maybe_report(self):
+        with self._lock:
+            if self._reported or self._pending or self.shown_ms is None:
+                return
+            self._reported = True
+        log.info(self.summary())
+
+    def summary(self) -> str:
+        steps = ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.steps)
+        tasks = ", ".join(
+            f"{name} {ms:.0f} ms" + ("" if status == "ok" else f" ({status})")
+            for name, (ms, status) in self.tasks.items()
+        )
+        return (f"Startup timing: window shown {self.shown_ms:.0f} ms [{steps}] | "
+                f"warm-up [{tasks}] | all ready {self._ms(self.t0):.0f} ms")